@@ -0,0 +1,141 @@
+"""
+Database scaling benchmark: times every DatabaseManager get_* and record_* method against generated
+databases of increasing size, to track query regressions as history grows.
+
+Each scale's database is generated once with benchmarks.generate_history and kept in --data-dir, so later
+runs only pay for the timings (the record_* cases add a few hundred rows per run). Reads target the guild
+with the most users, the worst case for leaderboards. Run from the repository root:
+
+    python -m benchmarks.bench_database_scale --scales 10k,1m
+    python -m benchmarks.bench_database_scale --scales 10k,1m,50m --json results.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable
+from src.core.database import DatabaseManager
+from src.resources.analysis_responses import generate_weighted_iq
+from benchmarks.generate_history import SCALES, generate_database, largest_guild, parse_scale
+
+# Timed calls per method and scale (after one untimed warm-up call).
+DEFAULT_ITERATIONS = 200
+# Results written per record_results_batch call, like a full write-queue flush.
+BATCH_SIZE = 64
+# Leaderboards timed for get_ranking_for_guild and get_rank_for_user: (statistic, metric, order).
+LEADERBOARDS = [
+    ("average", "combined", "DESC"),
+    ("record", "iq", "DESC"),
+    ("record", "monkey", "ASC"),
+    ("monkeyoff", "wins", "DESC"),
+    ("monkeyoff", "win_rate", "DESC"),
+]
+
+def _cases(db_manager: DatabaseManager, guild_id: int, user_ids: list[int], rng: random.Random) -> list[tuple[str, Callable[[], object]]]:
+    """Returns (name, call) for every method under test; each call picks fresh random arguments."""
+    def user() -> int:
+        return rng.choice(user_ids)
+    def analysis_row() -> tuple:
+        user_id = user()
+        return (user_id, guild_id, generate_weighted_iq(), rng.randint(0, 100), f"user{user_id}", DatabaseManager.utc_timestamp())
+    def monkeyoff_row() -> tuple:
+        challenger_id, opponent_id = user(), user()
+        cp, op = rng.randint(0, 100), rng.randint(0, 100)
+        winner_id = None if cp == op else (challenger_id if cp > op else opponent_id)
+        return (challenger_id, opponent_id, guild_id, cp, op, winner_id, DatabaseManager.utc_timestamp(), "challenger", "opponent")
+
+    cases = [
+        ("get_metadata", lambda: db_manager.get_metadata("benchmark")),
+        ("get_user_profile", lambda: db_manager.get_user_profile(user(), guild_id)),
+        ("get_usernames[10]", lambda: db_manager.get_usernames(guild_id, rng.sample(user_ids, min(10, len(user_ids))))),
+        ("get_monkeyoff_history_for_user", lambda: db_manager.get_monkeyoff_history_for_user(guild_id, user())),
+        ("get_monkeyoff_head_to_head", lambda: db_manager.get_monkeyoff_head_to_head(guild_id, user(), user())),
+    ]
+    for statistic, metric, order in LEADERBOARDS:
+        label = f"{statistic}/{metric}/{order}"
+        cases.append((f"get_ranking_for_guild[{label}]",
+                      lambda s=statistic, m=metric, o=order: db_manager.get_ranking_for_guild(guild_id, s, m, o)))
+        cases.append((f"get_rank_for_user[{label}]",
+                      lambda s=statistic, m=metric, o=order: db_manager.get_rank_for_user(guild_id, user(), s, m, o)))
+    cases += [
+        ("record_analysis_result", lambda: db_manager.record_analysis_result(*analysis_row()[:5], "guild")),
+        ("record_monkeyoff_result", lambda: db_manager.record_monkeyoff_result(*monkeyoff_row()[:6], "challenger", "opponent")),
+        (f"record_results_batch[{BATCH_SIZE}]", lambda: db_manager.record_results_batch(
+            [analysis_row() for _ in range(BATCH_SIZE // 2)], [monkeyoff_row() for _ in range(BATCH_SIZE // 2)])),
+    ]
+    return cases
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of pre-sorted values."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def benchmark_scale(path: str, iterations: int, profile: str, seed: int) -> dict[str, dict[str, float]]:
+    """Times every case against one database; returns {case: {p50_ms, p95_ms, mean_ms}}."""
+    guild_id, user_ids = largest_guild(path)
+    db_manager = DatabaseManager()
+    db_manager.configure_database_path(path, pool_size=1)
+    db_manager.configure_pragma_profile(profile)
+    db_manager.initialize_database()
+    rng = random.Random(seed)
+    results = {}
+    try:
+        for name, call in _cases(db_manager, guild_id, user_ids, rng):
+            call()
+            durations = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                call()
+                durations.append((time.perf_counter() - started) * 1000)
+            durations.sort()
+            results[name] = {
+                "p50_ms": _percentile(durations, 0.50),
+                "p95_ms": _percentile(durations, 0.95),
+                "mean_ms": statistics.fmean(durations),
+            }
+    finally:
+        db_manager.close()
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time DatabaseManager methods across database sizes.")
+    parser.add_argument("--scales", default="10k,1m", help=f"Comma-separated history sizes: {', '.join(SCALES)} or numbers.")
+    parser.add_argument("--data-dir", default=os.path.join("data", "benchmarks"), help="Where generated databases are kept.")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--profile", default="wal", help="DatabaseManager PRAGMA profile to benchmark with.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    # Silence the database manager's info logging so the table stays readable.
+    logging.getLogger("DB_Manager").setLevel(logging.WARNING)
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    for scale in scales:
+        rows = parse_scale(scale)
+        path = os.path.join(args.data_dir, f"history_{scale}_seed{args.seed}.db")
+        if not os.path.exists(path):
+            generate_database(path, rows, seed=args.seed)
+        print(f"Benchmarking {scale} ({rows:,} analysis rows, {os.path.getsize(path) / 1024 / 1024:,.1f} MiB)...", flush=True)
+        results[scale] = benchmark_scale(path, args.iterations, args.profile, args.seed)
+
+    # One row per method, p50 (p95) per scale: the scaling curve.
+    names = list(next(iter(results.values())))
+    width = max(len(name) for name in names)
+    print(f"\n{'method (p50 / p95 ms)':<{width}}  " + "  ".join(f"{scale:>17}" for scale in scales))
+    for name in names:
+        cells = [f"{results[scale][name]['p50_ms']:8.3f} /{results[scale][name]['p95_ms']:8.3f}" for scale in scales]
+        print(f"{name:<{width}}  " + "  ".join(cells))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as file:
+            json.dump({"iterations": args.iterations, "profile": args.profile, "results": results}, file, indent=2)
+        print(f"\nWrote {args.json_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
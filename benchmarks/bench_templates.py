@@ -0,0 +1,127 @@
+"""
+Microbenchmark for response rendering: raw str.format templates versus the precompiled templates.
+
+The "before" functions reproduce the previous rendering path (linear IQ range scan, per-call case and plural
+computation, str.format on the raw template). Both paths are first checked to produce identical text for the
+same random seed, then timed. Run from the repository root:
+
+    python -m benchmarks.bench_templates
+"""
+import random
+import sys
+import timeit
+from src.resources import analysis_responses, monkeyoff_responses
+from src.resources.monkey_types import get_random_monkey_type, get_plural_monkey_type
+
+# Number of renders per timing run.
+RENDERS = 50_000
+
+class _FakeMember:
+    """Stand-in for discord.Member; templates only use .mention."""
+    def __init__(self, user_id: int) -> None:
+        self.mention = f"<@{user_id}>"
+
+CHALLENGER = _FakeMember(1)
+OPPONENT = _FakeMember(2)
+
+def analysis_before(iq_score: int, monkey_percentage: int) -> str:
+    """Previous get_analysis_response implementation."""
+    iq_key = analysis_responses._find_iq_range_key(iq_score)
+    mp_key = analysis_responses._find_mp_range_key(monkey_percentage)
+    m_type = get_random_monkey_type()
+    m_type_lower = m_type.lower()
+    m_type_upper = m_type.upper()
+    m_type_plural_lower = get_plural_monkey_type(m_type_lower)
+    responses = analysis_responses.COMBINED_RESPONSES.get(iq_key, {}).get(mp_key, [])
+    return random.choice(responses).format(
+        iq_score=iq_score, monkey_percentage=monkey_percentage, m_type_lower=m_type_lower,
+        m_type_upper=m_type_upper, m_type_plural_lower=m_type_plural_lower,
+    )
+
+def monkeyoff_before(challenger_percentage: int, opponent_percentage: int, challenger_m_type: str, opponent_m_type: str) -> dict[str, str]:
+    """Previous get_monkeyoff_response implementation."""
+    if challenger_percentage > opponent_percentage:
+        m_type = challenger_m_type
+    elif challenger_percentage < opponent_percentage:
+        m_type = opponent_m_type
+    else:
+        m_type = random.choice([challenger_m_type, opponent_m_type])
+    m_type_lower = m_type.lower()
+    m_type_plural_lower = get_plural_monkey_type(m_type_lower)
+    kwargs = {
+        "m_type_lower": m_type_lower, "m_type_upper": m_type.upper(),
+        "m_type_plural_lower": m_type_plural_lower, "m_type_plural_upper": m_type_plural_lower.upper(),
+        "challenger": CHALLENGER, "opponent": OPPONENT,
+        "challenger_percentage": challenger_percentage, "opponent_percentage": opponent_percentage,
+    }
+    if challenger_percentage == opponent_percentage:
+        template = random.choice(monkeyoff_responses._TIE_RESPONSES)
+    else:
+        if challenger_percentage > opponent_percentage:
+            winner, loser, winner_percentage, loser_percentage = CHALLENGER, OPPONENT, challenger_percentage, opponent_percentage
+        else:
+            winner, loser, winner_percentage, loser_percentage = OPPONENT, CHALLENGER, opponent_percentage, challenger_percentage
+        kwargs.update({"winner": winner, "loser": loser, "winner_percentage": winner_percentage, "loser_percentage": loser_percentage})
+        if winner_percentage == 100:
+            responses = monkeyoff_responses._PERFECT_WIN_RESPONSES
+        elif loser_percentage == 0:
+            responses = monkeyoff_responses._ZERO_LOSS_RESPONSES
+        elif winner_percentage >= 75:
+            responses = monkeyoff_responses._STRONG_WIN_RESPONSES
+        elif loser_percentage <= 25:
+            responses = monkeyoff_responses._POOR_LOSS_RESPONSES
+        else:
+            responses = monkeyoff_responses._STANDARD_WIN_RESPONSES
+        template = random.choice(responses)
+    return {"title": template["title"].format(**kwargs), "description": template["description"].format(**kwargs)}
+
+def monkeyoff_after(challenger_percentage: int, opponent_percentage: int, challenger_m_type: str, opponent_m_type: str) -> dict[str, str]:
+    """Current get_monkeyoff_response, with the benchmark's fake members."""
+    return monkeyoff_responses.get_monkeyoff_response(CHALLENGER, challenger_percentage, OPPONENT, opponent_percentage, challenger_m_type, opponent_m_type)
+
+def _analysis_inputs(count: int) -> list[tuple[int, int]]:
+    """Random (iq_score, monkey_percentage) pairs covering every bucket."""
+    rng = random.Random(1)
+    return [(rng.randint(0, 200), rng.randint(0, 100)) for _ in range(count)]
+
+def _monkeyoff_inputs(count: int) -> list[tuple[int, int, str, str]]:
+    """Random monkey-off outcomes, including ties, perfect wins and zero losses."""
+    rng = random.Random(2)
+    return [(rng.randint(0, 100), rng.randint(0, 100), get_random_monkey_type(), get_random_monkey_type()) for _ in range(count)]
+
+def check_equivalence() -> int:
+    """Renders every input with both implementations under the same seed; returns the number of mismatches."""
+    mismatches = 0
+    for name, before, after, inputs in (
+        ("analysis", analysis_before, analysis_responses.get_analysis_response, _analysis_inputs(5000)),
+        ("monkeyoff", monkeyoff_before, monkeyoff_after, _monkeyoff_inputs(5000)),
+    ):
+        for seed, args in enumerate(inputs):
+            random.seed(seed)
+            expected = before(*args)
+            random.seed(seed)
+            if after(*args) != expected:
+                mismatches += 1
+                print(f"[FAIL] {name}{args} rendered differently")
+    return mismatches
+
+def _renders_per_second(render, inputs: list[tuple]) -> float:
+    """Best-of-5 throughput of rendering every input once."""
+    timer = timeit.Timer(lambda: [render(*args) for args in inputs])
+    return len(inputs) / min(timer.repeat(repeat=5, number=1))
+
+def main() -> int:
+    """Prints renders per second before and after; returns non-zero if the outputs differ."""
+    mismatches = check_equivalence()
+    print(f"Output equivalence: {'ok' if not mismatches else f'{mismatches} mismatch(es)'}")
+    for name, before, after, inputs in (
+        ("get_analysis_response", analysis_before, analysis_responses.get_analysis_response, _analysis_inputs(RENDERS)),
+        ("get_monkeyoff_response", monkeyoff_before, monkeyoff_after, _monkeyoff_inputs(RENDERS)),
+    ):
+        before_rate = _renders_per_second(before, inputs)
+        after_rate = _renders_per_second(after, inputs)
+        print(f"{name}: before {before_rate:,.0f}/s, after {after_rate:,.0f}/s ({after_rate / before_rate:.2f}x)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+EXPLAIN QUERY PLAN regression check for the leaderboard and duel history queries.
+
+Builds a small temporary database, asks SQLite how it would run each query and fails if a plan touches
+user_analysis_history or monkeyoff_history other than through an index seek, or scans a whole table
+instead of searching by guild. Run from the repository root:
+
+    python -m benchmarks.check_query_plans
+"""
+import os
+import random
+import sys
+import tempfile
+from src.core import database
+from src.core.database import DatabaseManager
+
+# Plan fragments that mean a query has regressed to O(history rows) or O(all guilds).
+FORBIDDEN_PLAN_FRAGMENTS = [
+    "SCAN user_analysis_history",
+    "SCAN user_analysis_stats",
+    "SCAN user_profiles",
+    "SCAN other",
+    "SCAN monkeyoff_history",
+    "SCAN monkeyoff_rollups",
+]
+
+def build_database(path: str) -> DatabaseManager:
+    """Creates a database with a little history so the planner has statistics to work with."""
+    db_manager = DatabaseManager()
+    db_manager.configure_database_path(path, pool_size=1)
+    db_manager.initialize_database()
+    analysis_rows = [
+        (random.randint(1, 50), random.randint(1, 3), random.randint(0, 200), random.randint(0, 100), "user", DatabaseManager.utc_timestamp())
+        for _ in range(2000)
+    ]
+    monkeyoff_rows = []
+    for _ in range(2000):
+        challenger_id, opponent_id = random.sample(range(1, 51), 2)
+        monkeyoff_rows.append((challenger_id, opponent_id, random.randint(1, 3), 60, 40, challenger_id,
+                               DatabaseManager.utc_timestamp(), "challenger", "opponent"))
+    db_manager.record_results_batch(analysis_rows, monkeyoff_rows)
+    with db_manager._get_connection() as conn:
+        conn.execute("ANALYZE")
+    return db_manager
+
+def collect_queries() -> list[tuple[str, str, tuple, str | None]]:
+    """Returns (name, query, params, required plan fragment) for every leaderboard and duel history query."""
+    queries = []
+    # Ranked leaderboards and the target user's rank on each.
+    sources = [(f"average_{metric}", source) for metric, source in database.ANALYSIS_AVERAGE_RANKING_SOURCES.items()]
+    sources += [(f"record_max_{metric}", ("user_analysis_stats", f"max_{metric}", "analysis_count > 0")) for metric in ("combined", "iq", "monkey")]
+    sources += [(f"monkeyoff_{metric}", source) for metric, source in database.MONKEYOFF_RANKING_SOURCES.items()]
+    for name, (table, value_expression, row_filter) in sources:
+        ranking = database.SELECT_RANKING_BASE.format(table=table, value_expression=value_expression, row_filter=row_filter, direction="DESC")
+        rank = database.SELECT_RANK_FOR_USER_BASE.format(table=table, value_expression=value_expression, row_filter=row_filter, ahead=">")
+        queries.append((f"ranking_{name}", ranking, (1, 10), None))
+        queries.append((f"rank_for_user_{name}", rank, (1, 1), None))
+    # Bulk display-name lookup for a rendered leaderboard.
+    usernames = database.SELECT_USERNAMES_FOR_GUILD_BASE.format(placeholders=", ".join("?" * 10))
+    queries.append(("usernames_for_guild", usernames, (1, *range(10)), None))
+    # Paginated duel history and head-to-head records.
+    side = (1, 1, 1000, 10)
+    queries.append(("monkeyoff_history_page", database.SELECT_USER_MONKEYOFF_HISTORY_PAGE, (*side, *side, 10), None))
+    queries.append(("monkeyoff_history_chunk", database.SELECT_USER_MONKEYOFF_HISTORY_CHUNK, (*side, *side, 10), None))
+    queries.append(("monkeyoff_head_to_head", database.SELECT_MONKEYOFF_HEAD_TO_HEAD, (1, 2, 1, 1, 2, 2, 1), None))
+    queries.append(("monkeyoff_rollups_for_user", database.SELECT_HAS_MONKEYOFF_ROLLUPS_FOR_USER, (1, 1), None))
+    return queries
+
+def main() -> int:
+    """Prints each query plan and returns a non-zero exit code on regression."""
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_manager = build_database(os.path.join(tmp_dir, "plans.db"))
+        try:
+            for name, query, params, required_fragment in collect_queries():
+                plan = db_manager.explain_query_plan(query, params)
+                bad = [line for line in plan if any(fragment in line for fragment in FORBIDDEN_PLAN_FRAGMENTS)]
+                if required_fragment and not any(required_fragment in line for line in plan):
+                    bad.append(f"missing '{required_fragment}'")
+                status = "FAIL" if bad else "ok"
+                failures += bool(bad)
+                print(f"[{status}] {name}")
+                for line in plan:
+                    print(f"    {line}")
+        finally:
+            db_manager.close()
+    print(f"{failures} query plan regression(s) found." if failures else "All query plans use indexes.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
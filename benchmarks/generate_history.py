@@ -0,0 +1,221 @@
+"""
+Synthetic history generator: fills a database with realistic analysis and monkey-off history for scale tests.
+
+Guild sizes and per-user activity follow heavy-tailed (Pareto) distributions, so a few large guilds and
+regulars produce most of the rows, as in production. IQ scores come from generate_weighted_iq and monkey
+percentages are uniform over the configured range. Timestamps rise steadily over the past year in insertion
+order. History is loaded without indexes; the indexes and user_analysis_stats are then built by
+DatabaseManager.initialize_database, exactly as they would be for a migrated production database.
+Run from the repository root:
+
+    python -m benchmarks.generate_history data/history_1m.db --rows 1m
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from src.core import constants, database
+from src.core.database import DatabaseManager
+from src.resources.analysis_responses import generate_weighted_iq
+
+# Named scales: number of user_analysis_history rows.
+SCALES = {"10k": 10_000, "1m": 1_000_000, "50m": 50_000_000}
+# Monkey-off history rows per analysis history row.
+MONKEYOFF_RATIO = 0.25
+# Average analysis rows per user; sets the number of users for a scale.
+ROWS_PER_USER = 50
+# Rows generated and inserted per executemany call.
+CHUNK_SIZE = 100_000
+# Span of generated timestamps, ending now.
+HISTORY_SPAN = timedelta(days=365)
+# First generated user ID; offsets IDs into a snowflake-like range.
+FIRST_USER_ID = 100_000_000_000_000_000
+# First generated guild ID.
+FIRST_GUILD_ID = 900_000_000_000_000_000
+
+@dataclass
+class _UserCounters:
+    """Profile counters accumulated while generating history."""
+    tests_taken: int = 0
+    last_iq: int | None = None
+    last_monkey: int | None = None
+    wins: int = 0
+    losses: int = 0
+    monkeyoffs: int = 0
+
+@dataclass
+class _Population:
+    """Generated users and the weights their activity is drawn with."""
+    members: list[tuple[int, int]]
+    cum_weights: list[float]
+    # guild_id -> user IDs in that guild, for drawing monkey-off opponents.
+    guild_members: dict[int, list[int]] = field(default_factory=dict)
+
+def parse_scale(value: str) -> int:
+    """Parses a row count given as a named scale ('1m') or a plain number ('250000')."""
+    return SCALES.get(value.lower()) or int(value.replace("_", ""))
+
+def default_guild_count(rows: int) -> int:
+    """Number of guilds for a scale: grows with the square root of the history size."""
+    return max(3, int(rows ** 0.5) // 20)
+
+def _build_population(rng: random.Random, users: int, guilds: int) -> _Population:
+    """Spreads users over guilds with Pareto-distributed guild sizes, and gives each a Pareto activity weight."""
+    guild_ids = [FIRST_GUILD_ID + i for i in range(guilds)]
+    guild_cum_weights = list(itertools.accumulate(rng.paretovariate(1.2) for _ in guild_ids))
+    population = _Population(members=[], cum_weights=[])
+    activity = []
+    for i in range(users):
+        user_id = FIRST_USER_ID + i
+        guild_id = rng.choices(guild_ids, cum_weights=guild_cum_weights)[0]
+        population.members.append((user_id, guild_id))
+        population.guild_members.setdefault(guild_id, []).append(user_id)
+        activity.append(rng.paretovariate(1.5))
+    population.cum_weights = list(itertools.accumulate(activity))
+    return population
+
+def _timestamps(start: datetime, step: timedelta, first_index: int, count: int) -> list[int]:
+    """Evenly spaced timestamps in the stored format (epoch seconds), continuing from row `first_index`."""
+    return [int((start + step * (first_index + i)).timestamp()) for i in range(count)]
+
+def _create_tables(conn: sqlite3.Connection) -> None:
+    """Creates the history tables without their indexes, which are cheaper to build after loading."""
+    for create_sql in (database.CREATE_USER_PROFILES_TABLE, database.CREATE_USER_ANALYSIS_HISTORY_TABLE,
+                       database.CREATE_MONKEYOFF_HISTORY_TABLE, database.CREATE_USER_ANALYSIS_STATS_TABLE,
+                       database.CREATE_BOT_METADATA_TABLE):
+        conn.execute(create_sql)
+
+def _load_analysis_history(conn: sqlite3.Connection, population: _Population, rows: int, start: datetime, step: timedelta,
+                           counters: dict[tuple[int, int], _UserCounters], rng: random.Random) -> None:
+    """Inserts `rows` analysis results in chunks, tracking each user's profile counters."""
+    for offset in range(0, rows, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, rows - offset)
+        members = rng.choices(population.members, cum_weights=population.cum_weights, k=count)
+        chunk = []
+        for (user_id, guild_id), timestamp in zip(members, _timestamps(start, step, offset, count)):
+            iq_score = generate_weighted_iq()
+            monkey_percentage = rng.randint(constants.MIN_MONKEY_PERCENTAGE, constants.MAX_MONKEY_PERCENTAGE)
+            chunk.append((user_id, guild_id, iq_score, monkey_percentage, timestamp))
+            user = counters[(user_id, guild_id)]
+            user.tests_taken += 1
+            user.last_iq, user.last_monkey = iq_score, monkey_percentage
+        with conn:
+            conn.executemany(database.INSERT_ANALYSIS_HISTORY, chunk)
+
+def _load_monkeyoff_history(conn: sqlite3.Connection, population: _Population, rows: int, start: datetime, step: timedelta,
+                            counters: dict[tuple[int, int], _UserCounters], rng: random.Random) -> None:
+    """Inserts `rows` monkey-offs between members of the same guild, tracking wins and losses."""
+    for offset in range(0, rows, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, rows - offset)
+        challengers = rng.choices(population.members, cum_weights=population.cum_weights, k=count)
+        chunk = []
+        for (challenger_id, guild_id), timestamp in zip(challengers, _timestamps(start, step, offset, count)):
+            opponent_id = rng.choice(population.guild_members[guild_id])
+            if opponent_id == challenger_id:
+                # Single-member guilds (and self-draws) have no one to challenge.
+                continue
+            challenger_percentage = rng.randint(constants.MIN_MONKEY_PERCENTAGE, constants.MAX_MONKEY_PERCENTAGE)
+            opponent_percentage = rng.randint(constants.MIN_MONKEY_PERCENTAGE, constants.MAX_MONKEY_PERCENTAGE)
+            if challenger_percentage == opponent_percentage:
+                winner_id = None
+            else:
+                winner_id = challenger_id if challenger_percentage > opponent_percentage else opponent_id
+            chunk.append((challenger_id, opponent_id, guild_id, challenger_percentage, opponent_percentage, winner_id, timestamp))
+            for user_id in (challenger_id, opponent_id):
+                user = counters[(user_id, guild_id)]
+                user.monkeyoffs += 1
+                if winner_id == user_id:
+                    user.wins += 1
+                elif winner_id is not None:
+                    user.losses += 1
+        with conn:
+            conn.executemany(database.INSERT_MONKEYOFF_HISTORY, chunk)
+
+def generate_database(path: str, rows: int, monkeyoff_rows: int | None = None, guilds: int | None = None,
+                      seed: int = 1, verbose: bool = True) -> None:
+    """
+    Creates a database at `path` (which must not exist) with `rows` analysis results and, by default,
+    MONKEYOFF_RATIO as many monkey-offs, spread over `guilds` guilds. The same seed produces the same database.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists.")
+    monkeyoff_rows = int(rows * MONKEYOFF_RATIO) if monkeyoff_rows is None else monkeyoff_rows
+    guilds = guilds or default_guild_count(rows)
+    users = max(guilds * 2, rows // ROWS_PER_USER)
+    # generate_weighted_iq draws from the module-level generator, so seed both.
+    rng = random.Random(seed)
+    random.seed(seed)
+    started = time.perf_counter()
+    def report(message: str) -> None:
+        if verbose:
+            print(f"[{time.perf_counter() - started:7.1f}s] {message}", flush=True)
+
+    population = _build_population(rng, users, guilds)
+    counters = {member: _UserCounters() for member in population.members}
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    start = end - HISTORY_SPAN
+    report(f"Generating {rows:,} analysis and {monkeyoff_rows:,} monkey-off rows for {users:,} users in {guilds:,} guilds.")
+
+    db_dir = os.path.dirname(path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        # The file is disposable until generation finishes, so skip durability while loading.
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        _create_tables(conn)
+        _load_analysis_history(conn, population, rows, start, HISTORY_SPAN / max(1, rows), counters, rng)
+        report("Loaded user_analysis_history.")
+        _load_monkeyoff_history(conn, population, monkeyoff_rows, start, HISTORY_SPAN / max(1, monkeyoff_rows), counters, rng)
+        report("Loaded monkeyoff_history.")
+        with conn:
+            conn.executemany(
+                "INSERT INTO user_profiles (user_id, guild_id, username, last_iq_score, last_monkey_percentage, "
+                "analysis_tests_taken, monkeyoff_wins, monkeyoff_losses, total_monkeyoffs) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(user_id, guild_id, f"user{user_id - FIRST_USER_ID}", c.last_iq, c.last_monkey, c.tests_taken, c.wins, c.losses, c.monkeyoffs)
+                 for (user_id, guild_id), c in counters.items() if c.tests_taken or c.monkeyoffs],
+            )
+        report("Loaded user_profiles.")
+    finally:
+        conn.close()
+
+    # Build the indexes and backfill user_analysis_stats through the bot's own initialization.
+    db_manager = DatabaseManager()
+    db_manager.configure_database_path(path, pool_size=1)
+    db_manager.initialize_database()
+    with db_manager._get_connection() as conn:
+        conn.execute("ANALYZE")
+    db_manager.close()
+    report(f"Built indexes and stats; {os.path.getsize(path) / 1024 / 1024:,.1f} MiB on disk.")
+
+def largest_guild(path: str) -> tuple[int, list[int]]:
+    """Returns the guild with the most profiles in a generated database, and its user IDs."""
+    conn = sqlite3.connect(path)
+    try:
+        guild_id = conn.execute(
+            "SELECT guild_id FROM user_profiles GROUP BY guild_id ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()[0]
+        user_ids = [row[0] for row in conn.execute("SELECT user_id FROM user_profiles WHERE guild_id = ?", (guild_id,))]
+        return guild_id, user_ids
+    finally:
+        conn.close()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate a database with synthetic history.")
+    parser.add_argument("path", help="Database file to create.")
+    parser.add_argument("--rows", default="10k", help=f"Analysis history rows: {', '.join(SCALES)} or a number.")
+    parser.add_argument("--monkeyoff-rows", type=int, default=None, help=f"Monkey-off rows (default: {MONKEYOFF_RATIO:g} x rows).")
+    parser.add_argument("--guilds", type=int, default=None, help="Number of guilds (default grows with rows).")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    generate_database(args.path, parse_scale(args.rows), args.monkeyoff_rows, args.guilds, args.seed)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,115 @@
 import asyncio
+import ipaddress
+import os
 from aiohttp import web
 from src.bot import DrMonkey
-from src.core.logging import setup_logging, get_logger
+from src.core.logging import setup_logging, shutdown_logging, get_logger
 from src.core.database import DatabaseManager
+from src.core.snapshots import DatabaseSnapshotter, available_compressions, iter_file_chunks
+from src.core.metrics import REGISTRY
+from src.core import constants
 from src import config
-# Configure logging for the application.
-setup_logging(
-    log_level_str=config.LOG_LEVEL,
-    log_file_path=config.LOG_FILE_PATH,
-    log_to_file=False
-)
 # Initialize the application-wide logger.
 app_logger = get_logger("DrMonkey")
 
-async def download_db_handler(request: web.Request) -> web.Response:
-    """Handles requests to download the database file."""
+# File extension of the downloaded backup per compression format.
+DOWNLOAD_EXTENSIONS = {"identity": "", "gzip": ".gz", "zstd": ".zst"}
+
+async def download_db_handler(request: web.Request) -> web.StreamResponse:
+    """
+    Streams a consistent snapshot of the database.
+    Supports ?compression=gzip|zstd and, for uncompressed downloads, HTTP Range requests (resume) against
+    the same snapshot for as long as it stays fresh.
+    """
     # Check for secret key in query parameters
     secret = request.query.get("secret")
     if not secret or secret != config.DOWNLOAD_SECRET:
         app_logger.warning("Unauthorized attempt to download database.")
         return web.Response(text="Unauthorized", status=403)
 
-    db_path = config.DATABASE_FILE_PATH
-    if not db_path:
+    if not config.DATABASE_FILE_PATH:
         app_logger.error("DATABASE_FILE_PATH is not configured. Cannot serve download.")
         return web.Response(text="Database path not configured on server.", status=500)
 
+    compression = request.query.get("compression", "identity")
+    if compression != "identity" and compression not in available_compressions():
+        return web.Response(text=f"Unsupported compression '{compression}'. Available: {', '.join(available_compressions())}.", status=400)
+
+    # Limit concurrent downloads; each one holds a snapshot and streams from disk.
+    download_slots: asyncio.Semaphore = request.app["download_slots"]
+    if download_slots.locked():
+        return web.Response(text="Too many downloads in progress. Try again later.", status=503, headers={"Retry-After": "30"})
+
+    snapshotter: DatabaseSnapshotter = request.app["snapshotter"]
+    response: web.StreamResponse | None = None
     try:
-        app_logger.info(f"Authorized database download request received. Serving file from {db_path}")
-        return web.FileResponse(path=db_path, headers={
-            "CONTENT-DISPOSITION": "attachment; filename=\"dr_monkey_backup.db\""
-        })
-    except FileNotFoundError:
-        app_logger.error(f"Database file not found at configured path: {db_path}")
-        return web.Response(text="Database file not found on server.", status=404)
+        async with download_slots, snapshotter.acquire() as snapshot:
+            if snapshot is None:
+                return web.Response(text="Could not create a database snapshot.", status=500)
+
+            etag = f'"{os.path.basename(snapshot.path)}-{snapshot.size}"'
+            filename = f"dr_monkey_backup.db{DOWNLOAD_EXTENSIONS[compression]}"
+            response = web.StreamResponse(headers={
+                "CONTENT-DISPOSITION": f"attachment; filename=\"{filename}\"",
+                "ETag": etag,
+            })
+            start, end = 0, snapshot.size
+            if compression == "identity":
+                response.headers["Accept-Ranges"] = "bytes"
+                # Only honour a Range against the same snapshot (If-Range must match, when given).
+                if_range = request.headers.get("If-Range")
+                if "Range" in request.headers and (if_range is None or if_range == etag):
+                    try:
+                        requested = request.http_range
+                    except ValueError:
+                        requested = slice(None, None)
+                    start, end = requested.start or 0, min(requested.stop if requested.stop is not None else snapshot.size, snapshot.size)
+                    if start < 0:
+                        start = max(0, snapshot.size + start)
+                    if start >= snapshot.size or start >= end:
+                        return web.Response(status=416, headers={"Content-Range": f"bytes */{snapshot.size}"})
+                    response.set_status(206)
+                    response.headers["Content-Range"] = f"bytes {start}-{end - 1}/{snapshot.size}"
+                response.content_length = end - start
+            else:
+                response.content_type = "application/gzip" if compression == "gzip" else "application/zstd"
+                response.enable_chunked_encoding()
+
+            app_logger.info(f"Authorized database download request received. Streaming snapshot bytes {start}-{end} ({compression}).")
+            await response.prepare(request)
+            async for chunk in iter_file_chunks(snapshot.path, constants.DOWNLOAD_CHUNK_BYTES, start, end, compression):
+                await response.write(chunk)
+            await response.write_eof()
+            return response
+    except ConnectionResetError:
+        app_logger.info("Database download cancelled by the client.")
+        raise
     except Exception as e:
         app_logger.error(f"An error occurred during database download: {e}", exc_info=True)
+        # Once streaming has started the status can't change; let aiohttp drop the connection.
+        if response is not None and response.prepared:
+            raise
         return web.Response(text="An internal server error occurred.", status=500)
 
+def _is_loopback(address: str | None) -> bool:
+    """Whether a peer address is the local host."""
+    try:
+        return address is not None and ipaddress.ip_address(address).is_loopback
+    except ValueError:
+        return False
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """
+    Serves the bot's metrics in the Prometheus text exposition format.
+    Requires the METRICS_SECRET when one is set, and otherwise only answers scrapes from the local host.
+    """
+    if config.METRICS_SECRET:
+        if request.query.get("secret") != config.METRICS_SECRET:
+            return web.Response(text="Unauthorized", status=403)
+    elif not _is_loopback(request.remote):
+        return web.Response(text="Unauthorized", status=403)
+    return web.Response(body=REGISTRY.render().encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
 async def run_bot():
     """Configures, connects, and runs the bot and web server, ensuring cleanup."""
     # Check if the Discord token is available.
@@ -50,16 +122,37 @@ async def run_bot():
 
     # Initialize the database manager and configure its path.
     db_manager = DatabaseManager()
-    db_manager.configure_database_path(config.DATABASE_FILE_PATH)
+    db_manager.configure_database_path(config.DATABASE_FILE_PATH, pool_size=config.DATABASE_POOL_SIZE or None)
+    db_manager.configure_pragma_profile(
+        config.DATABASE_PRAGMA_PROFILE,
+        cache_size=config.DATABASE_CACHE_SIZE,
+        mmap_size=config.DATABASE_MMAP_SIZE,
+    )
+    if config.HISTORY_ARCHIVE_DIR:
+        db_manager.configure_history_archive(config.HISTORY_ARCHIVE_DIR)
     
     # Create an instance of the bot.
     bot = DrMonkey(db_manager=db_manager)
 
     # --- Setup aiohttp web server ---
     app = web.Application()
+    # Snapshots are written next to the database so they land on the same volume.
+    snapshotter = DatabaseSnapshotter(
+        db_manager,
+        directory=os.path.dirname(os.path.abspath(config.DATABASE_FILE_PATH)) if config.DATABASE_FILE_PATH else None,
+        ttl_seconds=constants.DB_SNAPSHOT_TTL_SECONDS,
+        pages_per_step=constants.DB_BACKUP_PAGES_PER_STEP,
+        step_sleep=constants.DB_BACKUP_STEP_SLEEP_SECONDS,
+        max_restarts=constants.DB_BACKUP_MAX_RESTARTS,
+    )
+    app["snapshotter"] = snapshotter
+    app["download_slots"] = asyncio.Semaphore(constants.DOWNLOAD_MAX_CONCURRENT)
     if config.DOWNLOAD_SECRET:
         app.router.add_get("/download-db", download_db_handler)
         app_logger.info("Database download endpoint is enabled at /download-db")
+    app.router.add_get("/metrics", metrics_handler)
+    if not config.METRICS_SECRET:
+        app_logger.info("METRICS_SECRET is not set. /metrics only answers scrapes from localhost.")
 
     runner = web.AppRunner(app)
     await runner.setup()
@@ -75,14 +168,30 @@ async def run_bot():
         # Ensure the bot, web server, and database connection are properly closed on shutdown.
         await bot.close()
         await runner.cleanup() # Gracefully shut down the web server
+        snapshotter.close()
         app_logger.info("Bot has been shut down and database connection closed.")
 
 def main():
     """Main entry point to run the asynchronous bot."""
+    # Configure logging here rather than at import time: spawned plot render workers re-import this module
+    # as __mp_main__, and must not open the log file or start a log writer thread of their own.
+    setup_logging(
+        log_level_str=config.LOG_LEVEL,
+        log_file_path=config.LOG_FILE_PATH,
+        log_to_file=bool(config.LOG_FILE_PATH),
+        use_queue=config.LOG_QUEUE_ENABLED,
+        queue_size=config.LOG_QUEUE_SIZE,
+        json_format=config.LOG_FORMAT == "json",
+        max_bytes=config.LOG_FILE_MAX_BYTES,
+        backup_count=config.LOG_FILE_BACKUP_COUNT,
+    )
     try:
         asyncio.run(run_bot())
     except KeyboardInterrupt:
         app_logger.info("Bot shutdown requested by user.")
+    finally:
+        # Write out any log records still queued.
+        shutdown_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
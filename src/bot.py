@@ -1,8 +1,20 @@
 import discord
-from discord.ext import commands
+import hashlib
+import json
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from discord.ext import commands, tasks
 from discord import app_commands
 from src.core.database import DatabaseManager
+from src.core.write_queue import WriteBehindQueue
+from src.core.edit_scheduler import DelayedEditScheduler
+from src.core.executor import InstrumentedThreadPoolExecutor
+from src.core.loop_monitor import EventLoopLagMonitor
+from src.core.metrics import REGISTRY, Gauge
 from src.core.logging import get_logger
+from src.utils.plot_renderer import PlotRenderer, default_worker_count
+from src.utils.plot_utils import plot_cache
 from src import config
 from src.core import constants
 # Initialize the logger for the bot.
@@ -15,13 +27,80 @@ intents.members = True
 class DrMonkey(commands.Bot):
     """Custom Discord bot class with database integration and error handling."""
     def __init__(self, db_manager: DatabaseManager) -> None:
+        # Reference point for the startup timing report.
+        self.created_at = time.perf_counter()
         # Initialize the base commands.Bot class.
         super().__init__(command_prefix="!", intents=intents)
         # Store the database manager instance.
         self.db_manager = db_manager
+        # Batches result writes from commands into shared transactions.
+        self.write_queue = WriteBehindQueue(
+            db_manager,
+            max_batch_size=config.WRITE_QUEUE_MAX_BATCH_SIZE,
+            retry_attempts=constants.WRITE_QUEUE_RETRY_ATTEMPTS,
+            retry_base_delay=constants.WRITE_QUEUE_RETRY_BASE_DELAY_SECONDS,
+        )
+        # Renders plots in worker processes, off the event loop.
+        self.plot_renderer = PlotRenderer(
+            max_workers=config.PLOT_RENDER_WORKERS or default_worker_count(),
+            max_pending=constants.PLOT_RENDER_MAX_PENDING,
+        )
+        # Applies delayed compact edits of command responses from one task.
+        self.edit_scheduler = DelayedEditScheduler(self, max_edits_per_second=constants.COMPACT_EDIT_MAX_PER_SECOND)
+        # Samples event loop lag, and reports the stack of callbacks that block the loop past the threshold.
+        self.loop_monitor = EventLoopLagMonitor(
+            interval=constants.LOOP_LAG_SAMPLE_INTERVAL_SECONDS,
+            stall_threshold=config.LOOP_WATCHDOG_THRESHOLD_MS / 1000,
+            stack_sample_rate=config.LOOP_WATCHDOG_STACK_SAMPLE_RATE,
+            stack_depth=constants.LOOP_WATCHDOG_STACK_DEPTH,
+        )
+        # The default executor, created in setup_hook; kept so its saturation can be reported.
+        self.executor: InstrumentedThreadPoolExecutor | None = None
+        # Whether /analyze responds before its result is persisted.
+        self.analyze_respond_first = config.ANALYZE_RESPOND_FIRST
         self.bot_channel_ids = config.BOT_CHANNEL_IDS
         self.whitelisted_servers = config.WHITELISTED_GUILD_IDS
         self.tree.on_error = self.on_app_command_error
+        self._register_metrics()
+
+    def _register_metrics(self) -> None:
+        """Registers gauges that read the bot's components at scrape time."""
+        def executor_samples():
+            if self.executor is None:
+                return []
+            return [
+                ({"state": "max_workers"}, self.executor.max_workers),
+                ({"state": "running"}, self.executor.running),
+                ({"state": "queued"}, self.executor.queued),
+            ]
+        def gateway_latency_samples():
+            # latency is nan/inf until the first heartbeat is acknowledged.
+            return [({}, self.latency)] if math.isfinite(self.latency) else []
+        def write_queue_samples():
+            stats = self.write_queue.stats
+            return [
+                ({"state": "pending"}, self.write_queue.depth),
+                ({"state": "detached_in_flight"}, self.write_queue.detached_in_flight),
+                ({"state": "flushed_items"}, stats.flushed_items),
+                ({"state": "failed_items"}, stats.failed_items),
+                ({"state": "retried_items"}, stats.retried_items),
+                ({"state": "dropped_items"}, stats.dropped_items),
+            ]
+        def cache_samples():
+            samples = []
+            for name, cache in (("leaderboard", self.db_manager.leaderboard_cache), ("plot", plot_cache)):
+                samples.append(({"cache": name, "counter": "entries"}, len(cache)))
+                for counter in ("hits", "misses", "evictions", "invalidations"):
+                    samples.append(({"cache": name, "counter": counter}, getattr(cache.stats, counter)))
+            samples.append(({"cache": "plot", "counter": "bytes"}, plot_cache.size_bytes))
+            return samples
+
+        REGISTRY.register(Gauge("drmonkey_executor_workers", "Default executor: configured maximum threads, and running and queued work items.", executor_samples))
+        REGISTRY.register(Gauge("drmonkey_gateway_latency_seconds", "Discord gateway heartbeat latency.", gateway_latency_samples))
+        REGISTRY.register(Gauge("drmonkey_write_queue", "Write-behind queue depth and item counters.", write_queue_samples))
+        REGISTRY.register(Gauge("drmonkey_cache", "Leaderboard and plot cache sizes and counters.", cache_samples))
+        REGISTRY.register(Gauge("drmonkey_pending_compact_edits", "Delayed compact edits waiting to fire.", lambda: [({}, self.edit_scheduler.pending)]))
+        REGISTRY.register(Gauge("drmonkey_event_loop_last_lag_seconds", "Most recent event loop lag sample.", lambda: [({}, self.loop_monitor.last_lag)]))
 
     async def on_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         """Global error handler for all application commands."""
@@ -75,14 +154,49 @@ class DrMonkey(commands.Bot):
     async def setup_hook(self) -> None:
         """Performs setup tasks before the bot connects to Discord."""
         app_logger.info("Running setup_hook...")
-        # Initialize the database tables.
-        self.db_manager.initialize_database()
+        # Phase durations for the startup timing report: (phase, seconds).
+        timings: list[tuple[str, float]] = []
+        setup_started = phase_started = time.perf_counter()
+        def end_phase(name: str) -> None:
+            nonlocal phase_started
+            now = time.perf_counter()
+            timings.append((name, now - phase_started))
+            phase_started = now
+
+        # Size the default executor to the connection pool so every worker thread owns one pooled connection.
+        self.executor = InstrumentedThreadPoolExecutor(max_workers=self.db_manager.pool_size, thread_name_prefix="DrMonkeyWorker")
+        self.loop.set_default_executor(self.executor)
+        # Initialize the database tables on the executor: migrations can take a while on large databases,
+        # and the web server shares this event loop.
+        await self.loop.run_in_executor(None, self.db_manager.initialize_database)
+        end_phase("database")
+        # Start batching result writes.
+        self.write_queue.start()
+        # Start applying delayed compact edits.
+        self.edit_scheduler.start()
+        # Start sampling event loop lag and watching for blocking callbacks.
+        self.loop_monitor.start()
+        # Periodically truncate the write-ahead log so it doesn't grow unbounded under constant reads.
+        if self.db_manager.uses_wal and config.DATABASE_WAL_CHECKPOINT_INTERVAL_SECONDS > 0:
+            self.wal_checkpoint_loop.change_interval(seconds=config.DATABASE_WAL_CHECKPOINT_INTERVAL_SECONDS)
+            self.wal_checkpoint_loop.start()
+        
+        # Convert history timestamps left from before they were stored as epoch seconds, a chunk at a time.
+        if self.db_manager.timestamp_backfill_pending:
+            self.timestamp_backfill_loop.change_interval(seconds=constants.TIMESTAMP_BACKFILL_INTERVAL_SECONDS)
+            self.timestamp_backfill_loop.start()
+
+        # Periodically roll history older than the retention window up into summaries.
+        if config.HISTORY_RETENTION_DAYS > 0:
+            self.history_retention_loop.change_interval(seconds=constants.HISTORY_RETENTION_INTERVAL_SECONDS)
+            self.history_retention_loop.start()
         
         # Log the status of the server whitelist.
         if not self.whitelisted_servers: # If the list is empty, all guilds are allowed.
             app_logger.info("No whitelisted servers configured. The bot will respond to commands in all servers.")
         else:
             app_logger.info(f"Server whitelist loaded. The bot will only respond in guilds: {self.whitelisted_servers}")
+        end_phase("background tasks")
         
         # Define paths for cogs to load.
         cogs_to_load = [
@@ -98,14 +212,89 @@ class DrMonkey(commands.Bot):
                 app_logger.info(f"Successfully loaded cog: {cog_path}")
             except Exception as e:
                 app_logger.error(f"Failed to load '{cog_path}' cog.", exc_info=e)
+            end_phase(f"cog {cog_path.rsplit('.', 1)[-1]}")
+
+        # Sync application commands with Discord, unless they are unchanged since the last sync.
+        await self.sync_commands_if_changed(force=config.FORCE_COMMAND_SYNC)
+        end_phase("command sync")
+
+        # Log where setup time went, so cold-start regressions are visible.
+        report = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings)
+        app_logger.info(
+            f"Startup timing: setup_hook {(time.perf_counter() - setup_started) * 1000:.0f} ms ({report}); "
+            f"{(setup_started - self.created_at) * 1000:.0f} ms from bot creation to setup_hook."
+        )
+
+    def command_tree_hash(self) -> str:
+        """Returns a stable hash of the global command tree as it would be sent to Discord."""
+        payload = sorted((command.to_dict(self.tree) for command in self.tree.get_commands()), key=lambda c: (c["type"], c["name"]))
+        # Include the application ID so a database reused with another bot token still syncs.
+        serialized = json.dumps({"application_id": self.application_id, "commands": payload}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    async def sync_commands_if_changed(self, force: bool = False) -> bool:
+        """
+        Syncs the global command tree only if its hash differs from the last successful sync (or if forced).
+        Returns True if a sync was performed.
+        """
+        tree_hash = self.command_tree_hash()
+        synced_hash = await self.loop.run_in_executor(None, self.db_manager.get_metadata, constants.COMMAND_TREE_HASH_METADATA_KEY)
+        if not force and tree_hash == synced_hash:
+            app_logger.info("Application commands unchanged since last sync; skipping sync.")
+            return False
 
-        # Sync application commands with Discord.
         synced = await self.tree.sync()
-        app_logger.info(f"Synced {len(synced)} application commands.")
+        app_logger.info(f"Synced {len(synced)} application commands{' (forced)' if force else ''}.")
+        # Only remember the hash once Discord has accepted the tree.
+        await self.loop.run_in_executor(None, self.db_manager.set_metadata, constants.COMMAND_TREE_HASH_METADATA_KEY, tree_hash)
+        return True
+
+    async def close(self) -> None:
+        """Applies pending compact edits, closes the Discord connection, flushes pending writes, then releases pooled database connections."""
+        # Pending edits need the HTTP session, so drain them before the connection is closed.
+        await self.edit_scheduler.close(timeout=constants.COMPACT_EDIT_DRAIN_TIMEOUT_SECONDS)
+        await super().close()
+        self.wal_checkpoint_loop.cancel()
+        self.history_retention_loop.cancel()
+        self.timestamp_backfill_loop.cancel()
+        await self.loop_monitor.close()
+        await self.write_queue.close()
+        if self.db_manager.uses_wal:
+            self.db_manager.checkpoint_wal()
+        self.db_manager.close()
+        self.plot_renderer.close()
+
+    @tasks.loop(minutes=5)
+    async def wal_checkpoint_loop(self) -> None:
+        """Runs wal_checkpoint(TRUNCATE) in the executor."""
+        result = await self.loop.run_in_executor(None, self.db_manager.checkpoint_wal)
+        if result:
+            busy, wal_pages, checkpointed = result
+            app_logger.debug(f"WAL checkpoint: busy={busy}, wal_pages={wal_pages}, checkpointed={checkpointed}.")
+
+    @tasks.loop(hours=1)
+    async def history_retention_loop(self) -> None:
+        """Rolls history older than HISTORY_RETENTION_DAYS up into summary tables, in the executor."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=config.HISTORY_RETENTION_DAYS)
+        analysis_rows, monkeyoff_rows = await self.loop.run_in_executor(
+            None, self.db_manager.roll_up_history, int(cutoff.timestamp()), config.HISTORY_ROLLUP_PERIOD, constants.HISTORY_RETENTION_BATCH_ROWS
+        )
+        if analysis_rows or monkeyoff_rows:
+            app_logger.info(f"History retention rolled up {analysis_rows} analysis and {monkeyoff_rows} monkey-off rows older than {cutoff.isoformat(timespec='seconds')}.")
+
+    @tasks.loop(seconds=1)
+    async def timestamp_backfill_loop(self) -> None:
+        """Converts one chunk of text history timestamps to epoch seconds in the executor; stops once all are converted."""
+        await self.loop.run_in_executor(None, self.db_manager.backfill_history_timestamps, constants.TIMESTAMP_BACKFILL_BATCH_ROWS)
+        if not self.db_manager.timestamp_backfill_pending:
+            self.timestamp_backfill_loop.stop()
 
     async def on_ready(self) -> None:
         """Event handler for when the bot is ready and connected."""
         activity = discord.CustomActivity(name="🍌🍌🍌🍌🍌")
         await self.change_presence(status=discord.Status.online, activity=activity)
         app_logger.info(f'Logged in as {self.user.name} (ID: {self.user.id})')
-        app_logger.warning('Bot is ready and online!')
+        app_logger.warning(f'Bot is ready and online! ({time.perf_counter() - self.created_at:.2f} s after startup)')
+        # Start the plot render workers only now, so spawning them doesn't compete with startup.
+        # The first render waits for them if needed; later on_ready calls (reconnects) are no-ops.
+        await self.plot_renderer.start()
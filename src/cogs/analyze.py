@@ -1,13 +1,12 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import functools
-import asyncio
 import random
 from src.core.logging import get_logger
 from src.resources.analysis_responses import get_analysis_response, generate_weighted_iq
 from src.utils.checks import is_whitelisted_guild
 from src.core import constants
+from src.core.metrics import observe_command
 # Initialize logger for the Analyze cog.
 logger = get_logger("C_Analyze")
 
@@ -19,6 +18,7 @@ class AnalyzeCommand(commands.Cog):
 
     @app_commands.command(name="analyze", description="Get your comprehensive primate analysis!")
     @is_whitelisted_guild()
+    @observe_command("analyze")
     async def analyze(self, interaction: discord.Interaction) -> None:
         """Generates and displays a primate analysis for the user."""
         # Generate random IQ and monkey percentage scores.
@@ -30,12 +30,14 @@ class AnalyzeCommand(commands.Cog):
         username = user.display_name
         guild_name = interaction.guild.name
         
-        # Record the analysis result in the database in a separate thread
-        # to avoid blocking the event loop.
-        record_func = functools.partial(self.bot.db_manager.record_analysis_result,
-                                        user.id, interaction.guild.id, iq_score, monkey_percentage, username, guild_name)
-        if not await self.bot.loop.run_in_executor(None, record_func):
-            logger.error(f"Failed to record analysis for user {username} ({user.id}) in guild {guild_name} ({interaction.guild.id})")
+        # Record the analysis result through the write-behind queue, which batches
+        # writes into shared transactions on the executor.
+        # In respond-first mode the write is only queued here, and persisted (with retries) after the response is sent.
+        respond_first = getattr(self.bot, "analyze_respond_first", False)
+        if not respond_first:
+            recorded = await self.bot.write_queue.record_analysis(user.id, interaction.guild.id, iq_score, monkey_percentage, username)
+            if not recorded:
+                logger.error(f"Failed to record analysis for user {username} ({user.id}) in guild {guild_name} ({interaction.guild.id})")
 
         # Always send the full embed first, in every channel
         raw_response_body = get_analysis_response(iq_score, monkey_percentage)
@@ -45,21 +47,23 @@ class AnalyzeCommand(commands.Cog):
         embed.set_footer(text=f"Subject: {username}")
         
         # Send the initial embed response.
-        await interaction.response.send_message(embed=embed)
+        try:
+            await interaction.response.send_message(embed=embed)
+        finally:
+            if respond_first:
+                # Queue the write even if the response failed; the result was still rolled.
+                self.bot.write_queue.record_analysis_detached(user.id, interaction.guild.id, iq_score, monkey_percentage, username)
         
         # If the command was used in a non-designated bot channel,
-        # wait and then edit the message to a compact form.
+        # schedule an edit of the message to a compact form.
         allowed_channels = getattr(interaction.client, "bot_channel_ids", [])
         if interaction.channel and interaction.channel.id not in allowed_channels:
-            await asyncio.sleep(constants.MESSAGE_CLEANUP_DELAY_SECONDS)
             final_message = constants.COMPACT_ANALYSIS_MESSAGE.format(
                 username=username, monkey_percentage=monkey_percentage, iq_score=iq_score
             )
-            try:
-                # Edit the original message to a compact text format.
-                await interaction.edit_original_response(content=final_message, embed=None)
-            except discord.NotFound:
-                logger.warning(f"Could not edit original analysis message for {username}, it was likely deleted before cleanup.")
+            self.bot.edit_scheduler.schedule(
+                interaction, final_message, constants.MESSAGE_CLEANUP_DELAY_SECONDS, description=f"analysis of {username}"
+            )
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(AnalyzeCommand(bot))
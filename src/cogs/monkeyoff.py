@@ -2,11 +2,10 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import random
-import asyncio
-import functools
 from src.core.logging import get_logger 
 from src.resources import monkeyoff_responses, monkey_types
 from src.core import constants
+from src.core.metrics import observe_command
 from src.utils.checks import is_whitelisted_guild
 
 # Initialize logger for the MonkeyOff cog.
@@ -21,6 +20,7 @@ class MonkeyOffCommand(commands.Cog):
     @app_commands.command(name="monkeyoff", description=f"Challenge another user to a monkey-off!")
     @app_commands.describe(opponent="The user you're challenging.")
     @is_whitelisted_guild()
+    @observe_command("monkeyoff")
     async def monkeyoff(self, interaction: discord.Interaction, opponent: discord.Member) -> None:
         """Challenges another user to a monkey-off, determining a winner based on random percentages."""
         # Extract challenger and opponent details.
@@ -40,12 +40,6 @@ class MonkeyOffCommand(commands.Cog):
         # Since DB operations can take a moment, defer the response.
         await interaction.response.defer()
 
-        # Ensure both challenger and opponent profiles exist in the database.
-        # Run database operations in a separate thread to avoid blocking the event loop.
-        ensure_challenger_func = functools.partial(self.bot.db_manager.ensure_user_exists, challenger_id, guild_id, challenger_name)
-        ensure_opponent_func = functools.partial(self.bot.db_manager.ensure_user_exists, opponent_id, guild_id, opponent_name)
-        await self.bot.loop.run_in_executor(None, ensure_challenger_func)
-        await self.bot.loop.run_in_executor(None, ensure_opponent_func)
         # Generate random monkey percentages
         challenger_percentage = random.randint(0, 100)
         opponent_percentage = random.randint(0, 100)
@@ -57,12 +51,12 @@ class MonkeyOffCommand(commands.Cog):
         elif opponent_percentage > challenger_percentage:
             winner_id = opponent_id
         
-        # Record the monkey-off result in the database
-        record_func = functools.partial(
-            self.bot.db_manager.record_monkeyoff_result,
-            challenger_id, opponent_id, guild_id, challenger_percentage, opponent_percentage, winner_id
+        # Record the monkey-off result through the write-behind queue.
+        # Both profiles, the history row and both counters are written in one transaction.
+        await self.bot.write_queue.record_monkeyoff(
+            challenger_id, opponent_id, guild_id, challenger_percentage, opponent_percentage, winner_id,
+            challenger_name, opponent_name
         )
-        await self.bot.loop.run_in_executor(None, record_func)
         # Get random monkey types for flavor
         challenger_monkey_type = monkey_types.get_random_monkey_type()
         opponent_monkey_type = monkey_types.get_random_monkey_type()
@@ -101,11 +95,9 @@ class MonkeyOffCommand(commands.Cog):
         await interaction.followup.send(embed=embed)
 
         # If the command was used in a non-designated bot channel,
-        # wait and then edit the message to a compact form.
+        # schedule an edit of the message to a compact form.
         allowed_channels = getattr(interaction.client, "bot_channel_ids", [])
         if interaction.channel and interaction.channel.id not in allowed_channels:
-            await asyncio.sleep(constants.MESSAGE_CLEANUP_DELAY_SECONDS)
-
             final_message = ""
             if winner_id is None:  # Tie
                 final_message = constants.COMPACT_MONKEYOFF_TIE_MESSAGE.format(
@@ -124,14 +116,10 @@ class MonkeyOffCommand(commands.Cog):
                     winner_name=winner_name,
                 )
 
-            try:
-                # Edit the original message to a compact text format.
-                await interaction.edit_original_response(content=final_message, embed=None)
-            except discord.NotFound:
-                logger.warning(
-                    f"Could not edit original monkeyoff message for {challenger_name} vs {opponent_name}, "
-                    f"it was likely deleted before cleanup."
-                )
+            self.bot.edit_scheduler.schedule(
+                interaction, final_message, constants.MESSAGE_CLEANUP_DELAY_SECONDS,
+                description=f"monkey-off {challenger_name} vs {opponent_name}"
+            )
 
 async def setup(bot: commands.Bot) -> None:
     await bot.add_cog(MonkeyOffCommand(bot))
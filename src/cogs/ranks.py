@@ -1,14 +1,23 @@
 import discord
 from discord.ext import commands
 from discord import app_commands, ui
-import functools
 from src.utils.plot_utils import generate_leaderboard_bar_plot, generate_leaderboard_string
+from src.utils.discord_utils import get_display_names_for_user_ids
 from src.core.logging import get_logger
 import io
 from src.utils.checks import is_whitelisted_guild, is_allowed_bot_channel
+from src.core import constants
+from src.core.metrics import observe_command
 
 logger = get_logger("C_Ranks")
 
+# Labels per analysis mode: (plot axis label and title metric, leaderboard metric name).
+ANALYSIS_MODE_LABELS = {
+    "combined": ("Combined Score", "Combined Score (IQ + Monkey %)"),
+    "iq": ("IQ Score", "IQ Score"),
+    "monkey": ("Monkey Purity %", "Monkey Purity %"),
+}
+
 class RankAnalysisView(ui.View):
     """
     A persistent view for displaying various ranking leaderboards with interactive buttons.
@@ -33,6 +42,40 @@ class RankAnalysisView(ui.View):
         except discord.NotFound:
             pass # Message was deleted, nothing to do.
 
+    async def _load_leaderboard(
+        self, guild_id: int, target_user_id: int, statistic: str, metric: str, order: str
+    ) -> tuple[list[tuple[int, float]], tuple[int, float] | None]:
+        """
+        Loads the ranked top N, plus the target user's own rank when they are not in it.
+        Serves both from the leaderboard cache when possible; otherwise queries the database in one executor hop.
+        """
+        db_manager = self.bot.db_manager
+        cache = db_manager.leaderboard_cache
+        # Take the guild's write generation before reading, so results that race a write are not cached.
+        generation = cache.generation(guild_id)
+        board_key = (guild_id, self.ranking_type, self.mode)
+        rank_key = (guild_id, self.ranking_type, self.mode, target_user_id)
+
+        ranked = cache.get(board_key)
+        target_in_board = ranked is not None and any(user_id == target_user_id for user_id, _ in ranked)
+        # Ranks are cached as (rank, value), or () when the user is not on the leaderboard at all.
+        cached_rank = None if ranked is None or target_in_board else cache.get(rank_key)
+        if ranked is not None and (target_in_board or cached_rank is not None):
+            return ranked, cached_rank or None
+
+        def load_from_database() -> tuple[list[tuple[int, float]], tuple[int, float] | None]:
+            board = ranked if ranked is not None else db_manager.get_ranking_for_guild(guild_id, statistic, metric, order, constants.LEADERBOARD_SIZE)
+            if any(user_id == target_user_id for user_id, _ in board):
+                return board, None
+            return board, db_manager.get_rank_for_user(guild_id, target_user_id, statistic, metric, order)
+
+        # Run the database queries in a separate thread to avoid blocking the event loop.
+        board, target_rank = await self.bot.loop.run_in_executor(None, load_from_database)
+        cache.put(board_key, board, generation)
+        if not any(user_id == target_user_id for user_id, _ in board):
+            cache.put(rank_key, target_rank or (), generation)
+        return board, target_rank
+
     async def update_view(self, interaction: discord.Interaction, ranking_type: str, mode: str, initial: bool = False):
         """Updates the leaderboard display based on selected ranking type and mode."""
         # Update the view's internal state.
@@ -49,26 +92,19 @@ class RankAnalysisView(ui.View):
                 child.style = discord.ButtonStyle.primary if is_active else discord.ButtonStyle.secondary
                 child.disabled = is_active
         
-        analysis_data = []
-        # Determine which database query to run based on ranking type and mode.
-        # Run database queries in a separate thread to avoid blocking the event loop.
-        db_manager_func = None
-        if self.ranking_type == "average":
-            db_manager_func = functools.partial(self.bot.db_manager.get_average_analysis_data_for_guild, interaction.guild.id)
-        elif self.ranking_type == "top":
-            db_manager_func = functools.partial(self.bot.db_manager.get_single_record_analysis_data_for_guild, interaction.guild.id, metric=self.mode, order="DESC")
-        elif self.ranking_type == "lowest":
-            db_manager_func = functools.partial(self.bot.db_manager.get_single_record_analysis_data_for_guild, interaction.guild.id, metric=self.mode, order="ASC")
-        elif self.ranking_type == "wins":
-            db_manager_func = functools.partial(self.bot.db_manager.get_top_wins_data_for_guild, interaction.guild.id)
-        elif self.ranking_type == "win_rate":
-            db_manager_func = functools.partial(self.bot.db_manager.get_top_win_rate_data_for_guild, interaction.guild.id)
-        # Execute the database function if one was selected.
-        if db_manager_func:
-            analysis_data = await self.bot.loop.run_in_executor(None, db_manager_func)
+        # Determine which leaderboard to load. "average" and "top" rank highest first, "lowest" lowest first.
+        if self.ranking_type in ["wins", "win_rate"]:
+            statistic, metric, order = "monkeyoff", self.ranking_type, "DESC"
+        else:
+            statistic = "average" if self.ranking_type == "average" else "record"
+            metric = self.mode
+            order = "ASC" if self.ranking_type == "lowest" else "DESC"
+        guild_id = interaction.guild.id
+        target_user_id = self.target_user.id
+        leaderboard_data, target_rank = await self._load_leaderboard(guild_id, target_user_id, statistic, metric, order)
         
         # Handle case where no analysis data is found.
-        if not analysis_data:
+        if not leaderboard_data:
             message = "No analysis data found for any monkeys in this server yet. Use `/analyze` to get started!"
             if initial:
                 await interaction.followup.send(message)
@@ -77,60 +113,37 @@ class RankAnalysisView(ui.View):
             self.stop()
             return
         
-        plot_buffer, leaderboard_data = None, []
-        metric_name_for_leaderboard = ""
-        metric_name_for_plot_label = ""
-        plot_title = ""
-        
-        # Determine sorting order for analysis data.
-        # "average" and "top" use descending, "lowest" uses ascending.
-        reverse_sort = True if self.ranking_type in ["average", "top"] else False
-        
-        if self.mode == "combined":
-            # Data for sorting and leaderboard
-            ranked_data = sorted(analysis_data, key=lambda d: d[1] + d[2], reverse=reverse_sort) 
-            leaderboard_data = [(uid, iq + monkey) for uid, iq, monkey in ranked_data]
-
-            metric_name_for_plot_label = "Combined Score"
-            metric_name_for_leaderboard = f"{'Combined Score (IQ + Monkey %)' if self.ranking_type == 'average' else ('Highest Combined Score (IQ + Monkey %)' if self.ranking_type == 'top' else 'Lowest Combined Score (IQ + Monkey %)')}"
-            plot_title = f"{'Top' if self.ranking_type == 'top' else ('Lowest' if self.ranking_type == 'lowest' else 'Top')} 10 Monkeys by {'Average ' if self.ranking_type == 'average' else ''}Combined Score"
-            plot_buffer = await generate_leaderboard_bar_plot(
-                interaction, leaderboard_data, self.bot,
-                self.target_user.id, plot_title, metric_name_for_plot_label
-            )
-        elif self.mode == "iq":
-            ranked_data = sorted(analysis_data, key=lambda d: d[1], reverse=reverse_sort)
-            leaderboard_data = [(uid, iq) for uid, iq, _ in ranked_data]
-            metric_name_for_plot_label = "IQ Score"
-            metric_name_for_leaderboard = f"{'IQ Score' if self.ranking_type == 'average' else ('Highest IQ Score' if self.ranking_type == 'top' else 'Lowest IQ Score')}"
-            plot_title = f"{'Top' if self.ranking_type == 'top' else ('Lowest' if self.ranking_type == 'lowest' else 'Top')} 10 Monkeys by {'Average ' if self.ranking_type == 'average' else ''}IQ Score"
-            plot_buffer = await generate_leaderboard_bar_plot(
-                interaction, leaderboard_data, self.bot,
-                self.target_user.id, plot_title, metric_name_for_plot_label
-            )
-        elif self.mode == "monkey":
-            ranked_data = sorted(analysis_data, key=lambda d: d[2], reverse=reverse_sort)
-            leaderboard_data = [(uid, monkey) for uid, _, monkey in ranked_data]
-            metric_name_for_plot_label = "Monkey Purity %"
-            metric_name_for_leaderboard = f"{'Monkey Purity %' if self.ranking_type == 'average' else ('Highest Monkey Purity %' if self.ranking_type == 'top' else 'Lowest Monkey Purity %')}"
-            plot_title = f"{'Top' if self.ranking_type == 'top' else ('Lowest' if self.ranking_type == 'lowest' else 'Top')} 10 Monkeys by {'Average ' if self.ranking_type == 'average' else ''}Monkey Purity %"
-            plot_buffer = await generate_leaderboard_bar_plot(
-                interaction, leaderboard_data, self.bot,
-                self.target_user.id, plot_title, metric_name_for_plot_label
-            )
-        elif self.ranking_type == "wins":
-            leaderboard_data = analysis_data
+        if self.ranking_type == "wins":
             metric_name_for_leaderboard = "Total Monkey-Off Wins"
+            metric_name_for_plot_label = metric_name_for_leaderboard
             plot_title = "Top 10 Monkeys by Total Wins"
-            plot_buffer = await generate_leaderboard_bar_plot(interaction, analysis_data, self.bot, self.target_user.id, plot_title, metric_name_for_leaderboard)
         elif self.ranking_type == "win_rate":
-            leaderboard_data = analysis_data
             metric_name_for_leaderboard = "Monkey-Off Win Rate (%)"
-            plot_title = "Top 10 Monkeys by Win Rate"
             # X-axis label for the plot is the same as the leaderboard metric name.
-            plot_buffer = await generate_leaderboard_bar_plot(interaction, analysis_data, self.bot, self.target_user.id, plot_title, metric_name_for_leaderboard)
+            metric_name_for_plot_label = metric_name_for_leaderboard
+            plot_title = "Top 10 Monkeys by Win Rate"
+        else:
+            metric_name_for_plot_label, leaderboard_metric = ANALYSIS_MODE_LABELS[self.mode]
+            metric_name_for_leaderboard = f"{'' if self.ranking_type == 'average' else ('Highest ' if self.ranking_type == 'top' else 'Lowest ')}{leaderboard_metric}"
+            plot_title = f"{'Lowest' if self.ranking_type == 'lowest' else 'Top'} 10 Monkeys by {'Average ' if self.ranking_type == 'average' else ''}{metric_name_for_plot_label}"
+
+        target_entry = (target_rank[0], target_user_id, target_rank[1]) if target_rank else None
+        # Resolve every name shown on the plot and in the text once, with at most one database query.
+        displayed_user_ids = [user_id for user_id, _ in leaderboard_data[:constants.LEADERBOARD_SIZE]]
+        if target_entry:
+            displayed_user_ids.append(target_user_id)
+        display_names = await get_display_names_for_user_ids(displayed_user_ids, interaction.guild, self.bot)
+
         # Generate the leaderboard text and plot file.
-        leaderboard_text = await generate_leaderboard_string(interaction, leaderboard_data, self.bot, metric_name_for_leaderboard)
+        plot_buffer = await generate_leaderboard_bar_plot(
+            interaction, leaderboard_data, self.bot,
+            target_user_id, plot_title, metric_name_for_plot_label,
+            display_names=display_names
+        )
+        leaderboard_text = await generate_leaderboard_string(
+            interaction, leaderboard_data, self.bot, metric_name_for_leaderboard,
+            target_entry=target_entry, display_names=display_names
+        )
         plot_file = discord.File(plot_buffer, filename=f"{self.ranking_type}_{self.mode}_rank_plot.png") if plot_buffer else None
         content = leaderboard_text if leaderboard_text else "Could not generate leaderboard."
         # Send or edit the original response with the new content and plot.
@@ -189,6 +202,7 @@ class RanksCog(commands.Cog):
     @app_commands.describe(user="The user to highlight on the plot (optional).")
     @is_whitelisted_guild()
     @is_allowed_bot_channel()
+    @observe_command("ranks")
     async def analysis(self, interaction: discord.Interaction, user: discord.Member = None):
         """
         Shows a comprehensive ranking view with options for average, top, and lowest
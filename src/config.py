@@ -23,19 +23,65 @@ DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 # Secret key for downloading the database.
 DOWNLOAD_SECRET = os.getenv("DOWNLOAD_SECRET")
 
+# Sync application commands on startup even if the command tree is unchanged since the last sync.
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "false").strip().lower() in ("1", "true", "yes")
+
 # --- Web Server ---
 # Port for the web server. Railway provides this automatically via the PORT env var.
 WEB_SERVER_PORT = int(os.getenv("PORT", 8080))
+# Optional secret required as ?secret= to scrape /metrics. Leave unset to serve metrics to local scrapers only.
+METRICS_SECRET = os.getenv("METRICS_SECRET")
 
 # --- Database ---
 # Path to the SQLite database file.
 DATABASE_FILE_PATH = os.getenv("DATABASE_FILE_PATH")
+# Maximum pooled connections (and default executor worker threads). 0 uses asyncio's default worker count.
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 0))
+# PRAGMA profile for the database: 'default' (SQLite defaults), 'wal' or 'wal_durable'.
+# 'wal_durable' is the default because the write queue only acknowledges results once they are synced to disk.
+DATABASE_PRAGMA_PROFILE = os.getenv("DATABASE_PRAGMA_PROFILE", "wal_durable")
+# Optional overrides for the profile's page cache (PRAGMA cache_size) and memory map size in bytes.
+DATABASE_CACHE_SIZE = int(os.getenv("DATABASE_CACHE_SIZE")) if os.getenv("DATABASE_CACHE_SIZE") else None
+DATABASE_MMAP_SIZE = int(os.getenv("DATABASE_MMAP_SIZE")) if os.getenv("DATABASE_MMAP_SIZE") else None
+# Seconds between wal_checkpoint(TRUNCATE) runs when the database is in WAL mode. 0 disables them.
+DATABASE_WAL_CHECKPOINT_INTERVAL_SECONDS = int(os.getenv("DATABASE_WAL_CHECKPOINT_INTERVAL_SECONDS", 300))
+# Days of raw analysis and monkey-off history to keep. Older rows are rolled up into daily or weekly summaries
+# and deleted by a background job. 0 keeps all history.
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", 0))
+# Period of the summaries old history is rolled up into: 'day' or 'week'.
+HISTORY_ROLLUP_PERIOD = os.getenv("HISTORY_ROLLUP_PERIOD", "day").strip().lower()
+# Optional directory for a compressed archive of history before it is rolled up, for audits. Empty disables archiving.
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "")
+# Maximum number of results the write-behind queue commits in one transaction.
+WRITE_QUEUE_MAX_BATCH_SIZE = int(os.getenv("WRITE_QUEUE_MAX_BATCH_SIZE", 64))
+# Send the /analyze result before it is persisted; the write is queued and retried in the background.
+ANALYZE_RESPOND_FIRST = os.getenv("ANALYZE_RESPOND_FIRST", "false").strip().lower() in ("1", "true", "yes")
+
+# --- Plotting ---
+# Number of worker processes that render plots. 0 uses up to 4, limited by the CPU count.
+PLOT_RENDER_WORKERS = int(os.getenv("PLOT_RENDER_WORKERS", 0))
+
+# --- Monitoring ---
+# Milliseconds the event loop may be blocked before the watchdog reports a stall. 0 disables the watchdog.
+LOOP_WATCHDOG_THRESHOLD_MS = int(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", 250))
+# Fraction of stalls for which the watchdog captures and logs the blocking stack (0.0 - 1.0).
+LOOP_WATCHDOG_STACK_SAMPLE_RATE = float(os.getenv("LOOP_WATCHDOG_STACK_SAMPLE_RATE", 0.25))
 
 # --- Logging ---
 # Minimum logging level.
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 # Path for log file.
 LOG_FILE_PATH = os.getenv("LOG_FILE_PATH")
+# Write logs from a background thread through a bounded queue, so logging never blocks the event loop.
+LOG_QUEUE_ENABLED = os.getenv("LOG_QUEUE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+# Records the log queue holds before new records are dropped.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+# Log line format: 'text' or 'json' (one JSON object per line).
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").strip().lower()
+# Size in bytes at which the log file is rotated. 0 disables rotation.
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", 10 * 1024 * 1024))
+# Number of rotated log files to keep.
+LOG_FILE_BACKUP_COUNT = int(os.getenv("LOG_FILE_BACKUP_COUNT", 5))
 
 # --- Permissions ---
 # Raw string of whitelisted guild IDs from environment.
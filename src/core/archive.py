@@ -0,0 +1,235 @@
+import json
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, Mapping, Sequence
+from src.core.logging import get_logger
+# Initialize logger for the history archive.
+logger = get_logger("DB_Archive")
+
+# Magic bytes starting every block, to catch reads at a wrong offset.
+BLOCK_MAGIC = b"DMA1"
+# Index entry: block offset and length in the data file, row count, then min/max ID and min/max timestamp (epoch seconds).
+_INDEX_ENTRY = struct.Struct("<QIIqqqq")
+# Block header: magic, row count, then per column its compressed length.
+_BLOCK_HEADER = struct.Struct("<4sI")
+_COLUMN_LENGTH = struct.Struct("<I")
+
+@dataclass(frozen=True)
+class ArchiveLayout:
+    """Column layout of an archived table: (column, array typecode, delta-encoded) in row order."""
+    table: str
+    columns: tuple[tuple[str, str, bool], ...]
+    # Index of the timestamp column, which partitions rows by month.
+    timestamp_column: int
+
+# The guild ID is implied by the file's location, so it isn't stored. Monkey-off ties store winner_id 0.
+ANALYSIS_LAYOUT = ArchiveLayout("user_analysis_history", (
+    ("id", "q", True), ("user_id", "q", False), ("iq_score", "H", False),
+    ("monkey_percentage", "B", False), ("timestamp", "q", True),
+), timestamp_column=4)
+MONKEYOFF_LAYOUT = ArchiveLayout("monkeyoff_history", (
+    ("id", "q", True), ("challenger_id", "q", False), ("opponent_id", "q", False),
+    ("challenger_percentage", "B", False), ("opponent_percentage", "B", False),
+    ("winner_id", "q", False), ("timestamp", "q", True),
+), timestamp_column=6)
+
+def _to_epoch(timestamp: str) -> int:
+    """Converts an ISO-8601 history timestamp, as stored before epoch seconds, to epoch seconds."""
+    return int(datetime.fromisoformat(timestamp).timestamp())
+
+def _pack_column(values: Sequence[int], typecode: str, delta: bool) -> bytes:
+    """Packs a column as a little-endian array, delta-encoded if requested, and compresses it."""
+    if delta:
+        values = [values[0], *(b - a for a, b in zip(values, values[1:]))]
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return zlib.compress(packed.tobytes(), 6)
+
+def _unpack_column(data: bytes, typecode: str, delta: bool) -> list[int]:
+    """Reverses _pack_column."""
+    packed = array(typecode)
+    packed.frombytes(zlib.decompress(data))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    values = packed.tolist()
+    if delta:
+        for i in range(1, len(values)):
+            values[i] += values[i - 1]
+    return values
+
+class HistoryArchive:
+    """
+    Append-only, compressed, columnar archive of history rows on local disk.
+    Rows are partitioned into one data file per table, guild and month ({table}/{guild_id}/{YYYY-MM}.dat).
+    Each append writes one block holding every column as a compressed (delta-encoded where useful) integer array,
+    then records the block in the partition's fixed-size index (.idx) file. A block becomes visible only once
+    its index entry is written, so a crash mid-append leaves unreferenced bytes at worst, never a corrupt read.
+    manifest.json holds the highest archived row ID per table, so rows are never archived twice
+    while only newer rows are appended, which is the normal case.
+    """
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(directory, "manifest.json")
+        self._archived_ids: dict[str, int] = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding="utf-8") as file:
+                self._archived_ids = json.load(file)
+
+    def archived_through(self, layout: ArchiveLayout) -> int:
+        """Highest row ID archived for a table (0 if none)."""
+        return self._archived_ids.get(layout.table, 0)
+
+    def _partition_path(self, layout: ArchiveLayout, guild_id: int, month: str) -> str:
+        return os.path.join(self.directory, layout.table, str(guild_id), f"{month}.dat")
+
+    def append(self, layout: ArchiveLayout, rows: Sequence[Mapping]) -> int:
+        """
+        Archives history rows, each mapping guild_id and the layout's column names to values (timestamps as stored).
+        Rows already in the archive are skipped. Returns the number of rows written.
+        Data and index files are fsynced before the manifest records the new high-water mark.
+        """
+        with self._lock:
+            archived_through = self.archived_through(layout)
+            partitions: dict[tuple[int, str], list[list[int]]] = {}
+            max_id = archived_through
+            for row in rows:
+                values = [row[name] for name, _, _ in layout.columns]
+                timestamp = values[layout.timestamp_column]
+                values[layout.timestamp_column] = _to_epoch(timestamp) if isinstance(timestamp, str) else timestamp
+                values = [0 if value is None else value for value in values]
+                month = datetime.fromtimestamp(values[layout.timestamp_column], timezone.utc).strftime("%Y-%m")
+                partitions.setdefault((row["guild_id"], month), []).append(values)
+                max_id = max(max_id, row["id"])
+            written = 0
+            for (guild_id, month), partition_rows in partitions.items():
+                data_path = self._partition_path(layout, guild_id, month)
+                # Rows at or below the high-water mark may already be archived (e.g. after a crash before their
+                # deletion was committed); check those against the partition's stored IDs.
+                old_ids = {values[0] for values in partition_rows if values[0] <= archived_through}
+                if old_ids:
+                    stored_ids = self._stored_ids(layout, data_path, min(old_ids), max(old_ids))
+                    partition_rows = [values for values in partition_rows if values[0] not in stored_ids]
+                if partition_rows:
+                    self._append_block(layout, data_path, partition_rows)
+                    written += len(partition_rows)
+            if max_id > archived_through:
+                self._archived_ids[layout.table] = max_id
+                temporary_path = f"{self._manifest_path}.tmp"
+                with open(temporary_path, "w", encoding="utf-8") as file:
+                    json.dump(self._archived_ids, file)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temporary_path, self._manifest_path)
+            if written:
+                logger.debug(f"Archived {written} {layout.table} rows into {len(partitions)} partition(s).")
+            return written
+
+    def _append_block(self, layout: ArchiveLayout, data_path: str, rows: list[list[int]]) -> None:
+        """Appends one block of rows to a partition's data file and records it in the index."""
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        columns = list(zip(*rows))
+        packed_columns = [_pack_column(columns[i], typecode, delta) for i, (_, typecode, delta) in enumerate(layout.columns)]
+        block = b"".join([
+            _BLOCK_HEADER.pack(BLOCK_MAGIC, len(rows)),
+            *(_COLUMN_LENGTH.pack(len(packed)) for packed in packed_columns),
+            *packed_columns,
+        ])
+        with open(data_path, "ab") as data_file:
+            offset = data_file.seek(0, os.SEEK_END)
+            data_file.write(block)
+            data_file.flush()
+            os.fsync(data_file.fileno())
+        ids, timestamps = columns[0], columns[layout.timestamp_column]
+        with open(data_path[:-4] + ".idx", "ab") as index_file:
+            index_file.write(_INDEX_ENTRY.pack(offset, len(block), len(rows), min(ids), max(ids), min(timestamps), max(timestamps)))
+            index_file.flush()
+            os.fsync(index_file.fileno())
+
+    def _read_index(self, data_path: str) -> list[tuple[int, ...]]:
+        """Returns a partition's index entries, ignoring a trailing partial entry from an interrupted append."""
+        index_path = data_path[:-4] + ".idx"
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path, "rb") as index_file:
+            index_data = index_file.read()
+        usable = len(index_data) - len(index_data) % _INDEX_ENTRY.size
+        return list(_INDEX_ENTRY.iter_unpack(index_data[:usable]))
+
+    def _stored_ids(self, layout: ArchiveLayout, data_path: str, min_id: int, max_id: int) -> set[int]:
+        """Returns the row IDs in [min_id, max_id] already stored in a partition."""
+        stored = set()
+        if not os.path.exists(data_path):
+            return stored
+        with open(data_path, "rb") as data_file:
+            for offset, length, row_count, block_min_id, block_max_id, _, _ in self._read_index(data_path):
+                if block_max_id < min_id or block_min_id > max_id:
+                    continue
+                data_file.seek(offset)
+                stored.update(self._read_block(layout, data_file.read(length), row_count, data_path)[0])
+        return stored
+
+    def _partitions(self, layout: ArchiveLayout, guild_id: int | None) -> Iterator[tuple[int, str]]:
+        """Yields (guild_id, data path) for every partition of a table, optionally for one guild, in month order."""
+        table_dir = os.path.join(self.directory, layout.table)
+        if not os.path.isdir(table_dir):
+            return
+        guild_dirs = [str(guild_id)] if guild_id is not None else sorted(os.listdir(table_dir))
+        for guild_dir in guild_dirs:
+            path = os.path.join(table_dir, guild_dir)
+            if not os.path.isdir(path):
+                continue
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".dat"):
+                    yield int(guild_dir), os.path.join(path, name)
+
+    def iter_rows(self, layout: ArchiveLayout, guild_id: int | None = None, start: int | None = None, end: int | None = None,
+                  before_id: int | None = None, reverse: bool = False) -> Iterator[tuple[int, tuple]]:
+        """
+        Streams archived rows as (guild_id, row tuple in layout column order, timestamps as epoch seconds),
+        one block in memory at a time. `start`/`end` limit rows to timestamps in [start, end) and `before_id`
+        to IDs below it, skipping blocks entirely outside those ranges using the index.
+        With `reverse`, rows come newest first (months, blocks and rows in reverse), so a caller can stop early.
+        """
+        partitions = list(self._partitions(layout, guild_id))
+        for partition_guild_id, data_path in reversed(partitions) if reverse else partitions:
+            index_entries = self._read_index(data_path)
+            if not index_entries:
+                continue
+            with open(data_path, "rb") as data_file:
+                for offset, length, row_count, min_id, _, min_ts, max_ts in reversed(index_entries) if reverse else index_entries:
+                    if ((start is not None and max_ts < start) or (end is not None and min_ts >= end)
+                            or (before_id is not None and min_id >= before_id)):
+                        continue
+                    data_file.seek(offset)
+                    rows = list(zip(*self._read_block(layout, data_file.read(length), row_count, data_path)))
+                    for row in reversed(rows) if reverse else rows:
+                        timestamp = row[layout.timestamp_column]
+                        if ((start is None or timestamp >= start) and (end is None or timestamp < end)
+                                and (before_id is None or row[0] < before_id)):
+                            yield partition_guild_id, row
+
+    @staticmethod
+    def _read_block(layout: ArchiveLayout, block: bytes, row_count: int, data_path: str) -> list[list[int]]:
+        """Decodes one block into its columns."""
+        magic, stored_rows = _BLOCK_HEADER.unpack_from(block)
+        if magic != BLOCK_MAGIC or stored_rows != row_count:
+            raise ValueError(f"Corrupt archive block in {data_path}.")
+        position = _BLOCK_HEADER.size
+        lengths = []
+        for _ in layout.columns:
+            lengths.append(_COLUMN_LENGTH.unpack_from(block, position)[0])
+            position += _COLUMN_LENGTH.size
+        columns = []
+        for length, (_, typecode, delta) in zip(lengths, layout.columns):
+            columns.append(_unpack_column(block[position:position + length], typecode, delta))
+            position += length
+        return columns
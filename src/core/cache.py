@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a cache."""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+class LeaderboardCache:
+    """
+    In-process LRU cache with a TTL for leaderboard results, invalidated per guild.
+    Keys are tuples whose first element is the guild ID, e.g. (guild_id, ranking_type, mode).
+    Writers call `invalidate_guild` after committing; readers take `generation(guild_id)` before querying
+    and pass it to `put`, so a result read before a write can never be cached after that write.
+    Safe to use from the event loop and executor threads.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        # key -> (expires_at, value), least recently used first.
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        # Per-guild write generation, bumped on every invalidation.
+        self._generations: dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def generation(self, guild_id: Hashable) -> int:
+        """Returns the guild's current write generation."""
+        return self._generations.get(guild_id, 0)
+
+    def get(self, key: tuple) -> Any | None:
+        """Returns the cached value for a key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value: Any, generation: int) -> None:
+        """Caches a value read at `generation`, unless the guild has been written to since."""
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def invalidate_guild(self, guild_id: Hashable) -> None:
+        """Drops every cached result for a guild and bumps its generation."""
+        with self._lock:
+            self._generations[guild_id] = self._generations.get(guild_id, 0) + 1
+            stale_keys = [key for key in self._entries if key[0] == guild_id]
+            for key in stale_keys:
+                del self._entries[key]
+            self.stats.invalidations += 1
+
+class RenderedImageCache:
+    """
+    Content-addressed LRU cache of rendered image bytes, bounded by total size.
+    Keys are digests of everything that affects the render (see `key_for`), so identical
+    inputs always map to the same image and entries never need explicit invalidation.
+    Safe to use from the event loop and executor threads.
+    """
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self.stats = CacheStats()
+        # digest -> image bytes, least recently used first.
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the cached images."""
+        return self._size
+
+    @staticmethod
+    def key_for(*parts: Any) -> str:
+        """Returns a stable digest for the given render inputs (built from their repr)."""
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the cached image for a key, or None on a miss."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Caches an image, evicting least recently used images to stay within the byte bound."""
+        if len(data) > self.max_bytes:
+            # Larger than the whole cache; not worth evicting everything for.
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.stats.evictions += 1
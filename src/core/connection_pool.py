@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from src.core.logging import get_logger
+# Initialize logger for the connection pool.
+logger = get_logger("DB_Pool")
+
+# SQL used to verify that a pooled connection is still usable.
+HEALTH_CHECK_QUERY = "SELECT 1"
+
+def default_pool_size() -> int:
+    """Returns the worker count asyncio's default ThreadPoolExecutor would use."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+class ConnectionPool:
+    """
+    A bounded pool of thread-affine SQLite connections.
+    Each worker thread keeps its own connection, opened (and configured) once and reused
+    for every call made from that thread. Threads beyond the bound get a short-lived
+    connection that is closed after use, so the number of open handles never exceeds `max_size`.
+    """
+    def __init__(self, connect: Callable[[], sqlite3.Connection], max_size: int, health_check_interval: float) -> None:
+        # Factory that opens and configures a new connection.
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self._health_check_interval = health_check_interval
+        # Pooled connections and their last use time, keyed by owning thread ident.
+        self._connections: dict[int, sqlite3.Connection] = {}
+        self._last_used: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Number of connections currently held by the pool."""
+        return len(self._connections)
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Runs a trivial query to check the connection still works."""
+        try:
+            conn.execute(HEALTH_CHECK_QUERY).fetchone()
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"Pooled connection failed health check, reopening: {e}")
+            return False
+
+    def _discard(self, thread_id: int) -> None:
+        """Removes and closes the connection owned by a thread."""
+        with self._lock:
+            conn = self._connections.pop(thread_id, None)
+            self._last_used.pop(thread_id, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _get_pooled(self, thread_id: int) -> sqlite3.Connection | None:
+        """Returns the calling thread's connection, opening it if the pool has room."""
+        conn = self._connections.get(thread_id)
+        if conn is not None:
+            # Only health-check connections that have been idle for a while.
+            idle_for = time.monotonic() - self._last_used.get(thread_id, 0.0)
+            if idle_for < self._health_check_interval or self._is_healthy(conn):
+                return conn
+            self._discard(thread_id)
+
+        with self._lock:
+            if self._closed or len(self._connections) >= self.max_size:
+                return None
+            conn = self._connect()
+            self._connections[thread_id] = conn
+            self._last_used[thread_id] = time.monotonic()
+            logger.debug(f"Opened pooled connection {len(self._connections)}/{self.max_size} for thread {thread_id}.")
+            return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Yields a connection for the calling thread. Transaction handling is left to the caller."""
+        thread_id = threading.get_ident()
+        conn = self._get_pooled(thread_id)
+        if conn is None:
+            # Pool is full (or closed); fall back to a transient connection.
+            conn = self._connect()
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        try:
+            yield conn
+        finally:
+            self._last_used[thread_id] = time.monotonic()
+
+    def close(self) -> None:
+        """Closes every pooled connection. Later calls fall back to transient connections."""
+        with self._lock:
+            self._closed = True
+            connections = list(self._connections.values())
+            self._connections.clear()
+            self._last_used.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Error closing pooled connection: {e}")
+        logger.info(f"Closed {len(connections)} pooled database connection(s).")
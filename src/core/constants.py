@@ -3,6 +3,12 @@
 # Delay in seconds before cleaning up messages in non-bot channels.
 MESSAGE_CLEANUP_DELAY_SECONDS = 20
 
+# Maximum compact cleanup edits sent per second across all guilds.
+COMPACT_EDIT_MAX_PER_SECOND = 20
+
+# Seconds allowed on shutdown to apply cleanup edits that are still pending.
+COMPACT_EDIT_DRAIN_TIMEOUT_SECONDS = 10
+
 # Compact message format for analysis results after cleanup.
 COMPACT_ANALYSIS_MESSAGE = "{username} is **{monkey_percentage}%** monkey and has an IQ of **{iq_score}**"
 
@@ -29,6 +35,9 @@ MIN_MONKEY_PERCENTAGE = 0
 # Maximum possible monkey percentage.
 MAX_MONKEY_PERCENTAGE = 100
 
+# Number of users shown on each leaderboard.
+LEADERBOARD_SIZE = 10
+
 
 
 
@@ -51,3 +60,88 @@ HIGHLIGHT_BAR_COLOR = "#ddd128"
 
 # Font size for plot titles.
 PLOT_TITLE_FONTSIZE = 14
+
+# Maximum total size in bytes of rendered plot images kept in memory for reuse.
+PLOT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Maximum plot renders queued or running at once; further requests wait for a free slot.
+PLOT_RENDER_MAX_PENDING = 32
+
+
+
+
+# --- Database ---
+
+# Seconds a pooled connection may sit idle before it is health-checked on next use.
+DB_HEALTH_CHECK_INTERVAL_SECONDS = 30
+
+# Seconds a cached leaderboard stays valid if its guild sees no writes.
+LEADERBOARD_CACHE_TTL_SECONDS = 60
+
+# Maximum number of cached leaderboards and user ranks across all guilds.
+LEADERBOARD_CACHE_MAX_ENTRIES = 512
+
+# Pages copied per online-backup step when snapshotting the database for download.
+DB_BACKUP_PAGES_PER_STEP = 1024
+
+# Seconds to pause between backup steps so writers can make progress.
+DB_BACKUP_STEP_SLEEP_SECONDS = 0.005
+
+# Times a backup may be restarted by concurrent writes before the rest is copied in one step.
+DB_BACKUP_MAX_RESTARTS = 3
+
+# Seconds a download snapshot is reused by new (and resumed) downloads before a fresh one is taken.
+DB_SNAPSHOT_TTL_SECONDS = 600
+
+# Size of each chunk read from a snapshot while streaming a download.
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Maximum database downloads streamed at once.
+DOWNLOAD_MAX_CONCURRENT = 2
+
+# bot_metadata key holding the hash of the last command tree synced with Discord.
+COMMAND_TREE_HASH_METADATA_KEY = "command_tree_hash"
+
+# Seconds between history retention runs.
+HISTORY_RETENTION_INTERVAL_SECONDS = 3600
+
+# History rows rolled up and deleted per transaction by the retention job.
+HISTORY_RETENTION_BATCH_ROWS = 5000
+
+# bot_metadata key holding a history table's timestamp backfill progress: the last converted ID, or 'done'.
+TIMESTAMP_BACKFILL_METADATA_KEY = "timestamp_backfill:{table}"
+
+# History rows converted to epoch second timestamps per backfill transaction.
+TIMESTAMP_BACKFILL_BATCH_ROWS = 5000
+
+# History rows copied per transaction when a history table is rebuilt to retype its timestamp column.
+TIMESTAMP_REBUILD_BATCH_ROWS = 50000
+
+# Seconds between timestamp backfill transactions, leaving the database to other writers in between.
+TIMESTAMP_BACKFILL_INTERVAL_SECONDS = 0.25
+
+# Live history rows read per query when streaming full history.
+HISTORY_STREAM_CHUNK_ROWS = 5000
+
+# bot_metadata key set once retention has deleted monkey-off history without archiving it first.
+UNARCHIVED_MONKEYOFF_REMOVALS_METADATA_KEY = "monkeyoff_history_removed_unarchived"
+
+# bot_metadata key holding the highest history row ID whose removal by retention has been committed, per table.
+ROLLED_UP_THROUGH_METADATA_KEY = "rolled_up_through:{table}"
+
+# Duels returned per page of a user's monkey-off history.
+MONKEYOFF_HISTORY_PAGE_SIZE = 10
+
+# Retries for writes queued without waiting (respond-first mode) before the result is dropped.
+WRITE_QUEUE_RETRY_ATTEMPTS = 3
+
+# Delay in seconds before the first retry of a failed queued write; doubles on each further retry.
+WRITE_QUEUE_RETRY_BASE_DELAY_SECONDS = 0.5
+
+# --- Monitoring ---
+
+# Seconds between event loop lag samples.
+LOOP_LAG_SAMPLE_INTERVAL_SECONDS = 0.5
+
+# Innermost frames of the event loop thread's stack logged for a stall.
+LOOP_WATCHDOG_STACK_DEPTH = 20
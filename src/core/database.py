@@ -1,8 +1,16 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 import sqlite3
 import os
+import time
 import logging
+from contextlib import closing, contextmanager
+from typing import Iterator
 from src.core.logging import get_logger
+from src.core.connection_pool import ConnectionPool, default_pool_size
+from src.core.cache import LeaderboardCache
+from src.core.metrics import timed_db_operation
+from src.core.archive import ANALYSIS_LAYOUT, MONKEYOFF_LAYOUT, ArchiveLayout, HistoryArchive
+from src.core import constants
 logger = get_logger("DB_Manager")
 # --- SQL Query Constants ---
 
@@ -29,7 +37,7 @@ CREATE_USER_ANALYSIS_HISTORY_TABLE = """
         guild_id INTEGER NOT NULL,
         iq_score INTEGER NOT NULL,
         monkey_percentage INTEGER NOT NULL,
-        timestamp TEXT NOT NULL,
+        timestamp INTEGER NOT NULL, -- UTC epoch seconds
         FOREIGN KEY (user_id, guild_id) REFERENCES user_profiles(user_id, guild_id) ON DELETE CASCADE
     )
 """
@@ -43,14 +51,175 @@ CREATE_MONKEYOFF_HISTORY_TABLE = """
         challenger_percentage INTEGER NOT NULL,
         opponent_percentage INTEGER NOT NULL,
         winner_id INTEGER, -- NULL if tie
-        timestamp TEXT NOT NULL
+        timestamp INTEGER NOT NULL -- UTC epoch seconds
+    )
+"""
+# SQL for creating the bot_metadata table (small key/value settings owned by the bot, e.g. the synced command tree hash).
+CREATE_BOT_METADATA_TABLE = """
+    CREATE TABLE IF NOT EXISTS bot_metadata (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+"""
+# SQL for creating the user_analysis_stats table.
+# Per-user running aggregates of user_analysis_history, maintained in the same transaction as each insert,
+# so leaderboards read one row per user instead of scanning history.
+CREATE_USER_ANALYSIS_STATS_TABLE = """
+    CREATE TABLE IF NOT EXISTS user_analysis_stats (
+        user_id INTEGER NOT NULL,
+        guild_id INTEGER NOT NULL,
+        analysis_count INTEGER NOT NULL DEFAULT 0,
+        sum_iq INTEGER NOT NULL DEFAULT 0,
+        sum_monkey INTEGER NOT NULL DEFAULT 0,
+        min_iq INTEGER NOT NULL,
+        max_iq INTEGER NOT NULL,
+        min_monkey INTEGER NOT NULL,
+        max_monkey INTEGER NOT NULL,
+        min_combined INTEGER NOT NULL,  -- Lowest single (iq_score + monkey_percentage)
+        max_combined INTEGER NOT NULL,  -- Highest single (iq_score + monkey_percentage)
+        PRIMARY KEY (user_id, guild_id)
+    )
+"""
+# SQL for creating the user_analysis_rollups table.
+# Per-user, per-guild summaries of analysis history rows that retention has removed, one row per day or week
+# (period) starting at bucket_start (epoch seconds, UTC). Holds the same aggregates as user_analysis_stats,
+# so the stats can still be rebuilt after their history rows are gone.
+CREATE_USER_ANALYSIS_ROLLUPS_TABLE = """
+    CREATE TABLE IF NOT EXISTS user_analysis_rollups (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        period TEXT NOT NULL,           -- 'day' or 'week'
+        bucket_start INTEGER NOT NULL,
+        analysis_count INTEGER NOT NULL,
+        sum_iq INTEGER NOT NULL,
+        sum_monkey INTEGER NOT NULL,
+        min_iq INTEGER NOT NULL,
+        max_iq INTEGER NOT NULL,
+        min_monkey INTEGER NOT NULL,
+        max_monkey INTEGER NOT NULL,
+        min_combined INTEGER NOT NULL,
+        max_combined INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, user_id, period, bucket_start)
+    )
+"""
+# SQL for creating the monkeyoff_rollups table: per-participant duel counts of removed monkey-off history rows.
+CREATE_MONKEYOFF_ROLLUPS_TABLE = """
+    CREATE TABLE IF NOT EXISTS monkeyoff_rollups (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        period TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        duels INTEGER NOT NULL,
+        wins INTEGER NOT NULL,
+        losses INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, user_id, period, bucket_start)
     )
 """
 
 # SQL for creating an index on user_analysis_history.
 CREATE_ANALYSIS_HISTORY_INDEX = "CREATE INDEX IF NOT EXISTS idx_user_analysis_history_user_guild ON user_analysis_history (user_id, guild_id)"
+# SQL for creating the guild index on user_analysis_stats, used by every leaderboard query.
+CREATE_ANALYSIS_STATS_INDEX = "CREATE INDEX IF NOT EXISTS idx_user_analysis_stats_guild ON user_analysis_stats (guild_id)"
+# SQL for creating the guild index on user_profiles, used by the monkey-off leaderboards.
+CREATE_USER_PROFILES_GUILD_INDEX = "CREATE INDEX IF NOT EXISTS idx_user_profiles_guild ON user_profiles (guild_id)"
+# SQL for creating the monkeyoff_history indexes. Each one ends in the implicit rowid, so a participant's duels
+# can be paged through in ID order (oldest to newest) with a single index seek per side.
+CREATE_MONKEYOFF_HISTORY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_monkeyoff_history_guild_challenger ON monkeyoff_history (guild_id, challenger_id)",
+    "CREATE INDEX IF NOT EXISTS idx_monkeyoff_history_guild_opponent ON monkeyoff_history (guild_id, opponent_id)",
+    "CREATE INDEX IF NOT EXISTS idx_monkeyoff_history_guild_timestamp ON monkeyoff_history (guild_id, timestamp)",
+]
+# SQL to check whether user_analysis_stats is empty while history (or its rollups) is not (needs backfilling).
+SELECT_ANALYSIS_STATS_NEEDS_BACKFILL = """
+    SELECT NOT EXISTS (SELECT 1 FROM user_analysis_stats)
+           AND (EXISTS (SELECT 1 FROM user_analysis_history) OR EXISTS (SELECT 1 FROM user_analysis_rollups))
+"""
+# SQL to backfill user_analysis_stats from existing history, plus the rollups of history removed by retention.
+BACKFILL_ANALYSIS_STATS = """
+    INSERT INTO user_analysis_stats (user_id, guild_id, analysis_count, sum_iq, sum_monkey,
+                                     min_iq, max_iq, min_monkey, max_monkey, min_combined, max_combined)
+    SELECT user_id, guild_id, SUM(analysis_count), SUM(sum_iq), SUM(sum_monkey),
+           MIN(min_iq), MAX(max_iq), MIN(min_monkey), MAX(max_monkey), MIN(min_combined), MAX(max_combined)
+    FROM (
+        SELECT user_id, guild_id, COUNT(*) AS analysis_count, SUM(iq_score) AS sum_iq, SUM(monkey_percentage) AS sum_monkey,
+               MIN(iq_score) AS min_iq, MAX(iq_score) AS max_iq, MIN(monkey_percentage) AS min_monkey, MAX(monkey_percentage) AS max_monkey,
+               MIN(iq_score + monkey_percentage) AS min_combined, MAX(iq_score + monkey_percentage) AS max_combined
+        FROM user_analysis_history
+        GROUP BY user_id, guild_id
+        UNION ALL
+        SELECT user_id, guild_id, analysis_count, sum_iq, sum_monkey, min_iq, max_iq, min_monkey, max_monkey, min_combined, max_combined
+        FROM user_analysis_rollups
+    )
+    GROUP BY user_id, guild_id
+"""
 # SQL to get table info (for schema migration checks).
 PRAGMA_TABLE_INFO = "PRAGMA table_info(user_profiles)"
+# SQL to set the (persistent) journal mode of the database file.
+PRAGMA_JOURNAL_MODE = "PRAGMA journal_mode = {journal_mode}"
+# SQL to checkpoint the write-ahead log and truncate it to zero bytes.
+PRAGMA_WAL_CHECKPOINT_TRUNCATE = "PRAGMA wal_checkpoint(TRUNCATE)"
+
+# History tables whose timestamps are migrated from ISO-8601 text to epoch seconds.
+HISTORY_TABLES = ("user_analysis_history", "monkeyoff_history")
+# SQL to get the declared type of a history table's timestamp column.
+SELECT_TIMESTAMP_COLUMN_TYPE = "SELECT type FROM pragma_table_info(?) WHERE name = 'timestamp'"
+# SQL for retyping a history table's timestamp column from TEXT to INTEGER in place, through writable_schema.
+# Existing values keep their on-disk encoding (SQLite columns may hold any type), so no rows are rewritten here;
+# the schema version is bumped so every open connection reloads the schema.
+PRAGMA_SCHEMA_VERSION = "PRAGMA schema_version"
+PRAGMA_SET_SCHEMA_VERSION = "PRAGMA schema_version = {version}"
+PRAGMA_WRITABLE_SCHEMA = "PRAGMA writable_schema = {enabled}"
+RETYPE_TIMESTAMP_COLUMN = """
+    UPDATE sqlite_master
+    SET sql = replace(sql, 'timestamp TEXT NOT NULL', 'timestamp INTEGER NOT NULL')
+    WHERE type = 'table' AND name = ?
+"""
+# SQL for retyping the timestamp column by rebuilding the table, for SQLite builds that refuse writable_schema
+# (SQLITE_DBCONFIG_DEFENSIVE): a copy is created with the new column type, filled in ID-ranged chunks, and renamed
+# over the original, whose indexes and AUTOINCREMENT counter are then restored.
+SELECT_TABLE_SCHEMA = "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?"
+SELECT_TABLE_INDEX_SCHEMAS = "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL"
+SELECT_TABLE_SEQUENCE = "SELECT seq FROM sqlite_sequence WHERE name = ?"
+DELETE_TABLE_SEQUENCE = "DELETE FROM sqlite_sequence WHERE name = ?"
+INSERT_TABLE_SEQUENCE = "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)"
+BEGIN_TRANSACTION = "BEGIN"
+DROP_TABLE_IF_EXISTS_BASE = "DROP TABLE IF EXISTS {table}"
+SELECT_TABLE_ROW_COUNT_BASE = "SELECT COUNT(*) FROM {table}"
+COPY_TABLE_ROWS_BASE = "INSERT INTO {target} SELECT * FROM {source} WHERE id BETWEEN ? AND ?"
+RENAME_TABLE_BASE = "ALTER TABLE {source} RENAME TO {target}"
+# Base SQL for the last ID of the next chunk of rows after a given ID, for the timestamp backfill and table rebuilds.
+SELECT_TIMESTAMP_BACKFILL_CHUNK_END_BASE = "SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)"
+# Base SQL for converting a chunk's remaining ISO-8601 timestamps to epoch seconds.
+BACKFILL_TIMESTAMPS_BASE = """
+    UPDATE {table}
+    SET timestamp = CAST(strftime('%s', timestamp) AS INTEGER)
+    WHERE id BETWEEN ? AND ? AND typeof(timestamp) = 'text'
+"""
+
+# PRAGMA profiles selectable through config.DATABASE_PRAGMA_PROFILE.
+# 'journal_mode' is stored in the database file and set once at initialization;
+# the remaining settings are per connection and applied when a pooled connection is opened.
+PRAGMA_PROFILES: dict[str, dict[str, str | int]] = {
+    # SQLite defaults: rollback journal, synchronous=FULL, small page cache.
+    "default": {},
+    # Concurrent readers alongside a single writer. A commit only syncs the WAL at checkpoints,
+    # so a power loss can drop the last few (already acknowledged) transactions but never corrupts the database.
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,      # Negative values are KiB, i.e. a 64 MiB page cache.
+        "mmap_size": 268435456,    # Map up to 256 MiB of the database file.
+        "temp_store": "MEMORY",
+    },
+    # Same as 'wal' but syncs the WAL on every commit, so a committed write survives power loss. The default.
+    "wal_durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    },
+}
 # SQL to add 'username' column.
 ALTER_ADD_USERNAME = "ALTER TABLE user_profiles ADD COLUMN username TEXT"
 # SQL to add 'last_iq_score' column.
@@ -93,6 +262,22 @@ UPDATE_USER_PROFILE_ANALYSIS = """
         analysis_tests_taken = analysis_tests_taken + 1
     WHERE user_id = ? AND guild_id = ?
 """
+# SQL for folding one analysis result into user_analysis_stats.
+UPSERT_ANALYSIS_STATS = """
+    INSERT INTO user_analysis_stats (user_id, guild_id, analysis_count, sum_iq, sum_monkey,
+                                     min_iq, max_iq, min_monkey, max_monkey, min_combined, max_combined)
+    VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, guild_id) DO UPDATE SET
+        analysis_count = analysis_count + excluded.analysis_count,
+        sum_iq = sum_iq + excluded.sum_iq,
+        sum_monkey = sum_monkey + excluded.sum_monkey,
+        min_iq = MIN(min_iq, excluded.min_iq),
+        max_iq = MAX(max_iq, excluded.max_iq),
+        min_monkey = MIN(min_monkey, excluded.min_monkey),
+        max_monkey = MAX(max_monkey, excluded.max_monkey),
+        min_combined = MIN(min_combined, excluded.min_combined),
+        max_combined = MAX(max_combined, excluded.max_combined)
+"""
 # SQL for updating user profile after a monkey-off.
 UPDATE_USER_PROFILE_MONKEYOFF_STATS = """
     UPDATE user_profiles
@@ -101,30 +286,122 @@ UPDATE_USER_PROFILE_MONKEYOFF_STATS = """
         total_monkeyoffs = total_monkeyoffs + 1
     WHERE user_id = ? AND guild_id = ?
 """
-# SQL for selecting average analysis data for a guild.
-SELECT_AVERAGE_ANALYSIS_FOR_GUILD = """
-    SELECT
-        user_id,
-        CAST(AVG(iq_score) AS REAL) as avg_iq,
-        CAST(AVG(monkey_percentage) AS REAL) as avg_monkey
+# SQL for selecting the next chunk of analysis history rows older than a cutoff, in insertion order.
+SELECT_EXPIRED_ANALYSIS_HISTORY = """
+    SELECT id, user_id, guild_id, iq_score, monkey_percentage, timestamp
     FROM user_analysis_history
-    WHERE guild_id = ?
-    GROUP BY user_id
-    HAVING COUNT(id) > 0
+    WHERE id > ? AND timestamp < ?
+    ORDER BY id
+    LIMIT ?
+"""
+# SQL for selecting the next chunk of monkey-off history rows older than a cutoff, in insertion order.
+SELECT_EXPIRED_MONKEYOFF_HISTORY = """
+    SELECT id, challenger_id, opponent_id, guild_id, challenger_percentage, opponent_percentage, winner_id, timestamp
+    FROM monkeyoff_history
+    WHERE id > ? AND timestamp < ?
+    ORDER BY id
+    LIMIT ?
 """
-# Base SQL for selecting a single analysis record per user.
-SELECT_SINGLE_RECORD_ANALYSIS_BASE = """
-    SELECT user_id, iq_score, monkey_percentage
+# SQL for deleting a rolled-up chunk: the rows older than the cutoff within an ID range.
+DELETE_EXPIRED_ANALYSIS_HISTORY = "DELETE FROM user_analysis_history WHERE id BETWEEN ? AND ? AND timestamp < ?"
+DELETE_EXPIRED_MONKEYOFF_HISTORY = "DELETE FROM monkeyoff_history WHERE id BETWEEN ? AND ? AND timestamp < ?"
+# SQL for streaming a guild's analysis history in ID order, one chunk after a given ID at a time.
+SELECT_ANALYSIS_HISTORY_CHUNK = """
+    SELECT id, user_id, iq_score, monkey_percentage, timestamp
+    FROM user_analysis_history
+    WHERE guild_id = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+# SQL for streaming one user's analysis history in a guild in ID order, one chunk at a time.
+SELECT_USER_ANALYSIS_HISTORY_CHUNK = """
+    SELECT id, user_id, iq_score, monkey_percentage, timestamp
+    FROM user_analysis_history
+    WHERE user_id = ? AND guild_id = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+# Base SQL for one page of a user's duels in a guild, in ID order, after (or before) a cursor ID.
+# Each side is a limited seek on its participant index; {comparison} is '>' or '<' and {direction} 'ASC' or 'DESC' to match.
+SELECT_USER_MONKEYOFF_HISTORY_BASE = """
+    SELECT id, challenger_id, opponent_id, challenger_percentage, opponent_percentage, winner_id, timestamp
     FROM (
-        SELECT
-            user_id,
-            iq_score,
-            monkey_percentage,
-            ROW_NUMBER() OVER(PARTITION BY user_id ORDER BY {order_by_clause} {direction}) as rn
-        FROM user_analysis_history
-        WHERE guild_id = ?
+        SELECT * FROM (
+            SELECT id, challenger_id, opponent_id, challenger_percentage, opponent_percentage, winner_id, timestamp
+            FROM monkeyoff_history INDEXED BY idx_monkeyoff_history_guild_challenger
+            WHERE guild_id = ? AND challenger_id = ? AND id {comparison} ?
+            ORDER BY id {direction}
+            LIMIT ?
+        )
+        UNION
+        SELECT * FROM (
+            SELECT id, challenger_id, opponent_id, challenger_percentage, opponent_percentage, winner_id, timestamp
+            FROM monkeyoff_history INDEXED BY idx_monkeyoff_history_guild_opponent
+            WHERE guild_id = ? AND opponent_id = ? AND id {comparison} ?
+            ORDER BY id {direction}
+            LIMIT ?
+        )
     )
-    WHERE rn = 1
+    ORDER BY id {direction}
+    LIMIT ?
+"""
+# SQL for a page of a user's duels, newest first, before a cursor ID.
+SELECT_USER_MONKEYOFF_HISTORY_PAGE = SELECT_USER_MONKEYOFF_HISTORY_BASE.format(comparison="<", direction="DESC")
+# SQL for streaming a user's duels oldest first, one chunk after a given ID at a time.
+SELECT_USER_MONKEYOFF_HISTORY_CHUNK = SELECT_USER_MONKEYOFF_HISTORY_BASE.format(comparison=">", direction="ASC")
+# SQL for the head-to-head record of two users in a guild: duels, and wins of each of them (the rest are ties).
+SELECT_MONKEYOFF_HEAD_TO_HEAD = """
+    SELECT COUNT(*) AS duels, COALESCE(SUM(winner_id = ?), 0) AS user_wins, COALESCE(SUM(winner_id = ?), 0) AS opponent_wins
+    FROM monkeyoff_history
+    WHERE guild_id = ? AND ((challenger_id = ? AND opponent_id = ?) OR (challenger_id = ? AND opponent_id = ?))
+"""
+# SQL to check whether retention has removed any of a user's duels in a guild (they were rolled up).
+SELECT_HAS_MONKEYOFF_ROLLUPS_FOR_USER = "SELECT EXISTS (SELECT 1 FROM monkeyoff_rollups WHERE guild_id = ? AND user_id = ?)"
+# SQL for streaming a guild's monkey-off history in ID order, one chunk at a time.
+SELECT_MONKEYOFF_HISTORY_CHUNK = """
+    SELECT id, challenger_id, opponent_id, challenger_percentage, opponent_percentage, winner_id, timestamp
+    FROM monkeyoff_history
+    WHERE guild_id = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+"""
+# SQL for folding one bucket of removed analysis rows into user_analysis_rollups.
+UPSERT_ANALYSIS_ROLLUP = """
+    INSERT INTO user_analysis_rollups (guild_id, user_id, period, bucket_start, analysis_count, sum_iq, sum_monkey,
+                                       min_iq, max_iq, min_monkey, max_monkey, min_combined, max_combined)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(guild_id, user_id, period, bucket_start) DO UPDATE SET
+        analysis_count = analysis_count + excluded.analysis_count,
+        sum_iq = sum_iq + excluded.sum_iq,
+        sum_monkey = sum_monkey + excluded.sum_monkey,
+        min_iq = MIN(min_iq, excluded.min_iq),
+        max_iq = MAX(max_iq, excluded.max_iq),
+        min_monkey = MIN(min_monkey, excluded.min_monkey),
+        max_monkey = MAX(max_monkey, excluded.max_monkey),
+        min_combined = MIN(min_combined, excluded.min_combined),
+        max_combined = MAX(max_combined, excluded.max_combined)
+"""
+# SQL for folding one participant's removed monkey-offs of a bucket into monkeyoff_rollups.
+UPSERT_MONKEYOFF_ROLLUP = """
+    INSERT INTO monkeyoff_rollups (guild_id, user_id, period, bucket_start, duels, wins, losses)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(guild_id, user_id, period, bucket_start) DO UPDATE SET
+        duels = duels + excluded.duels,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses
+"""
+# SQL for reading a bot_metadata value.
+SELECT_METADATA_VALUE = "SELECT value FROM bot_metadata WHERE key = ?"
+# SQL for storing a bot_metadata value.
+UPSERT_METADATA_VALUE = """
+    INSERT INTO bot_metadata (key, value) VALUES (?, ?)
+    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+"""
+# SQL for selecting the stored usernames of several users in a guild. {placeholders} is one '?' per user ID.
+SELECT_USERNAMES_FOR_GUILD_BASE = """
+    SELECT user_id, username
+    FROM user_profiles
+    WHERE guild_id = ? AND user_id IN ({placeholders}) AND username IS NOT NULL
 """
 # SQL for selecting a user's profile.
 SELECT_USER_PROFILE = """
@@ -132,65 +409,290 @@ SELECT_USER_PROFILE = """
     FROM user_profiles
     WHERE user_id = ? AND guild_id = ?
 """
-# SQL for selecting top monkey-off wins for a guild.
-SELECT_TOP_WINS_FOR_GUILD = """
-    SELECT user_id, monkeyoff_wins
-    FROM user_profiles
-    WHERE guild_id = ? AND monkeyoff_wins > 0
-    ORDER BY monkeyoff_wins DESC
-    LIMIT 10
+# Leaderboard sources: (table, value expression, row filter) per ranking.
+# Analysis averages and records come from user_analysis_stats, monkey-off rankings from user_profiles.
+ANALYSIS_AVERAGE_RANKING_SOURCES = {
+    "combined": ("user_analysis_stats", "CAST(sum_iq + sum_monkey AS REAL) / analysis_count", "analysis_count > 0"),
+    "iq": ("user_analysis_stats", "CAST(sum_iq AS REAL) / analysis_count", "analysis_count > 0"),
+    "monkey": ("user_analysis_stats", "CAST(sum_monkey AS REAL) / analysis_count", "analysis_count > 0"),
+}
+MONKEYOFF_RANKING_SOURCES = {
+    "wins": ("user_profiles", "monkeyoff_wins", "monkeyoff_wins > 0"),
+    "win_rate": ("user_profiles", "CAST(monkeyoff_wins AS REAL) * 100 / total_monkeyoffs", "total_monkeyoffs > 0"),
+}
+# Base SQL for selecting the top N users of a leaderboard. Ties are broken by user_id so ranks are stable.
+SELECT_RANKING_BASE = """
+    SELECT user_id, {value_expression} AS value
+    FROM {table}
+    WHERE guild_id = ? AND {row_filter}
+    ORDER BY value {direction}, user_id
+    LIMIT ?
 """
-# SQL for selecting top monkey-off win rates for a guild.
-SELECT_TOP_WIN_RATE_FOR_GUILD = """
-    SELECT user_id, CAST(monkeyoff_wins AS REAL) * 100 / total_monkeyoffs AS win_rate
-    FROM user_profiles
-    WHERE guild_id = ? AND total_monkeyoffs > 0
-    ORDER BY win_rate DESC
-    LIMIT 10
+# Base SQL for selecting one user's value and 1-based rank on a leaderboard.
+# Counts users ranked ahead of the target with the same ordering and tie-break as SELECT_RANKING_BASE.
+SELECT_RANK_FOR_USER_BASE = """
+    SELECT target.value, (
+        SELECT COUNT(*)
+        FROM {table} other
+        WHERE other.guild_id = target.guild_id AND {row_filter}
+          AND ({value_expression} {ahead} target.value
+               OR ({value_expression} = target.value AND other.user_id < target.user_id))
+    ) + 1 AS rank
+    FROM (
+        SELECT user_id, guild_id, {value_expression} AS value
+        FROM {table}
+        WHERE user_id = ? AND guild_id = ? AND {row_filter}
+    ) target
 """
 
+# Rollup periods and their length in days.
+ROLLUP_PERIODS = {"day": 1, "week": 7}
+# Seconds in a day.
+SECONDS_PER_DAY = 86400
+
+def _bucket_start(timestamp: int, period: str) -> int:
+    """Returns the UTC epoch second at which the day or week (starting Monday) containing `timestamp` begins."""
+    day = timestamp // SECONDS_PER_DAY
+    if period == "week":
+        # Day 0 (1970-01-01) was a Thursday, three days after a Monday.
+        day -= (day + 3) % 7
+    return day * SECONDS_PER_DAY
+
+def _epoch_seconds(timestamp: int | str) -> int:
+    """Returns a history timestamp as epoch seconds, converting ISO-8601 text not yet backfilled."""
+    return timestamp if isinstance(timestamp, int) else int(datetime.fromisoformat(timestamp).timestamp())
+
+def _history_row(row: sqlite3.Row) -> tuple:
+    """Returns a history row ending in its timestamp as a tuple, with the timestamp as epoch seconds."""
+    if isinstance(row[-1], str):
+        return (*row[:-1], _epoch_seconds(row[-1]))
+    return tuple(row)
+
+def _roll_up_analysis_rows(rows: list[sqlite3.Row], period: str) -> list[tuple]:
+    """Aggregates analysis history rows into UPSERT_ANALYSIS_ROLLUP parameters, one per user and bucket."""
+    buckets: dict[tuple, list[int]] = {}
+    for row in rows:
+        iq, monkey = row['iq_score'], row['monkey_percentage']
+        key = (row['guild_id'], row['user_id'], period, _bucket_start(row['timestamp'], period))
+        aggregate = buckets.get(key)
+        if aggregate is None:
+            buckets[key] = [1, iq, monkey, iq, iq, monkey, monkey, iq + monkey, iq + monkey]
+            continue
+        aggregate[0] += 1
+        aggregate[1] += iq
+        aggregate[2] += monkey
+        aggregate[3], aggregate[4] = min(aggregate[3], iq), max(aggregate[4], iq)
+        aggregate[5], aggregate[6] = min(aggregate[5], monkey), max(aggregate[6], monkey)
+        aggregate[7], aggregate[8] = min(aggregate[7], iq + monkey), max(aggregate[8], iq + monkey)
+    return [(*key, *aggregate) for key, aggregate in buckets.items()]
+
+def _roll_up_monkeyoff_rows(rows: list[sqlite3.Row], period: str) -> list[tuple]:
+    """Aggregates monkey-off history rows into UPSERT_MONKEYOFF_ROLLUP parameters, one per participant and bucket."""
+    buckets: dict[tuple, list[int]] = {}
+    for row in rows:
+        bucket_start = _bucket_start(row['timestamp'], period)
+        for user_id in (row['challenger_id'], row['opponent_id']):
+            aggregate = buckets.setdefault((row['guild_id'], user_id, period, bucket_start), [0, 0, 0])
+            aggregate[0] += 1
+            if row['winner_id'] == user_id:
+                aggregate[1] += 1
+            elif row['winner_id'] is not None:
+                aggregate[2] += 1
+    return [(*key, duels, wins, losses) for key, (duels, wins, losses) in buckets.items()]
+
+class _BackupRestartedError(Exception):
+    """Raised from a backup progress callback to stop stepping after too many restarts."""
+
 class DatabaseManager:
     """Manages SQLite database connections and operations for the bot."""
     def __init__(self) -> None:
         # Private attribute to store the database file path.
         self._db_file_path: str | None = None
+        # Pool of reusable, thread-affine connections. Created once the path is configured.
+        self._pool: ConnectionPool | None = None
+        # Cache of leaderboard results, invalidated per guild whenever results are recorded there.
+        self.leaderboard_cache = LeaderboardCache(
+            max_entries=constants.LEADERBOARD_CACHE_MAX_ENTRIES,
+            ttl_seconds=constants.LEADERBOARD_CACHE_TTL_SECONDS,
+        )
+        # Journal mode set at initialization, and SQL statements applied once to every new connection.
+        self._journal_mode: str | None = None
+        self._connection_pragmas: list[str] = []
+        # Optional cold archive that history is appended to before retention deletes it.
+        self.history_archive: HistoryArchive | None = None
+        # Whether retention has ever deleted monkey-off history that the archive doesn't hold.
+        self._unarchived_monkeyoff_removals = False
+        # Highest row ID per history table that retention has deleted. Archived rows above it are still live.
+        self._rolled_up_through: dict[str, int] = {}
+        # Last backfilled ID per history table whose text timestamps are still being converted to epoch seconds.
+        self._timestamp_backfill_ids: dict[str, int] = {}
+
+    @property
+    def uses_wal(self) -> bool:
+        """Whether the configured PRAGMA profile puts the database in WAL mode."""
+        return (self._journal_mode or "").upper() == "WAL"
 
-    def configure_database_path(self, path: str) -> None:
-        """Sets the database file path."""
+    def configure_pragma_profile(self, profile: str, cache_size: int | None = None, mmap_size: int | None = None) -> None:
+        """
+        Selects the PRAGMA profile applied at initialization and to each new connection.
+        `cache_size` and `mmap_size` override the profile's values when given.
+        Must be called before the first connection is opened.
+        """
+        if profile not in PRAGMA_PROFILES:
+            logger.warning(f"Unknown database PRAGMA profile '{profile}'. Falling back to 'default'.")
+            profile = "default"
+        settings = dict(PRAGMA_PROFILES[profile])
+        if cache_size is not None:
+            settings["cache_size"] = cache_size
+        if mmap_size is not None:
+            settings["mmap_size"] = mmap_size
+
+        self._journal_mode = settings.pop("journal_mode", None)
+        self._connection_pragmas = [f"PRAGMA {name} = {value}" for name, value in settings.items()]
+        logger.info(f"Database PRAGMA profile '{profile}' selected: journal_mode={self._journal_mode or 'default'}, {', '.join(self._connection_pragmas) or 'no connection PRAGMAs'}.")
+
+    @property
+    def pool_size(self) -> int:
+        """Maximum number of pooled connections, matching the worker threads that use them."""
+        return self._pool.max_size if self._pool else default_pool_size()
+
+    def configure_database_path(self, path: str, pool_size: int | None = None) -> None:
+        """Sets the database file path and creates the connection pool for it."""
         self._db_file_path = path
         logger.info(f"Database path has been configured internally to: {self._db_file_path}")
+        # Create the directory once here instead of on every connection.
+        db_dir = os.path.dirname(self._db_file_path) if self._db_file_path else ""
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        if self._pool:
+            self._pool.close()
+        self._pool = ConnectionPool(
+            self._get_new_connection,
+            max_size=pool_size or default_pool_size(),
+            health_check_interval=constants.DB_HEALTH_CHECK_INTERVAL_SECONDS,
+        )
+        logger.info(f"Database connection pool sized to {self._pool.max_size} connections.")
+
+    def configure_history_archive(self, directory: str) -> None:
+        """Archives history into compressed files under `directory` before roll_up_history deletes it."""
+        self.history_archive = HistoryArchive(directory)
+        logger.info(f"History archive configured at: {directory}")
 
     def _get_new_connection(self) -> sqlite3.Connection:
         """
-        Opens a new SQLite database connection.
-        This method is intended to be called within the thread where the connection is used.
+        Opens and configures a new SQLite database connection.
+        Pooled connections are shared with the pool's owning thread only, so thread checks are disabled
+        to allow the pool to close them from the shutdown thread.
         """
         if self._db_file_path is None:
             logger.critical("Database path not configured. Call configure_database_path() first.")
             raise RuntimeError("Database path not configured before attempting connection.")
-        # Create directory if it doesn't exist and establish connection.
         try:
-            db_dir = os.path.dirname(self._db_file_path)
-            if db_dir:
-                os.makedirs(db_dir, exist_ok=True)
-            conn = sqlite3.connect(self._db_file_path, timeout=15.0)
+            conn = sqlite3.connect(self._db_file_path, timeout=15.0, check_same_thread=False)
             conn.row_factory = sqlite3.Row
+            # Apply per-connection PRAGMAs once, when the connection is opened.
+            for pragma in self._connection_pragmas:
+                conn.execute(pragma)
             return conn
         except sqlite3.Error as e:
             logger.error(f"Failed to open database connection: {e}", exc_info=True)
             raise
 
+    @contextmanager
+    def _get_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Yields the calling thread's pooled connection inside a transaction.
+        Commits on success and rolls back on exception, like using the connection as a context manager.
+        """
+        if self._pool is None:
+            logger.critical("Database path not configured. Call configure_database_path() first.")
+            raise RuntimeError("Database path not configured before attempting connection.")
+        with self._pool.connection() as conn:
+            with conn:
+                yield conn
+
+    @timed_db_operation
+    def checkpoint_wal(self) -> tuple[int, int, int] | None:
+        """
+        Checkpoints the write-ahead log and truncates it, so the WAL file does not grow between restarts.
+        Returns (busy, wal_pages, checkpointed_pages), or None on error.
+        """
+        try:
+            with self._get_connection() as conn:
+                busy, wal_pages, checkpointed = conn.execute(PRAGMA_WAL_CHECKPOINT_TRUNCATE).fetchone()
+                return busy, wal_pages, checkpointed
+        except sqlite3.Error as e:
+            logger.error(f"Error checkpointing the write-ahead log: {e}", exc_info=True)
+            return None
+
+    @timed_db_operation
+    def backup_to(self, destination_path: str, pages_per_step: int, step_sleep: float, max_restarts: int) -> bool:
+        """
+        Writes a consistent snapshot of the database to `destination_path` with the SQLite online backup API.
+        Copies `pages_per_step` pages at a time and sleeps `step_sleep` seconds between steps so writers keep
+        making progress. SQLite restarts the copy whenever another connection writes mid-backup; after
+        `max_restarts` restarts the rest is copied in one step so the backup is guaranteed to finish.
+        Meant to run in an executor. Returns True on success.
+        """
+        restarts = 0
+        last_remaining: int | None = None
+
+        def on_progress(status: int, remaining: int, total: int) -> None:
+            nonlocal restarts, last_remaining
+            # More pages remaining than after the previous step means the backup started over.
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > max_restarts:
+                    raise _BackupRestartedError()
+            last_remaining = remaining
+            time.sleep(step_sleep)
+
+        started = time.perf_counter()
+        try:
+            with closing(self._get_new_connection()) as source, closing(sqlite3.connect(destination_path)) as destination:
+                try:
+                    source.backup(destination, pages=pages_per_step, progress=on_progress)
+                except _BackupRestartedError:
+                    logger.warning(f"Backup restarted {restarts} times under concurrent writes; copying the rest in one step.")
+                    source.backup(destination, pages=-1)
+            logger.info(f"Database snapshot written to {destination_path} in {time.perf_counter() - started:.2f} s ({restarts} restarts).")
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error backing up database to {destination_path}: {e}", exc_info=True)
+            return False
+
+    def explain_query_plan(self, query: str, params: tuple = ()) -> list[str]:
+        """Returns the 'detail' lines of EXPLAIN QUERY PLAN for a query, for plan regression checks."""
+        with self._get_connection() as conn:
+            return [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()]
+
+    def close(self) -> None:
+        """Closes all pooled database connections."""
+        if self._pool:
+            self._pool.close()
+
+    @timed_db_operation
     def initialize_database(self):
-        """Creates necessary tables and performs schema migrations if they don't exist."""
+        """
+        Creates necessary tables and performs schema migrations if they don't exist.
+        Raises RuntimeError if the history timestamp migration cannot be applied, rather than starting on a half-migrated schema.
+        """
         if self._db_file_path is None:
             logger.critical("Database path not configured for initialization. Call configure_database_path() first.")
             return
         try:
-            with self._get_new_connection() as conn:
+            # Initialization is a one-off, so it uses its own connection instead of a pooled one.
+            with closing(self._get_new_connection()) as conn, conn:
                 cursor = conn.cursor()
+
+                # Switch the journal mode first; it cannot be changed inside a transaction.
+                if self._journal_mode:
+                    cursor.execute(PRAGMA_JOURNAL_MODE.format(journal_mode=self._journal_mode))
+                    logger.info(f"Database journal mode is '{cursor.fetchone()[0]}'.")
                 
                 # Create user_profiles table.
                 cursor.execute(CREATE_USER_PROFILES_TABLE)
+                cursor.execute(CREATE_USER_PROFILES_GUILD_INDEX)
                 
                 # Check existing columns for schema migrations.
                 cursor.execute(PRAGMA_TABLE_INFO)
@@ -231,15 +733,199 @@ class DatabaseManager:
                 logger.info("Checked/created 'user_profiles' table.")
                 logger.info("Checked/created 'user_analysis_history' table and index.")
                 
-                # Create monkeyoff_history table.
+                # Create the rollup tables that summarize history removed by retention.
+                cursor.execute(CREATE_USER_ANALYSIS_ROLLUPS_TABLE)
+                cursor.execute(CREATE_MONKEYOFF_ROLLUPS_TABLE)
+                logger.info("Checked/created 'user_analysis_rollups' and 'monkeyoff_rollups' tables.")
+
+                # Create user_analysis_stats table and backfill it from existing history (and its rollups) once.
+                cursor.execute(CREATE_USER_ANALYSIS_STATS_TABLE)
+                cursor.execute(CREATE_ANALYSIS_STATS_INDEX)
+                cursor.execute(SELECT_ANALYSIS_STATS_NEEDS_BACKFILL)
+                if cursor.fetchone()[0]:
+                    cursor.execute(BACKFILL_ANALYSIS_STATS)
+                    logger.info(f"Backfilled 'user_analysis_stats' for {cursor.rowcount} users from history.")
+                logger.info("Checked/created 'user_analysis_stats' table and index.")
+                
+                # Create monkeyoff_history table and its indexes.
                 cursor.execute(CREATE_MONKEYOFF_HISTORY_TABLE)
-                logger.info("Checked/created 'monkeyoff_history' table.")
+                for index_sql in CREATE_MONKEYOFF_HISTORY_INDEXES:
+                    cursor.execute(index_sql)
+                logger.info("Checked/created 'monkeyoff_history' table and indexes.")
+
+                # Create bot_metadata table.
+                cursor.execute(CREATE_BOT_METADATA_TABLE)
+                logger.info("Checked/created 'bot_metadata' table.")
+
+                cursor.execute(SELECT_METADATA_VALUE, (constants.UNARCHIVED_MONKEYOFF_REMOVALS_METADATA_KEY,))
+                self._unarchived_monkeyoff_removals = cursor.fetchone() is not None
+                for table in HISTORY_TABLES:
+                    cursor.execute(SELECT_METADATA_VALUE, (constants.ROLLED_UP_THROUGH_METADATA_KEY.format(table=table),))
+                    row = cursor.fetchone()
+                    self._rolled_up_through[table] = int(row['value']) if row else 0
+
+                # Migrate history timestamps from ISO-8601 text to epoch seconds: retype the columns now, and
+                # convert the existing rows in the background with backfill_history_timestamps.
+                self._timestamp_backfill_ids = {}
+                for table in HISTORY_TABLES:
+                    metadata_key = constants.TIMESTAMP_BACKFILL_METADATA_KEY.format(table=table)
+                    cursor.execute(SELECT_TIMESTAMP_COLUMN_TYPE, (table,))
+                    if cursor.fetchone()[0].upper() == "TEXT":
+                        self._retype_timestamp_column(cursor, table)
+                        cursor.execute(UPSERT_METADATA_VALUE, (metadata_key, "0"))
+                        logger.info(f"Retyped '{table}.timestamp' to INTEGER epoch seconds; existing rows will be backfilled.")
+                    cursor.execute(SELECT_METADATA_VALUE, (metadata_key,))
+                    row = cursor.fetchone()
+                    if row and row['value'] != "done":
+                        self._timestamp_backfill_ids[table] = int(row['value'])
                 
                 # The 'with' statement handles commit on success and rollback on exception.
                 logger.info("Database tables checked/created successfully.")
         except sqlite3.Error as e:
             logger.error(f"Error initializing database: {e}", exc_info=True)
 
+    @staticmethod
+    def _retype_timestamp_column(cursor: sqlite3.Cursor, table: str) -> None:
+        """
+        Changes a history table's declared timestamp type from TEXT to INTEGER. The schema is edited in place where
+        SQLite allows it, and the table is rebuilt otherwise. Raises RuntimeError if neither works: left as TEXT,
+        the column would silently store new epoch seconds as strings.
+        """
+        try:
+            DatabaseManager._edit_timestamp_column_type(cursor, table)
+            return
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"Could not retype '{table}.timestamp' in place ({e}); rebuilding the table instead.")
+        try:
+            DatabaseManager._rebuild_with_integer_timestamp(cursor, table, constants.TIMESTAMP_REBUILD_BATCH_ROWS)
+            cursor.execute(SELECT_TIMESTAMP_COLUMN_TYPE, (table,))
+            if cursor.fetchone()[0].upper() != "INTEGER":
+                raise sqlite3.DatabaseError("its schema differs from the expected one")
+        except sqlite3.Error as e:
+            logger.critical(f"Could not rebuild '{table}' with an INTEGER timestamp column: {e}", exc_info=True)
+            raise RuntimeError(f"Migrating '{table}.timestamp' to INTEGER epoch seconds failed; refusing to start.") from e
+
+    @staticmethod
+    def _edit_timestamp_column_type(cursor: sqlite3.Cursor, table: str) -> None:
+        """Changes the declared timestamp type through writable_schema, without rewriting the table."""
+        cursor.execute(PRAGMA_SCHEMA_VERSION)
+        schema_version = cursor.fetchone()[0]
+        cursor.execute(PRAGMA_WRITABLE_SCHEMA.format(enabled="ON"))
+        try:
+            cursor.execute(RETYPE_TIMESTAMP_COLUMN, (table,))
+            cursor.execute(PRAGMA_SET_SCHEMA_VERSION.format(version=schema_version + 1))
+        finally:
+            cursor.execute(PRAGMA_WRITABLE_SCHEMA.format(enabled="OFF"))
+        cursor.execute(SELECT_TIMESTAMP_COLUMN_TYPE, (table,))
+        if cursor.fetchone()[0].upper() != "INTEGER":
+            raise sqlite3.DatabaseError(f"Could not retype '{table}.timestamp'; its schema differs from the expected one.")
+
+    @staticmethod
+    def _rebuild_with_integer_timestamp(cursor: sqlite3.Cursor, table: str, batch_rows: int) -> None:
+        """
+        Recreates a history table with an INTEGER timestamp column, keeping its rows, indexes and AUTOINCREMENT
+        counter. Rows keep their stored values; text timestamps are converted later by the backfill.
+        Rows are copied in chunks of `batch_rows`, one transaction each, so the write lock is only held briefly.
+        """
+        rebuilt = f"{table}_retyped"
+        cursor.execute(SELECT_TABLE_SCHEMA, (table,))
+        create_sql = cursor.fetchone()[0].replace(table, rebuilt, 1).replace("timestamp TEXT NOT NULL", "timestamp INTEGER NOT NULL")
+        cursor.execute(SELECT_TABLE_INDEX_SCHEMAS, (table,))
+        index_sqls = [row[0] for row in cursor.fetchall()]
+        cursor.execute(SELECT_TABLE_SEQUENCE, (table,))
+        row = cursor.fetchone()
+        cursor.execute(SELECT_TABLE_ROW_COUNT_BASE.format(table=table))
+        row_count = cursor.fetchone()[0]
+        logger.warning(f"Rebuilding '{table}' to retype its timestamp column: copying {row_count} rows. Startup continues once it is done.")
+
+        # Fill the copy chunk by chunk. Until the swap below commits, the original table stays in place,
+        # and a partial copy left by a crash is dropped and redone on the next start.
+        connection = cursor.connection
+        if connection.in_transaction:
+            connection.commit()
+        cursor.execute(DROP_TABLE_IF_EXISTS_BASE.format(table=rebuilt))
+        cursor.execute(create_sql)
+        last_id = 0
+        while True:
+            cursor.execute(SELECT_TIMESTAMP_BACKFILL_CHUNK_END_BASE.format(table=table), (last_id, batch_rows))
+            chunk_end = cursor.fetchone()[0]
+            if chunk_end is None:
+                break
+            cursor.execute(COPY_TABLE_ROWS_BASE.format(target=rebuilt, source=table), (last_id + 1, chunk_end))
+            connection.commit()
+            last_id = chunk_end
+
+        # Swap the copy in with one transaction, so a failure leaves the original table in place.
+        cursor.execute(BEGIN_TRANSACTION)
+        cursor.execute(DROP_TABLE_IF_EXISTS_BASE.format(table=table))
+        cursor.execute(RENAME_TABLE_BASE.format(source=rebuilt, target=table))
+        for index_sql in index_sqls:
+            cursor.execute(index_sql)
+        # Keep IDs of deleted rows from being reused.
+        if row is not None:
+            cursor.execute(DELETE_TABLE_SEQUENCE, (table,))
+            cursor.execute(INSERT_TABLE_SEQUENCE, (table, row[0]))
+        logger.info(f"Rebuilt '{table}' with an INTEGER timestamp column ({row_count} rows, {len(index_sqls)} index(es) restored).")
+
+    @property
+    def timestamp_backfill_pending(self) -> bool:
+        """Whether some history rows may still hold ISO-8601 text timestamps."""
+        return bool(self._timestamp_backfill_ids)
+
+    @timed_db_operation
+    def backfill_history_timestamps(self, batch_rows: int) -> int:
+        """
+        Converts the next chunk of `batch_rows` history rows from ISO-8601 text to epoch second timestamps in one short
+        transaction, and records the progress in bot_metadata so a restart resumes where it stopped.
+        Until a row is converted, retention doesn't treat it as expired (text sorts after every integer) and
+        readers convert its timestamp when reading it. Returns the number of rows converted.
+        """
+        if not self._timestamp_backfill_ids:
+            return 0
+        table, last_id = next(iter(self._timestamp_backfill_ids.items()))
+        metadata_key = constants.TIMESTAMP_BACKFILL_METADATA_KEY.format(table=table)
+        try:
+            with self._get_connection() as conn:
+                chunk_end = conn.execute(SELECT_TIMESTAMP_BACKFILL_CHUNK_END_BASE.format(table=table), (last_id, batch_rows)).fetchone()[0]
+                if chunk_end is None:
+                    conn.execute(UPSERT_METADATA_VALUE, (metadata_key, "done"))
+                    converted = 0
+                else:
+                    converted = conn.execute(BACKFILL_TIMESTAMPS_BASE.format(table=table), (last_id + 1, chunk_end)).rowcount
+                    conn.execute(UPSERT_METADATA_VALUE, (metadata_key, str(chunk_end)))
+        except sqlite3.Error as e:
+            logger.error(f"Error backfilling epoch timestamps in '{table}' after ID {last_id}: {e}", exc_info=True)
+            return 0
+        if chunk_end is None:
+            del self._timestamp_backfill_ids[table]
+            logger.info(f"Finished backfilling epoch timestamps in '{table}'.")
+        else:
+            self._timestamp_backfill_ids[table] = chunk_end
+        return converted
+
+    @timed_db_operation
+    def get_metadata(self, key: str) -> str | None:
+        """Reads a value from bot_metadata. Returns None if it is unset or cannot be read."""
+        try:
+            with self._get_connection() as conn:
+                row = conn.execute(SELECT_METADATA_VALUE, (key,)).fetchone()
+                return row['value'] if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Error reading metadata '{key}': {e}", exc_info=True)
+            return None
+
+    @timed_db_operation
+    def set_metadata(self, key: str, value: str) -> bool:
+        """Stores a value in bot_metadata, replacing any previous value."""
+        try:
+            with self._get_connection() as conn:
+                conn.execute(UPSERT_METADATA_VALUE, (key, value))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Error storing metadata '{key}': {e}", exc_info=True)
+            return False
+
+    @timed_db_operation
     def ensure_user_exists(self, user_id: int, guild_id: int, username: str | None = None) -> bool:
         """
         Ensures a user profile exists for a given user and guild.
@@ -248,7 +934,7 @@ class DatabaseManager:
         current_username = username if username is not None else "UnknownUser"
         
         try:
-            with self._get_new_connection() as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 # Use INSERT ... ON CONFLICT DO UPDATE to handle both insertion and updating username atomically.
                 cursor.execute(UPSERT_USER_PROFILE, (user_id, guild_id, current_username))
@@ -257,145 +943,372 @@ class DatabaseManager:
         except sqlite3.Error as e:
             logger.error(f"Error ensuring user profile exists for user {user_id} in guild {guild_id}: {e}", exc_info=True)
             return False
+    @staticmethod
+    def utc_timestamp() -> int:
+        """Returns the current UTC time in the format stored in history tables (epoch seconds)."""
+        return int(time.time())
+
+    def _write_analysis_results(self, cursor: sqlite3.Cursor, results: list[tuple]) -> None:
+        """
+        Writes analysis results using the given cursor, batching each statement with executemany.
+        Each result is (user_id, guild_id, iq_score, monkey_percentage, username, timestamp).
+        """
+        # Ensure user profiles exist or update usernames.
+        cursor.executemany(UPSERT_USER_PROFILE, [(r[0], r[1], r[4]) for r in results])
+        # Insert into history table.
+        cursor.executemany(INSERT_ANALYSIS_HISTORY, [(r[0], r[1], r[2], r[3], r[5]) for r in results])
+        # Update user_profiles with last scores and increment tests_taken, in submission order.
+        cursor.executemany(UPDATE_USER_PROFILE_ANALYSIS, [(r[2], r[3], r[0], r[1]) for r in results])
+        # Fold each result into the per-user aggregates used by leaderboards.
+        cursor.executemany(UPSERT_ANALYSIS_STATS, [
+            (r[0], r[1], r[2], r[3], r[2], r[2], r[3], r[3], r[2] + r[3], r[2] + r[3]) for r in results
+        ])
+
+    def _write_monkeyoff_results(self, cursor: sqlite3.Cursor, results: list[tuple]) -> None:
+        """
+        Writes monkey-off results using the given cursor, batching each statement with executemany.
+        Each result is (challenger_id, opponent_id, guild_id, challenger_percentage, opponent_percentage, winner_id, timestamp,
+        challenger_name, opponent_name).
+        """
+        # Ensure both participants' profiles exist or update their usernames.
+        profile_upserts = []
+        for challenger_id, opponent_id, guild_id, *_, challenger_name, opponent_name in results:
+            profile_upserts.append((challenger_id, guild_id, challenger_name or "UnknownUser"))
+            profile_upserts.append((opponent_id, guild_id, opponent_name or "UnknownUser"))
+        cursor.executemany(UPSERT_USER_PROFILE, profile_upserts)
+        # Insert into history table.
+        cursor.executemany(INSERT_MONKEYOFF_HISTORY, [r[:7] for r in results])
+        # Update both participants' stats.
+        stat_updates = []
+        for challenger_id, opponent_id, guild_id, _, _, winner_id, *_ in results:
+            stat_updates.append((1 if winner_id == challenger_id else 0, 1 if winner_id == opponent_id else 0, challenger_id, guild_id))
+            stat_updates.append((1 if winner_id == opponent_id else 0, 1 if winner_id == challenger_id else 0, opponent_id, guild_id))
+        cursor.executemany(UPDATE_USER_PROFILE_MONKEYOFF_STATS, stat_updates)
+
+    @timed_db_operation
     def record_analysis_result(self, user_id: int, guild_id: int, iq_score: int, monkey_percentage: int, username: str, guild_name: str) -> bool:
         """
         Records an analysis result (IQ and Monkey %) for a user in a single transaction.
         Ensures the user profile exists, stores the result in history, and updates the profile.
         """
         try:
-            with self._get_new_connection() as conn:
-                cursor = conn.cursor()
-                timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
-                # 1. Ensure user profile exists or update username
-                cursor.execute(UPSERT_USER_PROFILE, (user_id, guild_id, username))
-                # Insert into history table
-                cursor.execute(INSERT_ANALYSIS_HISTORY, (user_id, guild_id, iq_score, monkey_percentage, timestamp))
-                # Update user_profiles with last scores and increment tests_taken.
-                cursor.execute(UPDATE_USER_PROFILE_ANALYSIS, (iq_score, monkey_percentage, user_id, guild_id))
+            with self._get_connection() as conn:
+                self._write_analysis_results(conn.cursor(), [(user_id, guild_id, iq_score, monkey_percentage, username, self.utc_timestamp())])
+            self.leaderboard_cache.invalidate_guild(guild_id)
             return True
         except sqlite3.Error as e:
             logger.error(f"Error recording analysis for user {user_id}, guild {guild_id}: {e}", exc_info=True)
             return False
 
+    @timed_db_operation
     def record_monkeyoff_result(self, challenger_id: int, opponent_id: int, guild_id: int,
-                                challenger_percentage: int, opponent_percentage: int, winner_id: int | None) -> bool:
+                                challenger_percentage: int, opponent_percentage: int, winner_id: int | None,
+                                challenger_name: str, opponent_name: str) -> bool:
         """
-        Records a monkey-off result in history and updates participant profiles.
+        Records a monkey-off result in a single transaction.
+        Ensures both participant profiles exist, stores the result in history, and updates both profiles' counters.
         """
         try:
-            with self._get_new_connection() as conn:
-                cursor = conn.cursor()
-                timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
-                # Insert into history table
-                cursor.execute(INSERT_MONKEYOFF_HISTORY, (challenger_id, opponent_id, guild_id,
-                                                          challenger_percentage, opponent_percentage, winner_id, timestamp))
-                # Update challenger's stats
-                challenger_wins = 1 if winner_id == challenger_id else 0
-                challenger_losses = 1 if winner_id == opponent_id else 0
-                cursor.execute(UPDATE_USER_PROFILE_MONKEYOFF_STATS, (challenger_wins, challenger_losses, challenger_id, guild_id))
-                # Update opponent's stats
-                opponent_wins = 1 if winner_id == opponent_id else 0
-                opponent_losses = 1 if winner_id == challenger_id else 0
-                cursor.execute(UPDATE_USER_PROFILE_MONKEYOFF_STATS, (opponent_wins, opponent_losses, opponent_id, guild_id))
+            with self._get_connection() as conn:
+                self._write_monkeyoff_results(conn.cursor(), [(challenger_id, opponent_id, guild_id, challenger_percentage,
+                                                               opponent_percentage, winner_id, self.utc_timestamp(),
+                                                               challenger_name, opponent_name)])
+            self.leaderboard_cache.invalidate_guild(guild_id)
             return True
         except sqlite3.Error as e:
             logger.error(f"Error recording monkey-off for challenger {challenger_id} vs opponent {opponent_id} in guild {guild_id}: {e}", exc_info=True)
             return False
-    def get_average_analysis_data_for_guild(self, guild_id: int) -> list[tuple[int, float, float]]:
+
+    @timed_db_operation
+    def record_results_batch(self, analysis_results: list[tuple], monkeyoff_results: list[tuple]) -> bool:
         """
-        Gets all users' AVERAGE analysis data (IQ, Monkey %) for a guild from their history.
-        Returns list of (user_id, average_iq_score, average_monkey_percentage) as floats.
-        Filters for users who have taken at least one analysis test (i.e., have history records).
+        Records many analysis and monkey-off results in one transaction (one fsync for the whole batch).
+        Row layouts match _write_analysis_results and _write_monkeyoff_results.
         """
         try:
-            with self._get_new_connection() as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(SELECT_AVERAGE_ANALYSIS_FOR_GUILD, (guild_id,))
-                results = []
-                for row in cursor.fetchall():
-                    results.append((row['user_id'], row['avg_iq'], row['avg_monkey']))
-                return results
+                if analysis_results:
+                    self._write_analysis_results(cursor, analysis_results)
+                if monkeyoff_results:
+                    self._write_monkeyoff_results(cursor, monkeyoff_results)
+            # Invalidate cached leaderboards of every guild the batch touched, now that it is committed.
+            for guild_id in {r[1] for r in analysis_results} | {r[2] for r in monkeyoff_results}:
+                self.leaderboard_cache.invalidate_guild(guild_id)
+            return True
         except sqlite3.Error as e:
-            logger.error(f"Error getting all (average) analysis data for guild {guild_id}: {e}", exc_info=True)
-            return []
-    def get_single_record_analysis_data_for_guild(self, guild_id: int, metric: str, order: str = "DESC") -> list[tuple[int, int, int]]:
+            logger.error(f"Error recording batch of {len(analysis_results)} analysis and {len(monkeyoff_results)} monkey-off results: {e}", exc_info=True)
+            return False
+
+    @timed_db_operation
+    def roll_up_history(self, cutoff: int, period: str, batch_rows: int) -> tuple[int, int]:
+        """
+        Moves analysis and monkey-off history rows older than `cutoff` (epoch seconds) into the
+        day or week rollup tables and deletes them. Works in chunks of `batch_rows` rows, one short transaction each,
+        so writers are never locked out for long. Leaderboards are unaffected: they read the all-time aggregates in
+        user_analysis_stats, which can still be rebuilt from the remaining history and the rollups.
+        With a history archive configured, each chunk is archived (and synced to disk) before it is deleted.
+        The highest deleted ID is recorded in bot_metadata in the same transaction, so archive readers can skip
+        rows whose deletion never committed, and a failed chunk is neither rolled up nor archived twice on retry.
+        Returns the number of (analysis, monkey-off) rows rolled up; stops early and logs on a database error.
+        """
+        if period not in ROLLUP_PERIODS:
+            logger.error(f"Invalid rollup period '{period}' for roll_up_history.")
+            return (0, 0)
+        rolled_up = [0, 0]
+        jobs = (
+            (SELECT_EXPIRED_ANALYSIS_HISTORY, _roll_up_analysis_rows, UPSERT_ANALYSIS_ROLLUP, DELETE_EXPIRED_ANALYSIS_HISTORY, ANALYSIS_LAYOUT),
+            (SELECT_EXPIRED_MONKEYOFF_HISTORY, _roll_up_monkeyoff_rows, UPSERT_MONKEYOFF_ROLLUP, DELETE_EXPIRED_MONKEYOFF_HISTORY, MONKEYOFF_LAYOUT),
+        )
+        try:
+            for index, (select_sql, roll_up, upsert_sql, delete_sql, layout) in enumerate(jobs):
+                last_id = 0
+                while True:
+                    with self._get_connection() as conn:
+                        rows = conn.execute(select_sql, (last_id, cutoff, batch_rows)).fetchall()
+                        if not rows:
+                            break
+                        if self.history_archive:
+                            # Written before the write transaction starts, so archive I/O never holds the write lock.
+                            self.history_archive.append(layout, rows)
+                        conn.executemany(upsert_sql, roll_up(rows, period))
+                        if layout is MONKEYOFF_LAYOUT and not self.history_archive:
+                            # Duel history readers can no longer return these duels; let them say so.
+                            conn.execute(UPSERT_METADATA_VALUE, (constants.UNARCHIVED_MONKEYOFF_REMOVALS_METADATA_KEY, "1"))
+                            self._unarchived_monkeyoff_removals = True
+                        conn.execute(delete_sql, (rows[0]['id'], rows[-1]['id'], cutoff))
+                        conn.execute(UPSERT_METADATA_VALUE, (constants.ROLLED_UP_THROUGH_METADATA_KEY.format(table=layout.table), str(rows[-1]['id'])))
+                    last_id = rows[-1]['id']
+                    self._rolled_up_through[layout.table] = last_id
+                    rolled_up[index] += len(rows)
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Error rolling up history older than {cutoff}: {e}", exc_info=True)
+        return (rolled_up[0], rolled_up[1])
+
+    def _archive_end(self, layout: ArchiveLayout) -> int:
+        """
+        Exclusive upper bound on the archived row IDs readers may use. Rows above the last committed deletion
+        can be archived and still live (when their rollup transaction failed), and are read from the table instead.
         """
-        Gets a single analysis record per user for a guild, based on a specific metric.
+        return self._rolled_up_through.get(layout.table, 0) + 1
+
+    def iter_analysis_history(self, guild_id: int, user_id: int | None = None, include_archive: bool = True,
+                              chunk_rows: int = constants.HISTORY_STREAM_CHUNK_ROWS) -> Iterator[tuple[int, int, int, int, int]]:
+        """
+        Streams a guild's full analysis history (optionally one user's) as (id, user_id, iq_score, monkey_percentage,
+        timestamp) tuples, timestamps in epoch seconds: archived rows first, then the live table in ID order, read in chunks of `chunk_rows`
+        with a short read per chunk. Only one archive block or chunk is held in memory at a time, so full-history
+        statistics can be computed over any amount of history. Logs and stops early on a database or archive error.
+        """
+        try:
+            if include_archive and self.history_archive:
+                for _, (row_id, row_user_id, iq_score, monkey_percentage, timestamp) in self.history_archive.iter_rows(ANALYSIS_LAYOUT, guild_id, before_id=self._archive_end(ANALYSIS_LAYOUT)):
+                    if user_id is None or row_user_id == user_id:
+                        yield (row_id, row_user_id, iq_score, monkey_percentage, timestamp)
+            last_id = 0
+            while True:
+                with self._get_connection() as conn:
+                    if user_id is None:
+                        rows = conn.execute(SELECT_ANALYSIS_HISTORY_CHUNK, (guild_id, last_id, chunk_rows)).fetchall()
+                    else:
+                        rows = conn.execute(SELECT_USER_ANALYSIS_HISTORY_CHUNK, (user_id, guild_id, last_id, chunk_rows)).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield _history_row(row)
+                last_id = rows[-1]['id']
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.error(f"Error streaming analysis history for guild {guild_id}: {e}", exc_info=True)
+
+    def iter_monkeyoff_history(self, guild_id: int, user_id: int | None = None, include_archive: bool = True,
+                               chunk_rows: int = constants.HISTORY_STREAM_CHUNK_ROWS) -> Iterator[tuple[int, int, int, int, int, int | None, int]]:
+        """
+        Streams a guild's full monkey-off history (optionally only duels one user took part in) as (id, challenger_id,
+        opponent_id, challenger_percentage, opponent_percentage, winner_id, timestamp) tuples, like iter_analysis_history.
+        winner_id is None for ties.
+        """
+        try:
+            if include_archive and self.history_archive:
+                for _, (row_id, challenger_id, opponent_id, challenger_percentage, opponent_percentage, winner_id, timestamp) \
+                        in self.history_archive.iter_rows(MONKEYOFF_LAYOUT, guild_id, before_id=self._archive_end(MONKEYOFF_LAYOUT)):
+                    if user_id is None or user_id in (challenger_id, opponent_id):
+                        yield (row_id, challenger_id, opponent_id, challenger_percentage, opponent_percentage, winner_id or None, timestamp)
+            last_id = 0
+            while True:
+                with self._get_connection() as conn:
+                    if user_id is None:
+                        rows = conn.execute(SELECT_MONKEYOFF_HISTORY_CHUNK, (guild_id, last_id, chunk_rows)).fetchall()
+                    else:
+                        side = (guild_id, user_id, last_id, chunk_rows)
+                        rows = conn.execute(SELECT_USER_MONKEYOFF_HISTORY_CHUNK, (*side, *side, chunk_rows)).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield _history_row(row)
+                last_id = rows[-1]['id']
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.error(f"Error streaming monkey-off history for guild {guild_id}: {e}", exc_info=True)
+
+    def _get_ranking_source(self, statistic: str, metric: str, order: str) -> tuple[str, str, str] | None:
+        """
+        Resolves a leaderboard to its (table, value expression, row filter).
+        statistic: 'average' or 'record' for analysis leaderboards, 'monkeyoff' for monkey-off ones.
+        metric: 'combined', 'iq' or 'monkey' for analysis; 'wins' or 'win_rate' for monkey-off.
+        """
+        if statistic == "average":
+            return ANALYSIS_AVERAGE_RANKING_SOURCES.get(metric)
+        if statistic == "record" and metric in ("combined", "iq", "monkey"):
+            # Highest records are the user's max_* aggregate, lowest records their min_* aggregate.
+            return ("user_analysis_stats", f"{'max' if order == 'DESC' else 'min'}_{metric}", "analysis_count > 0")
+        if statistic == "monkeyoff":
+            return MONKEYOFF_RANKING_SOURCES.get(metric)
+        return None
+
+    @timed_db_operation
+    def get_ranking_for_guild(self, guild_id: int, statistic: str, metric: str, order: str = "DESC", limit: int = 10) -> list[tuple[int, float]]:
+        """
+        Gets the top `limit` users of a leaderboard for a guild, ranked in SQL.
 
         Args:
             guild_id: The ID of the guild.
-            metric: The metric to order by ('iq', 'monkey', 'combined').
-            order: The direction to order by ('DESC' for top, 'ASC' for lowest).
+            statistic: 'average' or 'record' (analysis), or 'monkeyoff'.
+            metric: 'combined', 'iq', 'monkey' (analysis) or 'wins', 'win_rate' (monkey-off).
+            order: 'DESC' for highest first, 'ASC' for lowest first.
+            limit: Maximum number of users to return.
 
         Returns:
-            List of (user_id, iq_score, monkey_percentage) tuples.
-        """
-        if metric == 'iq':
-            order_by_clause = "iq_score"
-        elif metric == 'monkey':
-            order_by_clause = "monkey_percentage"
-        elif metric == 'combined':
-            order_by_clause = "(iq_score + monkey_percentage)"
-        else:
-            logger.error(f"Invalid metric '{metric}' for get_single_record_analysis_data_for_guild.")
-            return []
-
-        if order.upper() not in ["ASC", "DESC"]:
-            logger.error(f"Invalid order '{order}' for get_single_record_analysis_data_for_guild.")
+            List of (user_id, value) tuples in rank order.
+        """
+        order = order.upper()
+        source = self._get_ranking_source(statistic, metric, order)
+        if source is None or order not in ["ASC", "DESC"]:
+            logger.error(f"Invalid leaderboard '{statistic}/{metric}/{order}' for get_ranking_for_guild.")
             return []
+        table, value_expression, row_filter = source
+        query = SELECT_RANKING_BASE.format(table=table, value_expression=value_expression, row_filter=row_filter, direction=order)
 
-        query = SELECT_SINGLE_RECORD_ANALYSIS_BASE.format(order_by_clause=order_by_clause, direction=order.upper())
-
-        results = []
         try:
-            with self._get_new_connection() as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(query, (guild_id,))
-                for row in cursor.fetchall():
-                    results.append((row['user_id'], row['iq_score'], row['monkey_percentage']))
-                return results
+                cursor.execute(query, (guild_id, limit))
+                return [(row['user_id'], row['value']) for row in cursor.fetchall()]
         except sqlite3.Error as e:
-            logger.error(f"Error getting single record analysis data for guild {guild_id}: {e}", exc_info=True)
+            logger.error(f"Error getting {statistic}/{metric} ranking for guild {guild_id}: {e}", exc_info=True)
             return []
 
-    def get_top_wins_data_for_guild(self, guild_id: int) -> list[tuple[int, int]]:
+    @timed_db_operation
+    def get_rank_for_user(self, guild_id: int, user_id: int, statistic: str, metric: str, order: str = "DESC") -> tuple[int, float] | None:
         """
-        Gets top users by monkeyoff wins for a guild.
-        Returns list of (user_id, monkeyoff_wins).
+        Gets one user's (rank, value) on a leaderboard, with the same arguments as get_ranking_for_guild.
+        Returns None if the user is not on the leaderboard.
         """
+        order = order.upper()
+        source = self._get_ranking_source(statistic, metric, order)
+        if source is None or order not in ["ASC", "DESC"]:
+            logger.error(f"Invalid leaderboard '{statistic}/{metric}/{order}' for get_rank_for_user.")
+            return None
+        table, value_expression, row_filter = source
+        query = SELECT_RANK_FOR_USER_BASE.format(
+            table=table, value_expression=value_expression, row_filter=row_filter, ahead=">" if order == "DESC" else "<"
+        )
+
         try:
-            with self._get_new_connection() as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(SELECT_TOP_WINS_FOR_GUILD, (guild_id,))
-                results = []
-                for row in cursor.fetchall():
-                    results.append((row['user_id'], row['monkeyoff_wins']))
-                return results
+                cursor.execute(query, (user_id, guild_id))
+                row = cursor.fetchone()
+                return (row['rank'], row['value']) if row else None
         except sqlite3.Error as e:
-            logger.error(f"Error getting top wins data for guild {guild_id}: {e}", exc_info=True)
-            return []
+            logger.error(f"Error getting {statistic}/{metric} rank for user {user_id} in guild {guild_id}: {e}", exc_info=True)
+            return None
+
+    @timed_db_operation
+    def get_monkeyoff_history_for_user(self, guild_id: int, user_id: int, before_id: int | None = None,
+                                       limit: int = constants.MONKEYOFF_HISTORY_PAGE_SIZE) -> tuple[list[tuple[int, int, int, int, int, int | None, int]], bool]:
+        """
+        Gets one page of the duels a user took part in within a guild, newest first, as (id, challenger_id, opponent_id,
+        challenger_percentage, opponent_percentage, winner_id, timestamp) tuples, timestamps in epoch seconds.
+        winner_id is None for ties.
+        Pages are keyset-paginated on the duel ID, which rises with time: pass the last ID of a page as `before_id`
+        to get the next one. Each page costs two short index seeks however many duels came before it.
+        Once the live table runs out, duels removed by retention continue from the history archive, if configured.
+        Returns (page, truncated); truncated is True when the history ends early because retention deleted older
+        duels without archiving them.
+        """
+        # Without a cursor, start above any possible rowid.
+        cursor_id = before_id if before_id is not None else (1 << 63) - 1
+        side = (guild_id, user_id, cursor_id, limit)
+        try:
+            with self._get_connection() as conn:
+                page = [_history_row(row) for row in conn.execute(SELECT_USER_MONKEYOFF_HISTORY_PAGE, (*side, *side, limit))]
+                if len(page) == limit or not conn.execute(SELECT_HAS_MONKEYOFF_ROLLUPS_FOR_USER, (guild_id, user_id)).fetchone()[0]:
+                    return (page, False)
+            if self.history_archive:
+                # Archived duels are older than every live one, so they continue the page where the table ended.
+                archive_cursor = min(page[-1][0] if page else cursor_id, self._archive_end(MONKEYOFF_LAYOUT))
+                for _, row in self.history_archive.iter_rows(MONKEYOFF_LAYOUT, guild_id, before_id=archive_cursor, reverse=True):
+                    if user_id in (row[1], row[2]):
+                        page.append((*row[:5], row[5] or None, row[6]))
+                        if len(page) == limit:
+                            return (page, False)
+            return (page, self._unarchived_monkeyoff_removals)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.error(f"Error getting monkey-off history for user {user_id} in guild {guild_id}: {e}", exc_info=True)
+            return ([], False)
 
-    def get_top_win_rate_data_for_guild(self, guild_id: int) -> list[tuple[int, float]]:
+    @timed_db_operation
+    def get_monkeyoff_head_to_head(self, guild_id: int, user_id: int, opponent_id: int) -> tuple[int, int, int, bool] | None:
         """
-        Gets top users by monkeyoff win rate for a guild.
-        Returns list of (user_id, win_rate).
+        Gets the head-to-head record between two users in a guild as (duels, user_wins, opponent_wins, truncated);
+        the remaining duels were ties. Duels removed by retention are counted from the history archive, if configured;
+        truncated is True when some of them may be missing because retention deleted them without archiving.
+        Returns None on error.
         """
         try:
-            with self._get_new_connection() as conn:
+            with self._get_connection() as conn:
+                row = conn.execute(
+                    SELECT_MONKEYOFF_HEAD_TO_HEAD,
+                    (user_id, opponent_id, guild_id, user_id, opponent_id, opponent_id, user_id),
+                ).fetchone()
+                duels, user_wins, opponent_wins = row['duels'], row['user_wins'], row['opponent_wins']
+                # Removed duels between the two were rolled up for both of them.
+                removed = all(conn.execute(SELECT_HAS_MONKEYOFF_ROLLUPS_FOR_USER, (guild_id, participant)).fetchone()[0]
+                              for participant in (user_id, opponent_id))
+            if not removed:
+                return (duels, user_wins, opponent_wins, False)
+            if self.history_archive:
+                pair = {user_id, opponent_id}
+                for _, (_, challenger_id, other_id, _, _, winner_id, _) in self.history_archive.iter_rows(
+                        MONKEYOFF_LAYOUT, guild_id, before_id=self._archive_end(MONKEYOFF_LAYOUT)):
+                    if {challenger_id, other_id} == pair:
+                        duels += 1
+                        user_wins += winner_id == user_id
+                        opponent_wins += winner_id == opponent_id
+            return (duels, user_wins, opponent_wins, self._unarchived_monkeyoff_removals)
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.error(f"Error getting head-to-head record of users {user_id} and {opponent_id} in guild {guild_id}: {e}", exc_info=True)
+            return None
+
+    @timed_db_operation
+    def get_usernames(self, guild_id: int, user_ids: list[int]) -> dict[int, str]:
+        """Retrieves the stored usernames for several users in a guild with one query. Users without one are omitted."""
+        if not user_ids:
+            return {}
+        query = SELECT_USERNAMES_FOR_GUILD_BASE.format(placeholders=", ".join("?" * len(user_ids)))
+        try:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(SELECT_TOP_WIN_RATE_FOR_GUILD, (guild_id,))
-                results = []
-                for row in cursor.fetchall():
-                    results.append((row['user_id'], row['win_rate']))
-                return results
+                cursor.execute(query, (guild_id, *user_ids))
+                return {row['user_id']: row['username'] for row in cursor.fetchall()}
         except sqlite3.Error as e:
-            logger.error(f"Error getting top win rate data for guild {guild_id}: {e}", exc_info=True)
-            return []
+            logger.error(f"Error fetching usernames for {len(user_ids)} users in guild {guild_id}: {e}", exc_info=True)
+            return {}
 
+    @timed_db_operation
     def get_user_profile(self, user_id: int, guild_id: int):
         """Retrieves a user's profile data."""
         try:
-            with self._get_new_connection() as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(SELECT_USER_PROFILE, (user_id, guild_id))
                 profile = cursor.fetchone()
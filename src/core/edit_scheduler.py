@@ -0,0 +1,147 @@
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+import discord
+from src.core.logging import get_logger
+# Initialize logger for the delayed-edit scheduler.
+logger = get_logger("EditScheduler")
+
+# Seconds an interaction token stays usable for editing the original response.
+INTERACTION_TOKEN_LIFETIME_SECONDS = 15 * 60
+
+@dataclass(order=True)
+class _EditJob:
+    """A pending edit of an interaction's original response, ordered by due time."""
+    due: float
+    seq: int
+    application_id: int = field(compare=False)
+    token: str = field(compare=False, repr=False)
+    content: str = field(compare=False)
+    # Monotonic time the interaction was created at, to skip edits whose token has expired.
+    created: float = field(compare=False)
+    description: str = field(compare=False, default="")
+
+class DelayedEditScheduler:
+    """
+    Holds delayed edits of interaction responses in a single heap and fires them from one task.
+    Each job keeps only the interaction token and the new content, so commands can return
+    immediately instead of sleeping until their cleanup edit is due. Edits are paced to at most
+    `max_edits_per_second`, and edits that hit a rate limit are rescheduled after the retry delay.
+    """
+    def __init__(self, client: discord.Client, max_edits_per_second: float) -> None:
+        self.client = client
+        self.min_interval = 1.0 / max_edits_per_second if max_edits_per_second > 0 else 0.0
+        self._heap: list[_EditJob] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._last_edit = 0.0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of edits waiting to fire."""
+        return len(self._heap)
+
+    def start(self) -> None:
+        """Starts the scheduler task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="delayed-edit-scheduler")
+            self._task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        """Logs the scheduler task dying, which would otherwise leave every pending edit unapplied without a trace."""
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            logger.error(f"Delayed-edit scheduler stopped with {len(self._heap)} edit(s) pending: {exc}", exc_info=exc)
+
+    def schedule(self, interaction: discord.Interaction, content: str, delay: float, description: str = "") -> None:
+        """Schedules the interaction's original response to be replaced with `content` (and no embed) after `delay` seconds."""
+        now = time.monotonic()
+        job = _EditJob(now + delay, next(self._seq), interaction.application_id, interaction.token, content, now, description)
+        heapq.heappush(self._heap, job)
+        # Wake the scheduler if this job is now the earliest.
+        if self._heap[0] is job:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        """Scheduler loop: sleeps until the earliest job is due, then fires it."""
+        while True:
+            if not self._heap:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            delay = self._heap[0].due - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            await self._fire(heapq.heappop(self._heap))
+
+    async def _fire(self, job: _EditJob) -> None:
+        """Performs one edit, pacing edits and rescheduling it if rate limited."""
+        if time.monotonic() - job.created > INTERACTION_TOKEN_LIFETIME_SECONDS:
+            logger.warning(f"Skipping compact edit for {job.description}; its interaction token has expired.")
+            self.failed += 1
+            return
+        # Keep at least min_interval between edits.
+        wait = self._last_edit + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_edit = time.monotonic()
+
+        webhook = discord.Webhook.partial(job.application_id, job.token, client=self.client)
+        try:
+            await webhook.edit_message("@original", content=job.content, embed=None)
+            self.completed += 1
+        except discord.NotFound:
+            logger.warning(f"Could not edit original message for {job.description}, it was likely deleted before cleanup.")
+            self.failed += 1
+        except discord.HTTPException as e:
+            if e.status == 429:
+                # Rate limited beyond what the HTTP client absorbs; try again after the advised delay.
+                retry_after = getattr(e, "retry_after", None) or 1.0
+                job.due = time.monotonic() + retry_after
+                heapq.heappush(self._heap, job)
+                return
+            logger.error(f"Failed to edit original message for {job.description}: {e}")
+            self.failed += 1
+        except Exception as e:
+            # Connection errors, timeouts and the like: drop this edit but keep the scheduler running.
+            logger.error(f"Unexpected error editing original message for {job.description}: {e}", exc_info=True)
+            self.failed += 1
+
+    async def close(self, timeout: float) -> None:
+        """
+        Stops the scheduler and fires every pending edit right away, giving up after `timeout` seconds.
+        Must run before the client's HTTP session is closed.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        pending = len(self._heap)
+        deadline = time.monotonic() + timeout
+        while self._heap and time.monotonic() < deadline:
+            job = heapq.heappop(self._heap)
+            try:
+                await asyncio.wait_for(self._fire(job), timeout=max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+        if self._heap:
+            logger.warning(f"Shut down with {len(self._heap)} compact edit(s) not applied.")
+            self._heap.clear()
+        if pending:
+            logger.info(f"Drained {pending} pending compact edit(s) on shutdown.")
@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+class InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor that counts the work items waiting for a thread and those running, for the metrics gauges.
+    Every loop.run_in_executor call on the default executor goes through submit, so all of them are counted.
+    """
+    def __init__(self, max_workers: int, thread_name_prefix: str = "") -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.max_workers = max_workers
+        self._counts_lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    @property
+    def queued(self) -> int:
+        """Number of submitted work items not yet picked up by a thread."""
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        """Number of work items currently running."""
+        return self._running
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Submits a callable like ThreadPoolExecutor.submit, tracking it while it is queued and while it runs."""
+        def run():
+            with self._counts_lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._counts_lock:
+                    self._running -= 1
+
+        with self._counts_lock:
+            self._queued += 1
+        try:
+            future = super().submit(run)
+        except BaseException:
+            with self._counts_lock:
+                self._queued -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        """Uncounts a work item cancelled before it started (e.g. by shutdown(cancel_futures=True))."""
+        if future.cancelled():
+            with self._counts_lock:
+                self._queued -= 1
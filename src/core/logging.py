@@ -1,27 +1,131 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 import os
+import threading
+from datetime import datetime, timezone
+from src.core.metrics import LOG_RECORDS_DROPPED
 
-def setup_logging(log_level_str: str, log_to_file: bool, log_file_path: str) -> None:
-    """Configures the application's logging system."""
+# Format of text log lines.
+TEXT_LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+# Background listener writing queued records, when queue mode is enabled.
+_listener: logging.handlers.QueueListener | None = None
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, for log collectors."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+class _QueueListener(logging.handlers.QueueListener):
+    """Queue listener whose stop() waits for room in a full queue instead of raising queue.Full."""
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the caller: when the queue is full the record is dropped and counted.
+    The next record that fits is preceded by a warning saying how many records were dropped.
+    """
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        # Used only for exception text, which must be rendered before the record leaves this thread.
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merges the message arguments and renders exception text, keeping the record's other fields for the listener's formatter."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        with self._lock:
+            try:
+                if self.dropped:
+                    notice = logging.LogRecord(
+                        "logging", logging.WARNING, __file__, 0,
+                        f"Log queue was full; dropped {self.dropped} log record(s).", None, None,
+                    )
+                    self.queue.put_nowait(notice)
+                    self.dropped = 0
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                LOG_RECORDS_DROPPED.inc()
+
+def setup_logging(log_level_str: str, log_to_file: bool, log_file_path: str, use_queue: bool = False,
+                  queue_size: int = 10000, json_format: bool = False, max_bytes: int = 0, backup_count: int = 5) -> None:
+    """
+    Configures the application's logging system.
+    With `use_queue`, loggers only put records on a bounded queue and a background thread writes them,
+    so logging never does I/O on the event loop; records are dropped rather than waited on if the queue is full.
+    With `max_bytes`, the log file is rotated at that size, keeping `backup_count` old files.
+    """
+    global _listener
     # Convert string log level to logging module's constant.
     log_level = getattr(logging, log_level_str.upper(), logging.INFO)
-    
+
     # Always add a stream handler for console output.
-    handlers = [logging.StreamHandler(sys.stdout)]
+    handlers: list[logging.Handler] = [logging.StreamHandler(sys.stdout)]
     # Add a file handler if logging to file is enabled.
     if log_to_file:
         log_dir = os.path.dirname(log_file_path)
         if log_dir:
             os.makedirs(log_dir, exist_ok=True)
-        handlers.append(logging.FileHandler(log_file_path))
-    
-    # Configure the basic logging setup.
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-        handlers=handlers
-    )
+        if max_bytes > 0:
+            handlers.append(logging.handlers.RotatingFileHandler(log_file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"))
+        else:
+            handlers.append(logging.FileHandler(log_file_path, encoding="utf-8"))
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Replace any previous configuration.
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(log_level)
+
+    if use_queue:
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(1, queue_size)))
+        root.addHandler(queue_handler)
+        _listener = _QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in handlers:
+            root.addHandler(handler)
+
+def shutdown_logging() -> None:
+    """Stops the background log writer after it has written every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+# Flush queued records if the process exits without calling shutdown_logging().
+atexit.register(shutdown_logging)
 
 def get_logger(name: str) -> logging.Logger:
     """Returns a logger instance with the specified name."""
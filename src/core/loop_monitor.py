@@ -0,0 +1,111 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from src.core.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS, EVENT_LOOP_STALL_STACKS
+from src.core.logging import get_logger
+# Initialize logger for the event loop monitor.
+logger = get_logger("LoopMonitor")
+
+# Directory holding the bot's own code; stall locations prefer frames from here over library frames.
+_SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _stall_location(stack: traceback.StackSummary) -> str:
+    """Names the innermost frame of the bot's own code in a stack (or the innermost frame), as 'file:function'."""
+    for frame in reversed(stack):
+        if os.path.abspath(frame.filename).startswith(_SOURCE_ROOT):
+            break
+    else:
+        frame = stack[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.name}"
+
+class EventLoopLagMonitor:
+    """
+    Measures event loop lag by sleeping for `interval` seconds and recording how much later than that it woke up.
+    A busy or blocked loop delays the wake-up, so the lag approximates how long ready callbacks wait to run.
+
+    With a `stall_threshold`, a watchdog thread also checks whether the sampler is overdue by more than the
+    threshold, which means a callback is blocking the loop right now. It then captures the loop thread's stack
+    for a `stack_sample_rate` fraction of stalls and logs it, so the offending code shows up while it is running.
+    """
+    def __init__(self, interval: float, stall_threshold: float = 0.0, stack_sample_rate: float = 1.0, stack_depth: int = 20) -> None:
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stack_sample_rate = min(1.0, max(0.0, stack_sample_rate))
+        self.stack_depth = stack_depth
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+        # Monotonic time the sampler should next wake up at; read by the watchdog thread.
+        self._expected_wake = 0.0
+        # Wake-up time already reported as stalled, so one stall is reported once.
+        self._reported_wake = 0.0
+        self._loop_thread_id: int | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts sampling on the running event loop, and the watchdog thread if a stall threshold is set."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._expected_wake = time.monotonic() + self.interval
+        self._task = asyncio.create_task(self._run(), name="event-loop-lag-monitor")
+        if self.stall_threshold > 0:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def _run(self) -> None:
+        """Sampler loop: sleeps, then records the oversleep as lag."""
+        while True:
+            started = time.monotonic()
+            self._expected_wake = started + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG.observe(lag)
+            if self.stall_threshold > 0 and lag >= self.stall_threshold:
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms.")
+
+    def _watch(self) -> None:
+        """Watchdog thread: reports a stall once the sampler is overdue by more than the threshold."""
+        poll_interval = max(0.01, self.stall_threshold / 2)
+        while not self._stopped.wait(poll_interval):
+            expected_wake = self._expected_wake
+            overdue = time.monotonic() - expected_wake
+            if overdue < self.stall_threshold or expected_wake == self._reported_wake:
+                continue
+            self._reported_wake = expected_wake
+            EVENT_LOOP_STALLS.inc()
+            if random.random() >= self.stack_sample_rate:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=self.stack_depth)
+            del frame
+            location = _stall_location(stack)
+            EVENT_LOOP_STALL_STACKS.inc(location=location)
+            logger.warning(
+                f"Event loop blocked for over {overdue * 1000:.0f} ms in {location}. Loop thread stack:\n"
+                + "".join(stack.format()).rstrip()
+            )
+
+    async def close(self) -> None:
+        """Stops sampling and the watchdog thread."""
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
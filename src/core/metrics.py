@@ -0,0 +1,210 @@
+import functools
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Default histogram buckets in seconds, from sub-millisecond DB reads up to slow Discord round trips.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A collected sample: (metric name, labels, value).
+Sample = tuple[str, dict[str, str], float]
+
+def _escape_label_value(value: str) -> str:
+    """Escapes backslashes, quotes and newlines in a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: dict[str, str]) -> str:
+    """Formats labels in the Prometheus text format, e.g. {command="analyze"}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(str(value))}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    """Formats a sample value, including the special float values."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """Base class holding a metric's name, help text and label names."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        """Orders label values by label name; every label must be given."""
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self) -> list[str]:
+        """HELP and TYPE lines for the exposition format."""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.label_names, key)), value
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with a running sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (last is +Inf), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels: str) -> "_Timer":
+        """Context manager that observes the elapsed time of its block."""
+        return _Timer(self, labels)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in items:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+class _Timer:
+    """Observes the duration of a with-block into a histogram."""
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict[str, str]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+class Gauge(_Metric):
+    """A value read from a callback at scrape time, e.g. a queue depth or a cache counter."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Iterable[tuple[dict[str, str], float]]]) -> None:
+        super().__init__(name, documentation)
+        self._read = read
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self._read():
+            yield self.name, labels, value
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Adds a metric, replacing one of the same name (so re-created components don't duplicate series)."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Renders every metric. A failing gauge callback is skipped rather than failing the scrape."""
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                continue
+            lines.extend(metric.header())
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+# Registry served at /metrics.
+REGISTRY = MetricsRegistry()
+
+# --- Instrumentation shared across modules ---
+COMMAND_DURATION = REGISTRY.register(Histogram(
+    "drmonkey_command_duration_seconds", "Time from command invocation until its handler returns.", ("command",)
+))
+COMMAND_ERRORS = REGISTRY.register(Counter(
+    "drmonkey_command_errors_total", "Commands whose handler raised.", ("command",)
+))
+DB_OPERATION_DURATION = REGISTRY.register(Histogram(
+    "drmonkey_db_operation_duration_seconds", "Wall time of DatabaseManager operations.", ("operation",)
+))
+PLOT_RENDER_DURATION = REGISTRY.register(Histogram(
+    "drmonkey_plot_render_duration_seconds", "Time to render a plot in the worker pool, including queueing.", ("plot",)
+))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    "drmonkey_event_loop_lag_seconds", "How late the event loop woke a sleeping sampler task.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+))
+EVENT_LOOP_STALLS = REGISTRY.register(Counter(
+    "drmonkey_event_loop_stalls_total", "Times the watchdog found the event loop blocked past its threshold."
+))
+EVENT_LOOP_STALL_STACKS = REGISTRY.register(Counter(
+    "drmonkey_event_loop_stall_stacks_total", "Sampled event loop stalls by the code location that was blocking.", ("location",)
+))
+LOG_RECORDS_DROPPED = REGISTRY.register(Counter(
+    "drmonkey_log_records_dropped_total", "Log records dropped because the log queue was full."
+))
+
+def observe_command(command_name: str) -> Callable:
+    """Decorator for app command callbacks that records their duration and errors."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                COMMAND_ERRORS.inc(command=command_name)
+                raise
+            finally:
+                COMMAND_DURATION.observe(time.perf_counter() - started, command=command_name)
+        return wrapper
+    return decorator
+
+def timed_db_operation(func: Callable) -> Callable:
+    """Decorator for DatabaseManager methods that records their wall time under the method's name."""
+    operation = func.__name__
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            DB_OPERATION_DURATION.observe(time.perf_counter() - started, operation=operation)
+    return wrapper
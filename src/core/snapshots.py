@@ -0,0 +1,156 @@
+import asyncio
+import functools
+import os
+import tempfile
+import time
+import zlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable
+from src.core.database import DatabaseManager
+from src.core.logging import get_logger
+# zstd compression is optional; it needs the 'zstandard' package.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+# Initialize logger for database snapshots.
+logger = get_logger("DB_Snapshots")
+
+def available_compressions() -> list[str]:
+    """Returns the compression formats snapshots can be streamed with, besides 'identity'."""
+    return ["gzip", "zstd"] if zstandard is not None else ["gzip"]
+
+def _new_compressor(compression: str):
+    """Returns an object with compress(bytes) and flush() for the given format."""
+    if compression == "gzip":
+        # wbits=31 writes a gzip header and trailer.
+        return zlib.compressobj(level=6, wbits=31)
+    if compression == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    raise ValueError(f"Unsupported compression '{compression}'.")
+
+@dataclass
+class Snapshot:
+    """A consistent copy of the database on disk, shared by downloads until it expires."""
+    path: str
+    created_at: float
+    size: int
+    readers: int = 0
+
+class DatabaseSnapshotter:
+    """
+    Produces consistent database snapshots for download and streams them in chunks.
+    A snapshot is reused by every download started within `ttl_seconds` of its creation, so a client can
+    resume (HTTP Range) against the same bytes. Expired snapshots are deleted once no download is reading them.
+    """
+    def __init__(self, db_manager: DatabaseManager, directory: str, ttl_seconds: float,
+                 pages_per_step: int, step_sleep: float, max_restarts: int) -> None:
+        self.db_manager = db_manager
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._backup = functools.partial(
+            db_manager.backup_to, pages_per_step=pages_per_step, step_sleep=step_sleep, max_restarts=max_restarts
+        )
+        self._current: Snapshot | None = None
+        self._expired: list[Snapshot] = []
+        # Serializes snapshot creation so concurrent downloads share one backup.
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, snapshot: Snapshot | None) -> bool:
+        """Whether a snapshot may still be handed to new downloads."""
+        return snapshot is not None and time.monotonic() - snapshot.created_at < self.ttl_seconds
+
+    async def _get_snapshot(self) -> Snapshot | None:
+        """Returns the current snapshot, taking a new one in the executor if it has expired."""
+        async with self._lock:
+            if self._is_fresh(self._current):
+                return self._current
+            fd, path = tempfile.mkstemp(prefix="dr_monkey_snapshot_", suffix=".db", dir=self.directory)
+            os.close(fd)
+            success = await asyncio.get_running_loop().run_in_executor(None, self._backup, path)
+            if not success:
+                self._remove_file(path)
+                return None
+            if self._current is not None:
+                self._expired.append(self._current)
+            self._current = Snapshot(path, time.monotonic(), os.path.getsize(path))
+            self._cleanup()
+            return self._current
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Snapshot | None]:
+        """Yields a fresh snapshot (or None if the backup failed), keeping its file alive until the block exits."""
+        snapshot = await self._get_snapshot()
+        if snapshot is None:
+            yield None
+            return
+        snapshot.readers += 1
+        try:
+            yield snapshot
+        finally:
+            snapshot.readers -= 1
+            self._cleanup()
+
+    def _cleanup(self) -> None:
+        """Deletes expired snapshots that no download is reading."""
+        if self._current is not None and not self._is_fresh(self._current) and self._current.readers == 0:
+            self._expired.append(self._current)
+            self._current = None
+        still_open = []
+        for snapshot in self._expired:
+            if snapshot.readers:
+                still_open.append(snapshot)
+            else:
+                self._remove_file(snapshot.path)
+        self._expired = still_open
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        """Deletes a snapshot file, ignoring files that are already gone."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete snapshot {path}: {e}")
+
+    def close(self) -> None:
+        """Deletes every snapshot file."""
+        for snapshot in [*self._expired, *([self._current] if self._current else [])]:
+            self._remove_file(snapshot.path)
+        self._expired = []
+        self._current = None
+
+async def iter_file_chunks(path: str, chunk_size: int, start: int = 0, end: int | None = None,
+                           compression: str = "identity") -> AsyncIterator[bytes]:
+    """
+    Reads bytes [start, end) of a file in chunks on the executor, optionally compressing them on the fly.
+    Compression also runs on the executor, so large downloads never block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    compress: Callable[[bytes], bytes] | None = None
+    compressor = None
+    if compression != "identity":
+        compressor = _new_compressor(compression)
+        compress = compressor.compress
+
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = (end - start) if end is not None else None
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = await loop.run_in_executor(None, file.read, size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            if compress is not None:
+                chunk = await loop.run_in_executor(None, compress, chunk)
+                if not chunk:
+                    continue
+            yield chunk
+    if compressor is not None:
+        tail = compressor.flush()
+        if tail:
+            yield tail
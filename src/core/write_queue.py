@@ -0,0 +1,194 @@
+import asyncio
+import functools
+import time
+from dataclasses import dataclass, field
+from src.core.database import DatabaseManager
+from src.core.logging import get_logger
+# Initialize logger for the write-behind queue.
+logger = get_logger("DB_WriteQueue")
+
+@dataclass
+class WriteQueueStats:
+    """Counters describing the queue's behaviour, for tuning the batch size."""
+    flushes: int = 0
+    flushed_items: int = 0
+    failed_items: int = 0
+    last_batch_size: int = 0
+    last_flush_seconds: float = 0.0
+    max_flush_seconds: float = 0.0
+    total_flush_seconds: float = 0.0
+    # Detached (respond-first) writes: re-submissions after a failed flush, and writes given up on.
+    retried_items: int = 0
+    dropped_items: int = 0
+
+    @property
+    def avg_flush_seconds(self) -> float:
+        """Average wall time of a flush, including the executor hop."""
+        return self.total_flush_seconds / self.flushes if self.flushes else 0.0
+
+@dataclass
+class _PendingWrite:
+    """A result waiting to be written, with the future its submitter awaits."""
+    kind: str
+    row: tuple
+    future: asyncio.Future = field(repr=False)
+
+class WriteBehindQueue:
+    """
+    Groups analysis and monkey-off writes into one transaction per flush.
+    A flush starts as soon as a write arrives while the queue is idle; writes that arrive during a flush are
+    batched into the next one (group commit), so batches only grow under load and an idle queue adds no delay.
+    No transaction holds more than `max_batch_size` writes; a larger backlog is written in several.
+    Submitters await a future that only resolves once their batch has been committed, so a result is never
+    acknowledged before it is durable (with the default 'wal_durable' PRAGMA profile, which syncs every commit).
+    """
+    def __init__(self, db_manager: DatabaseManager, max_batch_size: int,
+                 retry_attempts: int = 3, retry_base_delay: float = 0.5) -> None:
+        self.db_manager = db_manager
+        self.max_batch_size = max(1, max_batch_size)
+        # Retry policy for detached writes, whose submitters don't wait for the outcome.
+        self.retry_attempts = max(0, retry_attempts)
+        self.retry_base_delay = retry_base_delay
+        self.stats = WriteQueueStats()
+        self._pending: list[_PendingWrite] = []
+        # Set when the first write of a batch arrives.
+        self._has_pending = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        # Detached writes still being persisted (or waiting to retry).
+        self._detached: set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        """Number of writes waiting for the next flush."""
+        return len(self._pending)
+
+    @property
+    def detached_in_flight(self) -> int:
+        """Number of detached writes not yet committed or dropped."""
+        return len(self._detached)
+
+    def start(self) -> None:
+        """Starts the background flusher task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="write-behind-flusher")
+            logger.info(f"Write-behind queue started (batch size {self.max_batch_size}).")
+
+    async def record_analysis(self, user_id: int, guild_id: int, iq_score: int, monkey_percentage: int, username: str) -> bool:
+        """Queues an analysis result and waits until it has been committed. Returns False if the write failed."""
+        row = (user_id, guild_id, iq_score, monkey_percentage, username, DatabaseManager.utc_timestamp())
+        return await self._submit("analysis", row)
+
+    async def record_monkeyoff(self, challenger_id: int, opponent_id: int, guild_id: int,
+                               challenger_percentage: int, opponent_percentage: int, winner_id: int | None,
+                               challenger_name: str, opponent_name: str) -> bool:
+        """
+        Queues a monkey-off result and waits until it has been committed. Returns False if the write failed.
+        Both participants' profiles are created or renamed in the same transaction as the result.
+        """
+        row = (challenger_id, opponent_id, guild_id, challenger_percentage, opponent_percentage, winner_id,
+               DatabaseManager.utc_timestamp(), challenger_name, opponent_name)
+        return await self._submit("monkeyoff", row)
+
+    def record_analysis_detached(self, user_id: int, guild_id: int, iq_score: int, monkey_percentage: int, username: str) -> None:
+        """
+        Queues an analysis result without waiting for it, so the caller can respond immediately.
+        Failed writes are retried with backoff; a result that still can't be written is logged and counted as dropped.
+        """
+        row = (user_id, guild_id, iq_score, monkey_percentage, username, DatabaseManager.utc_timestamp())
+        task = asyncio.create_task(self._submit_with_retries("analysis", row))
+        self._detached.add(task)
+        task.add_done_callback(self._detached.discard)
+
+    async def _submit_with_retries(self, kind: str, row: tuple) -> None:
+        """Submits a write, retrying failed flushes with exponential backoff."""
+        for attempt in range(self.retry_attempts + 1):
+            if attempt:
+                self.stats.retried_items += 1
+                await asyncio.sleep(self.retry_base_delay * 2 ** (attempt - 1))
+            if await self._submit(kind, row):
+                return
+            logger.warning(f"Detached {kind} write failed (attempt {attempt + 1}/{self.retry_attempts + 1}): {row}")
+        self.stats.dropped_items += 1
+        logger.error(f"Dropping {kind} result after {self.retry_attempts + 1} failed attempts: {row}")
+
+    async def _submit(self, kind: str, row: tuple) -> bool:
+        """Adds a write to the pending batch and waits for its flush."""
+        future = asyncio.get_running_loop().create_future()
+        pending = _PendingWrite(kind, row, future)
+        if self._closing or self._task is None:
+            # No flusher running (not started or shutting down); write this one directly.
+            await self._flush_batch([pending])
+        else:
+            self._pending.append(pending)
+            self._has_pending.set()
+        return await future
+
+    async def _run(self) -> None:
+        """Flusher loop: flushes as soon as writes are pending. Writes submitted during a flush wait for the next one."""
+        while not self._closing:
+            await self._has_pending.wait()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        """Takes everything pending and writes it in chunks of at most `max_batch_size`, one transaction each."""
+        batch, self._pending = self._pending, []
+        self._has_pending.clear()
+        for start in range(0, len(batch), self.max_batch_size):
+            await self._flush_batch(batch[start:start + self.max_batch_size])
+
+    async def _flush_batch(self, batch: list[_PendingWrite]) -> None:
+        """
+        Writes a batch in one transaction on the executor and resolves its futures.
+        If the transaction fails, each write is retried in a transaction of its own, so one bad row
+        only fails its own submitter instead of the whole batch.
+        """
+        start = time.perf_counter()
+        if await self._write(batch):
+            results = [True] * len(batch)
+        elif len(batch) > 1:
+            logger.warning(f"Write-behind flush of {len(batch)} results failed; retrying them one at a time.")
+            results = [await self._write([pending]) for pending in batch]
+        else:
+            results = [False]
+        elapsed = time.perf_counter() - start
+
+        # Update tuning statistics.
+        failed = results.count(False)
+        self.stats.flushes += 1
+        self.stats.last_batch_size = len(batch)
+        self.stats.last_flush_seconds = elapsed
+        self.stats.max_flush_seconds = max(self.stats.max_flush_seconds, elapsed)
+        self.stats.total_flush_seconds += elapsed
+        self.stats.flushed_items += len(batch) - failed
+        self.stats.failed_items += failed
+        logger.debug(f"Flushed {len(batch)} results in {elapsed * 1000:.1f} ms (depth now {self.depth}).")
+
+        for pending, success in zip(batch, results):
+            if not pending.future.done():
+                pending.future.set_result(success)
+
+    async def _write(self, batch: list[_PendingWrite]) -> bool:
+        """Writes a batch in one transaction on the executor. Returns False if the transaction failed."""
+        analysis_rows = [p.row for p in batch if p.kind == "analysis"]
+        monkeyoff_rows = [p.row for p in batch if p.kind == "monkeyoff"]
+        try:
+            write_func = functools.partial(self.db_manager.record_results_batch, analysis_rows, monkeyoff_rows)
+            return await asyncio.get_running_loop().run_in_executor(None, write_func)
+        except Exception as e:
+            logger.error(f"Write-behind flush of {len(batch)} results failed: {e}", exc_info=True)
+            return False
+
+    async def close(self) -> None:
+        """Stops the flusher and writes everything still pending."""
+        # Let detached writes finish (including their retries) while the flusher is still running.
+        if self._detached:
+            await asyncio.gather(*self._detached, return_exceptions=True)
+        self._closing = True
+        if self._task is not None:
+            # Wake the flusher so it flushes the current batch and exits; cancelling it could drop a batch mid-write.
+            self._has_pending.set()
+            await self._task
+            self._task = None
+        await self._flush()
+        logger.info(f"Write-behind queue closed after {self.stats.flushes} flushes ({self.stats.flushed_items} results written).")
@@ -1,5 +1,7 @@
+import functools
 import random
-from src.resources.monkey_types import get_random_monkey_type, get_plural_monkey_type
+from src.resources.monkey_types import get_random_monkey_type, get_monkey_type_variants
+from src.utils.templates import compile_template
 # Defines IQ score ranges and their corresponding labels.
 IQ_RANGES = {
     "IQ_0": (0, 0),
@@ -30,21 +32,37 @@ def generate_weighted_iq() -> int:
     
     return random.randint(min_iq, max_iq)
 
-def get_iq_range_key(iq_score: int) -> str:
-    """Maps an IQ score to a predefined range key."""
+def _find_iq_range_key(iq_score: int) -> str:
+    """Maps an IQ score to a predefined range key by scanning IQ_RANGES."""
     for key, (min_iq, max_iq) in IQ_RANGES.items():
         if min_iq <= iq_score <= max_iq:
             return key
     return "IQ_AVERAGE"
 
-def get_mp_range_key(monkey_percentage: int) -> str:
-    """Maps a monkey percentage to a predefined range key."""
+def _find_mp_range_key(monkey_percentage: int) -> str:
+    """Maps a monkey percentage to a predefined range key by comparing against each bucket boundary."""
     if monkey_percentage == 0: return "MP_0"
     elif monkey_percentage <= 24: return "MP_BARELY"
     elif monkey_percentage <= 49: return "MP_HALF"
     elif monkey_percentage <= 74: return "MP_MOSTLY"
     elif monkey_percentage <= 99: return "MP_ALMOST_PURE"
     else: return "MP_PURE"
+
+# Range keys for every possible IQ score (0-200) and monkey percentage (0-100), indexed by value.
+_IQ_RANGE_KEYS = tuple(_find_iq_range_key(iq_score) for iq_score in range(201))
+_MP_RANGE_KEYS = tuple(_find_mp_range_key(monkey_percentage) for monkey_percentage in range(101))
+
+def get_iq_range_key(iq_score: int) -> str:
+    """Maps an IQ score to a predefined range key."""
+    if 0 <= iq_score < len(_IQ_RANGE_KEYS):
+        return _IQ_RANGE_KEYS[iq_score]
+    return _find_iq_range_key(iq_score)
+
+def get_mp_range_key(monkey_percentage: int) -> str:
+    """Maps a monkey percentage to a predefined range key."""
+    if 0 <= monkey_percentage < len(_MP_RANGE_KEYS):
+        return _MP_RANGE_KEYS[monkey_percentage]
+    return _find_mp_range_key(monkey_percentage)
 # Stores lists of responses for specific combinations of IQ and Monkey Percentage ranges.
 COMBINED_RESPONSES = {
     "IQ_0": {
@@ -747,6 +765,14 @@ COMBINED_RESPONSES = {
     }
 }
 
+# Values every compiled analysis template takes, in this order.
+_TEMPLATE_PARAMETERS = ("iq_score", "monkey_percentage", "m_type_lower", "m_type_upper", "m_type_plural_lower")
+
+@functools.cache
+def _get_compiled_responses(iq_key: str, mp_key: str) -> list:
+    """Compiles the responses for an IQ and MP combination on first use, so importing the corpus stays cheap."""
+    return [compile_template(response, _TEMPLATE_PARAMETERS) for response in COMBINED_RESPONSES.get(iq_key, {}).get(mp_key, [])]
+
 def get_analysis_response(iq_score: int, monkey_percentage: int) -> str:
     """
     Generates a combined themed response based on IQ score and monkey percentage
@@ -755,27 +781,17 @@ def get_analysis_response(iq_score: int, monkey_percentage: int) -> str:
     iq_key = get_iq_range_key(iq_score)
     mp_key = get_mp_range_key(monkey_percentage)
     
-    # Get a random monkey type for response formatting.
-    m_type = get_random_monkey_type()
-    m_type_lower = m_type.lower()
-    m_type_upper = m_type.upper()
-    m_type_plural_lower = get_plural_monkey_type(m_type_lower)
+    # Get a random monkey type (and its precomputed forms) for response formatting.
+    m_type = get_monkey_type_variants(get_random_monkey_type())
     
     # Attempt to find responses for the specific IQ and MP combination.
-    responses_for_combination = COMBINED_RESPONSES.get(iq_key, {}).get(mp_key, [])
+    responses_for_combination = _get_compiled_responses(iq_key, mp_key)
     
     # Provide a fallback response if no specific combination is found.
     if not responses_for_combination:
-        fallback_response = f"Analysis: IQ **{iq_score}**, Monkey Purity **{monkey_percentage}%**. A unique specimen, this {m_type_lower}! Results are... complex. Requires further study."
-        responses_for_combination = [fallback_response]
+        return f"Analysis: IQ **{iq_score}**, Monkey Purity **{monkey_percentage}%**. A unique specimen, this {m_type.lower}! Results are... complex. Requires further study."
     
-    selected_response = random.choice(responses_for_combination)
+    render_response = random.choice(responses_for_combination)
     
-    # Format the selected response with dynamic values.
-    return selected_response.format(
-        iq_score=iq_score,
-        monkey_percentage=monkey_percentage,
-        m_type_lower=m_type_lower,
-        m_type_upper=m_type_upper,
-        m_type_plural_lower=m_type_plural_lower
-    )
+    # Render the selected response with dynamic values.
+    return render_response(iq_score, monkey_percentage, m_type.lower, m_type.upper, m_type.plural_lower)
@@ -1,4 +1,5 @@
 import random
+from typing import NamedTuple
 
 PRIMATE_TYPES = [
     # General primate types.
@@ -34,3 +35,24 @@ def get_plural_monkey_type(monkey_type: str) -> str:
     if lower_type.endswith('y') and lower_type[-2] not in 'aeiou':
         return monkey_type[:-1] + 'ies'
     return monkey_type + 's'
+
+class MonkeyTypeVariants(NamedTuple):
+    """Case and plural forms of a primate type used by response templates."""
+    lower: str
+    upper: str
+    plural_lower: str
+    plural_upper: str
+
+def _build_variants(monkey_type: str) -> MonkeyTypeVariants:
+    """Computes every template form of a primate type."""
+    lower = monkey_type.lower()
+    plural_lower = get_plural_monkey_type(lower)
+    return MonkeyTypeVariants(lower, monkey_type.upper(), plural_lower, plural_lower.upper())
+
+# Template forms of every primate type, computed once at import.
+PRIMATE_TYPE_VARIANTS = {monkey_type: _build_variants(monkey_type) for monkey_type in PRIMATE_TYPES}
+
+def get_monkey_type_variants(monkey_type: str) -> MonkeyTypeVariants:
+    """Returns the template forms of a primate type, precomputed for every known type."""
+    variants = PRIMATE_TYPE_VARIANTS.get(monkey_type)
+    return variants if variants is not None else _build_variants(monkey_type)
@@ -1,10 +1,12 @@
+import functools
 import random
 from discord.member import Member
-from src.resources.monkey_types import get_plural_monkey_type
+from src.resources.monkey_types import get_monkey_type_variants
+from src.utils.templates import compile_template
 
 # --- Response Templates ---
 # These lists contain dictionaries with 'title' and 'description' for monkey-off results.
-# Placeholders use Python's .format() syntax.
+# Placeholders use Python's .format() syntax; each list is compiled on first use (see _get_compiled_responses).
 
 _TIE_RESPONSES = [
     {"title": "🐒 **{m_type_upper} STANDOFF!** 🐒", "description": "It's a tie! Both {challenger.mention} and {opponent.mention} are equally **{challenger_percentage}%** {m_type_lower}! The jungle remains in equilibrium."},
@@ -206,77 +208,81 @@ _STANDARD_WIN_RESPONSES = [ # Standard win/loss
     {"title": "😂 **LAUGHING STOCK!** 😂", "description": "{winner.mention} **{winner_percentage}% {m_type_lower}** is laughing all the way to victory, while {loser.mention} **{loser_percentage}%** is the entire jungle's new laughing stock. Enjoy the spotlight, {loser.mention}!"}
 ]
 
-def _format_response(response_template: dict[str, str], **kwargs) -> dict[str, str]:
-    """Formats a response dictionary's title and description using provided keyword arguments."""
+# Values every compiled template takes, in this order. Ties pass None for the winner/loser values.
+_TEMPLATE_PARAMETERS = (
+    "m_type_lower", "m_type_upper", "m_type_plural_lower", "m_type_plural_upper",
+    "challenger", "opponent", "challenger_percentage", "opponent_percentage",
+    "winner", "loser", "winner_percentage", "loser_percentage",
+)
+
+def _compile_responses(responses: list[dict[str, str]]) -> list[tuple]:
+    """Compiles a list of response templates into (title, description) render function pairs."""
+    return [
+        (compile_template(response["title"], _TEMPLATE_PARAMETERS), compile_template(response["description"], _TEMPLATE_PARAMETERS))
+        for response in responses
+    ]
+
+# Response lists by outcome.
+_RESPONSES_BY_OUTCOME = {
+    "tie": _TIE_RESPONSES,
+    "perfect_win": _PERFECT_WIN_RESPONSES,
+    "strong_win": _STRONG_WIN_RESPONSES,
+    "zero_loss": _ZERO_LOSS_RESPONSES,
+    "poor_loss": _POOR_LOSS_RESPONSES,
+    "standard_win": _STANDARD_WIN_RESPONSES,
+}
+
+@functools.cache
+def _get_compiled_responses(outcome: str) -> list[tuple]:
+    """Compiles an outcome's response list on first use, so importing the corpus stays cheap."""
+    return _compile_responses(_RESPONSES_BY_OUTCOME[outcome])
+
+def _format_response(compiled_response: tuple, values: tuple) -> dict[str, str]:
+    """Renders a compiled response's title and description from values ordered as in _TEMPLATE_PARAMETERS."""
+    render_title, render_description = compiled_response
     return {
-        "title": response_template["title"].format(**kwargs),
-        "description": response_template["description"].format(**kwargs)
+        "title": render_title(*values),
+        "description": render_description(*values)
     }
 
 def get_monkeyoff_response(challenger: Member, challenger_percentage: int, opponent: Member, opponent_percentage: int, challenger_m_type: str, opponent_m_type: str) -> dict[str, str]:
     """
     Determines the outcome of a monkey-off and returns a dictionary with title and description for the embed.
     """
-    # Determine the monkey type to use for the response based on the outcome.
-    # For a win, use the winner's type. For a tie, pick one randomly.
-    if challenger_percentage > opponent_percentage:
-        m_type = challenger_m_type
-    elif challenger_percentage < opponent_percentage:
-        m_type = opponent_m_type
-    else: # Tie
-        m_type = random.choice([challenger_m_type, opponent_m_type])
-
-
-    m_type_lower = m_type.lower() # e.g., "monkey"
-    m_type_upper = m_type.upper() # e.g., "MONKEY"
-    m_type_plural_lower = get_plural_monkey_type(m_type_lower) # e.g., "monkeys"
-    m_type_plural_upper = m_type_plural_lower.upper() # e.g., "MONKEYS"
-
-
-    # Common arguments for string formatting
-    common_kwargs = {
-        "m_type_lower": m_type_lower,
-        "m_type_upper": m_type_upper,
-        "m_type_plural_lower": m_type_plural_lower,
-        "m_type_plural_upper": m_type_plural_upper,
-        "challenger": challenger,
-        "opponent": opponent,
-        "challenger_percentage": challenger_percentage,
-        "opponent_percentage": opponent_percentage,
-    }
-    
     # Determine winner and loser based on percentages.
+    # For a win, use the winner's monkey type. For a tie, pick one randomly.
     if challenger_percentage > opponent_percentage:
+        m_type = challenger_m_type
         winner, loser, winner_percentage, loser_percentage = challenger, opponent, challenger_percentage, opponent_percentage
     elif challenger_percentage < opponent_percentage:
+        m_type = opponent_m_type
         winner, loser, winner_percentage, loser_percentage = opponent, challenger, opponent_percentage, challenger_percentage
     else: # Tie
-        chosen_response = random.choice(_TIE_RESPONSES)
-        return _format_response(chosen_response, **common_kwargs)
+        m_type = random.choice([challenger_m_type, opponent_m_type])
+        winner = loser = winner_percentage = loser_percentage = None
 
+    # Precomputed forms, e.g. "monkey", "MONKEY", "monkeys", "MONKEYS".
+    m_type_variants = get_monkey_type_variants(m_type)
 
-    # Add winner/loser specific arguments for win/loss scenarios
-    common_kwargs.update({
-        "winner": winner,
-        "loser": loser,
-        "winner_percentage": winner_percentage,
-        "loser_percentage": loser_percentage,
-    })
+    # Arguments for the templates, in _TEMPLATE_PARAMETERS order.
+    values = (
+        *m_type_variants, challenger, opponent, challenger_percentage, opponent_percentage,
+        winner, loser, winner_percentage, loser_percentage,
+    )
 
-    
     # Select response list based on win/loss conditions.
-    responses_list = []
-    if winner_percentage == 100: # Absolute MONKE
-        responses_list = _PERFECT_WIN_RESPONSES
+    if winner is None: # Tie
+        outcome = "tie"
+    elif winner_percentage == 100: # Absolute MONKE
+        outcome = "perfect_win"
     elif loser_percentage == 0: # Loser got 0%
-        responses_list = _ZERO_LOSS_RESPONSES
+        outcome = "zero_loss"
     elif winner_percentage >= 75: # Strong win
-        responses_list = _STRONG_WIN_RESPONSES
+        outcome = "strong_win"
     elif loser_percentage <= 25: # Loser did poorly
-        responses_list = _POOR_LOSS_RESPONSES
+        outcome = "poor_loss"
     else: # Standard win/loss
-        responses_list = _STANDARD_WIN_RESPONSES
-
+        outcome = "standard_win"
 
-    chosen_response = random.choice(responses_list)
-    return _format_response(chosen_response, **common_kwargs)
+    chosen_response = random.choice(_get_compiled_responses(outcome))
+    return _format_response(chosen_response, values)
@@ -5,27 +5,32 @@ import functools
 
 logger = get_logger("DiscordUtils")
 
-async def get_display_name_for_user_id(
-    user_id: int,
+async def get_display_names_for_user_ids(
+    user_ids: list[int],
     guild: discord.Guild | None,
     bot: commands.Bot,
     default_name: str = "Unknown User",
-) -> str:
+) -> dict[int, str]:
     """
-    Resolves a user's display name.
-    Prioritizes live guild member data, then cached data, then database, and finally a default.
+    Resolves display names for several users at once.
+    Uses live guild member data where available and looks up everyone else's stored username
+    with a single database query. Returns a name for every requested user ID.
     """
-    if guild:
-        member = guild.get_member(user_id)
+    names: dict[int, str] = {}
+    missing_ids: list[int] = []
+    for user_id in dict.fromkeys(user_ids):
+        member = guild.get_member(user_id) if guild else None
         if member:
-            return member.display_name
-        
-        # If user not found in guild cache, try fetching from the database.
+            names[user_id] = member.display_name
+        else:
+            missing_ids.append(user_id)
+
+    if guild and missing_ids:
         # Run database query in a separate thread to avoid blocking the event loop.
-        get_profile_func = functools.partial(bot.db_manager.get_user_profile, user_id, guild.id)
-        profile = await bot.loop.run_in_executor(None, get_profile_func)
-        if profile and profile.get('username'):
-            return profile['username']
-    
-    # Fallback to default name if not found in guild or database.
-    return default_name
+        get_usernames_func = functools.partial(bot.db_manager.get_usernames, guild.id, missing_ids)
+        names.update(await bot.loop.run_in_executor(None, get_usernames_func))
+
+    # Fallback to default name for anyone not found in guild or database.
+    for user_id in missing_ids:
+        names.setdefault(user_id, default_name)
+    return names
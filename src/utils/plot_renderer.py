@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from src.core import constants
+from src.core.logging import get_logger
+from src.core.metrics import PLOT_RENDER_DURATION
+# Initialize logger for the plot renderer.
+logger = get_logger("PlotRenderer")
+
+def default_worker_count() -> int:
+    """Returns the number of render processes to use when none is configured."""
+    return max(1, min(4, os.cpu_count() or 1))
+
+def _init_worker() -> None:
+    """Imports matplotlib once per worker and applies the plot style to that process only."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.style
+    matplotlib.style.use('dark_background')
+
+def _warm_up() -> int:
+    """No-op task used to start a worker process (and run its initializer) ahead of the first render."""
+    return os.getpid()
+
+def render_leaderboard_png(names: list[str], scores: list[float], highlight_index: int | None, title: str, x_label: str) -> bytes:
+    """
+    Renders a horizontal leaderboard bar plot to PNG bytes.
+    Uses the object-oriented Figure API only, so no pyplot global state is touched.
+    Names and scores are plotted bottom-to-top; `highlight_index` is the bar to highlight, if any.
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.add_subplot()
+    bars = ax.barh(names, scores, color=constants.PRIMARY_BAR_COLOR)
+
+    # Highlight the target user's bar if they are in the displayed data.
+    if highlight_index is not None:
+        bars[highlight_index].set_color(constants.HIGHLIGHT_BAR_COLOR)
+
+    # Set plot labels, title, and colors for dark background.
+    ax.set_xlabel(x_label)
+    ax.set_title(title, fontsize=constants.PLOT_TITLE_FONTSIZE)
+    fig.patch.set_facecolor(constants.PLOT_BG_COLOR)
+    ax.set_facecolor(constants.AXES_BG_COLOR)
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    fig.tight_layout(pad=2)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100)
+    return buf.getvalue()
+
+class PlotRenderer:
+    """
+    Renders plots in a pool of warm worker processes, keeping matplotlib off the event loop entirely.
+    At most `max_pending` renders are queued or running at once; further callers wait for a slot.
+    """
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: ProcessPoolExecutor | None = None
+        # Guards replacing or closing the pool.
+        self._executor_lock = threading.Lock()
+        self._slots: asyncio.Semaphore | None = None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        """Creates the process pool. Workers are spawned so they don't inherit the bot's threads and sockets."""
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    async def start(self) -> None:
+        """Creates the process pool and starts every worker so the first renders don't pay for process startup."""
+        if self._executor is not None:
+            return
+        self._executor = self._create_executor()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        loop = asyncio.get_running_loop()
+        try:
+            pids = await asyncio.gather(*(loop.run_in_executor(self._executor, _warm_up) for _ in range(self.max_workers)))
+            logger.info(f"Plot renderer started with {len(set(pids))} warm worker process(es), queue bound {self.max_pending}.")
+        except Exception as e:
+            logger.error(f"Failed to warm up plot render workers: {e}", exc_info=True)
+
+    async def render_leaderboard(self, names: list[str], scores: list[float], highlight_index: int | None, title: str, x_label: str) -> bytes | None:
+        """Renders a leaderboard plot in a worker process. Returns the PNG bytes, or None if rendering failed."""
+        if self._executor is None:
+            await self.start()
+        render_func = functools.partial(render_leaderboard_png, names, scores, highlight_index, title, x_label)
+        async with self._slots:
+            executor = self._executor
+            try:
+                with PLOT_RENDER_DURATION.time(plot="leaderboard"):
+                    return await asyncio.get_running_loop().run_in_executor(executor, render_func)
+            except BrokenProcessPool:
+                self._replace_broken_executor(executor)
+                return None
+            except Exception as e:
+                logger.error(f"Failed to render leaderboard plot: {e}", exc_info=True)
+                return None
+
+    def _replace_broken_executor(self, broken: ProcessPoolExecutor) -> None:
+        """
+        Replaces a pool whose worker died (e.g. killed for memory), so later renders recover.
+        Every render in flight on the broken pool fails with it; only the first one replaces it.
+        """
+        with self._executor_lock:
+            if self._executor is not broken:
+                return
+            logger.error("Plot render worker pool broke; restarting it.")
+            self._executor = self._create_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """Shuts down the worker processes, dropping any queued renders."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("Plot renderer stopped.")
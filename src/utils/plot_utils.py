@@ -1,18 +1,18 @@
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import io
 import discord
 from discord.ext import commands
 from datetime import datetime
-import functools
-from src.utils.discord_utils import get_display_name_for_user_id
+from src.utils.discord_utils import get_display_names_for_user_ids
 from src.utils.formatters import format_large_number
 from src.core import constants
+from src.core.cache import RenderedImageCache
 from src.core.logging import get_logger
 
 logger = get_logger("PlotUtils")
 
+# Rendered leaderboard plots, reused when a view is redrawn with identical data.
+plot_cache = RenderedImageCache(constants.PLOT_CACHE_MAX_BYTES)
+
 async def generate_leaderboard_bar_plot(
     interaction: discord.Interaction,
     ranked_data: list[tuple[int, float]],
@@ -20,11 +20,13 @@ async def generate_leaderboard_bar_plot(
     target_user_id: int,
     title: str,
     x_label: str,
-    limit: int = 10
+    limit: int = 10,
+    display_names: dict[int, str] | None = None
 ) -> io.BytesIO | None:
     """
     Generates a horizontal bar plot for leaderboard data.
     Highlights a target user if present in the top N.
+    `display_names` maps user IDs to names already resolved by the caller; they are looked up in bulk otherwise.
     Returns a BytesIO buffer containing the plot image, or None if no data.
     """
     if not ranked_data:
@@ -39,62 +41,69 @@ async def generate_leaderboard_bar_plot(
     scores = [d[1] for d in data_to_plot]
     
     # Resolve display names for users, truncating if too long.
+    if display_names is None:
+        display_names = await get_display_names_for_user_ids(user_ids, interaction.guild, bot)
     names = []
     for uid in user_ids:
-        name = await get_display_name_for_user_id(uid, interaction.guild, bot)
+        name = display_names.get(uid, "Unknown User")
         names.append(name[:15] + '...' if len(name) > 18 else name)
-    
-    # Configure matplotlib style and create plot.
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    bars = ax.barh(names, scores, color=constants.PRIMARY_BAR_COLOR)
+
+    # Serve a previous render of exactly the same plot without touching matplotlib.
+    cache_key = plot_cache.key_for(data_to_plot, names, title, x_label, target_user_id)
+    cached_png = plot_cache.get(cache_key)
+    if cached_png is not None:
+        return io.BytesIO(cached_png)
     
     # Highlight the target user's bar if they are in the displayed data.
-    try:
-        highlight_index = user_ids.index(target_user_id)
-        bars[highlight_index].set_color(constants.HIGHLIGHT_BAR_COLOR)
-    except ValueError:
-        pass  # Target user not in top N
-    
-    # Set plot labels, title, and colors for dark background.
-    ax.set_xlabel(x_label)
-    ax.set_title(title, fontsize=constants.PLOT_TITLE_FONTSIZE)
-    fig.patch.set_facecolor(constants.PLOT_BG_COLOR)
-    ax.set_facecolor(constants.AXES_BG_COLOR)
-    ax.tick_params(axis='x', colors='white')
-    ax.tick_params(axis='y', colors='white')
-    plt.tight_layout(pad=2)
-    
-    # Save plot to a BytesIO buffer and close the figure.
-    # Operations are run in an executor to avoid blocking the event loop.
-    buf = io.BytesIO()
-    await bot.loop.run_in_executor(None, functools.partial(plt.savefig, buf, format='png', dpi=100))
-    buf.seek(0)
-    await bot.loop.run_in_executor(None, plt.close, fig)
-    await bot.loop.run_in_executor(None, plt.style.use, 'default')
-    return buf
+    highlight_index = user_ids.index(target_user_id) if target_user_id in user_ids else None
+
+    # Render in the bot's worker process pool so matplotlib never runs on the event loop.
+    png_bytes = await bot.plot_renderer.render_leaderboard(names, scores, highlight_index, title, x_label)
+    if png_bytes is None:
+        return None
+    plot_cache.put(cache_key, png_bytes)
+    return io.BytesIO(png_bytes)
 
 async def generate_leaderboard_string(
     interaction: discord.Interaction,
     ranked_data: list[tuple[int, float]],
     bot: commands.Bot,
     metric_name: str,
-    limit: int = 10
+    limit: int = 10,
+    target_entry: tuple[int, int, float] | None = None,
+    display_names: dict[int, str] | None = None
 ) -> str | None:
-    """Generates a formatted string representation of a leaderboard."""
+    """
+    Generates a formatted string representation of a leaderboard.
+    `target_entry` is an optional (rank, user_id, value) appended below the list for a user outside the top N.
+    `display_names` maps user IDs to names already resolved by the caller; they are looked up in bulk otherwise.
+    """
     if not ranked_data:
         return None
+    if display_names is None:
+        user_ids = [user_id for user_id, _ in ranked_data[:limit]]
+        if target_entry:
+            user_ids.append(target_entry[1])
+        display_names = await get_display_names_for_user_ids(user_ids, interaction.guild, bot)
     
     leaderboard_lines = [f"\n\n**🏆 Top {min(limit, len(ranked_data))} Leaderboard (by {metric_name}):**"]
     
     for i, (user_id, score_value) in enumerate(ranked_data[:limit]):
         rank_num = i + 1
-        name_to_display = await get_display_name_for_user_id(user_id, interaction.guild, bot)
+        name_to_display = display_names.get(user_id, "Unknown User")
         
         # Truncate long names for display.
         if len(name_to_display) > 25:
             name_to_display = name_to_display[:22] + "..."
 
         leaderboard_lines.append(f"`{rank_num:2d}.` **{name_to_display}** - `{format_large_number(score_value)}`")
+
+    # Show the highlighted user's own position when they didn't make the list.
+    if target_entry and target_entry[0] > limit:
+        rank_num, user_id, score_value = target_entry
+        name_to_display = display_names.get(user_id, "Unknown User")
+        if len(name_to_display) > 25:
+            name_to_display = name_to_display[:22] + "..."
+        leaderboard_lines.append("`  …`")
+        leaderboard_lines.append(f"`{rank_num:2d}.` **{name_to_display}** - `{format_large_number(score_value)}`")
     return "\n".join(leaderboard_lines)
@@ -0,0 +1,46 @@
+import re
+import string
+from typing import Callable
+
+# Field names a template may use: a keyword argument, optionally followed by attribute access (e.g. "winner.mention").
+_FIELD_NAME_PATTERN = re.compile(r"[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*\Z")
+_formatter = string.Formatter()
+
+def compile_template(template: str, parameters: tuple[str, ...] | None = None) -> Callable[..., str]:
+    """
+    Compiles a str.format-style template into a render function.
+    The template is parsed once and turned into a single f-string, so rendering does no parsing.
+    Without `parameters`, the function takes the placeholders as keyword arguments and ignores unused ones,
+    like str.format(**kwargs). With `parameters`, it takes exactly those values positionally, in that order,
+    which avoids building a keyword dictionary on every call.
+    Raises ValueError for placeholders that aren't plain names or attribute lookups, or aren't in `parameters`.
+    """
+    # Literal text is bound as globals of the generated function, so it never needs escaping.
+    namespace: dict[str, str] = {}
+    pieces: list[str] = []
+    arguments: dict[str, None] = {}
+    for literal, field_name, format_spec, conversion in _formatter.parse(template):
+        if literal:
+            literal_name = f"_literal_{len(namespace)}"
+            namespace[literal_name] = literal
+            pieces.append(f"{{{literal_name}}}")
+        if field_name is None:
+            continue
+        if not _FIELD_NAME_PATTERN.match(field_name) or "{" in (format_spec or ""):
+            raise ValueError(f"Unsupported placeholder '{{{field_name}}}' in template: {template!r}")
+        argument = field_name.split(".")[0]
+        if parameters is not None and argument not in parameters:
+            raise ValueError(f"Placeholder '{{{field_name}}}' is not one of {parameters} in template: {template!r}")
+        arguments[argument] = None
+        conversion_suffix = f"!{conversion}" if conversion else ""
+        spec_suffix = f":{format_spec}" if format_spec else ""
+        pieces.append(f"{{{field_name}{conversion_suffix}{spec_suffix}}}")
+
+    if parameters is not None:
+        signature = ", ".join(parameters)
+    else:
+        signature = "".join(f"{name}, " for name in arguments)
+        signature = f"*, {signature}**_unused" if arguments else "**_unused"
+    source = f"def render({signature}):\n    return f{''.join(pieces)!r}\n"
+    exec(compile(source, "<template>", "exec"), namespace)
+    return namespace["render"]